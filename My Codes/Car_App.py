@@ -4,9 +4,19 @@ import sys
 from PyQt5 import QtCore as qtc
 from PyQt5 import QtWidgets as qtw
 from QuarterCarModel import CarController
+from QuarterCarWorker import OptimizeWorker, ParetoWorker, MapWorker
+from QuarterCarDialogs import ParetoDialog, MapDialog
+from QuarterCarRoad import ObstacleRoad, CSVRoad, ISO8608Road
 #endregion
 
 class MainWindow(qtw.QWidget, Ui_Form):
+    # the roads on offer (None is the ramp set by the ramp angle), besides a profile loaded from a csv file
+    roads = {'Ramp': lambda: None,
+             'Speed bumps': lambda: ObstacleRoad([('bump', 0.075, 3.7)] * 3, gap=20.0, leadIn=5.0, name='Speed bumps'),
+             'Pothole': lambda: ObstacleRoad([('bump', -0.05, 0.6)], leadIn=5.0, name='Pothole')}
+    roads.update({'ISO 8608 class ' + c: (lambda c=c: ISO8608Road(c, length=200.0, seed=0)) for c in 'ABCDEFGH'})
+    csvRoad = 'CSV profile...'
+
     def __init__(self):
         super().__init__()
         self.setupUi(self)
@@ -22,8 +32,48 @@ class MainWindow(qtw.QWidget, Ui_Form):
 
         self.controller = CarController((input_widgets, display_widgets))
 
+        #a cancel button for the optimization, next to the calculate and optimize buttons
+        self.pb_Cancel = qtw.QPushButton("Cancel", self.grp_Inputs)
+        self.pb_Cancel.setEnabled(False)
+        self.pb_Pareto = qtw.QPushButton("Pareto Front", self.grp_Inputs)
+        self.pb_Map = qtw.QPushButton("Design Map", self.grp_Inputs)
+        self.gridLayout.itemAtPosition(8, 0).layout().addWidget(self.pb_Pareto)
+        self.gridLayout.itemAtPosition(8, 0).layout().addWidget(self.pb_Map)
+        self.gridLayout.itemAtPosition(8, 0).layout().addWidget(self.pb_Cancel)
+        #choice of optimizer, in the free row under the log scale check boxes
+        self.lbl_Optimizer = qtw.QLabel("Optimizer", self.grp_Inputs)
+        self.cmb_Optimizer = qtw.QComboBox(self.grp_Inputs)
+        self.cmb_Optimizer.addItems(['L-BFGS-B', 'SLSQP', 'Nelder-Mead', 'differential_evolution'])
+        self.cmb_Optimizer.setCurrentText(self.controller.model.optimizer)
+        self.gridLayout.addWidget(self.lbl_Optimizer, 10, 0, alignment=qtc.Qt.AlignRight)
+        self.gridLayout.addWidget(self.cmb_Optimizer, 10, 1)
+        #choice of road, in the free row above the info label
+        self.lbl_Road = qtw.QLabel("Road", self.grp_Inputs)
+        self.cmb_Road = qtw.QComboBox(self.grp_Inputs)
+        self.cmb_Road.addItems(list(self.roads) + [self.csvRoad])
+        self.gridLayout.addWidget(self.lbl_Road, 13, 0, alignment=qtc.Qt.AlignRight)
+        self.gridLayout.addWidget(self.cmb_Road, 13, 1)
+        self.roadName = 'Ramp'
+        self.worker = None
+        self.pendingDesign = None  # latest progress from the optimizer, shown when progressTimer fires
+        self.progressTimer = qtc.QTimer(self)
+        self.progressTimer.setSingleShot(True)
+        self.progressTimer.setInterval(100)  # redraw at most 10 times a second while optimizing
+        self.progressTimer.timeout.connect(self.showProgress)
+        self.pendingFront = None  # latest Pareto front from the search, shown when progressTimer fires
+        self.paretoDialog = None
+        self.mapDialog = None
+        self.animationClock = qtc.QElapsedTimer()  # plays a design picked on the Pareto front in real time
+        self.animationTimer = qtc.QTimer(self)
+        self.animationTimer.setInterval(40)  # at up to 25 frames/s
+        self.animationTimer.timeout.connect(self.stepAnimation)
+
         self.btn_calculate.clicked.connect(self.controller.calculate)
         self.pb_Optimize.clicked.connect(self.doOptimize)
+        self.pb_Cancel.clicked.connect(self.cancelOptimize)
+        self.pb_Pareto.clicked.connect(self.doPareto)
+        self.pb_Map.clicked.connect(self.showDesignMap)
+        self.cmb_Road.activated.connect(self.chooseRoad)
         self.chk_LogX.stateChanged.connect(self.controller.doPlot)
         self.chk_LogY.stateChanged.connect(self.controller.doPlot)
         self.chk_LogAccel.stateChanged.connect(self.controller.doPlot)
@@ -52,10 +102,188 @@ class MainWindow(qtw.QWidget, Ui_Form):
             ywheel, ybody, yroad, accel = self.controller.getPoints(event.xdata)
             self.setWindowTitle(f"t={event.xdata:.2f}s, y-road={yroad*1000:.2f}mm, y-wheel={ywheel*1000:.2f}mm, y-car={ybody*1000:.2f}mm, accel={accel:.2f}g")
 
+    def chooseRoad(self, index):
+        """
+        Switches to the road picked in cmb_Road, asking for the file of a csv profile (distance and height in m).
+        """
+        name = self.cmb_Road.itemText(index)
+        try:
+            if name == self.csvRoad:
+                fileName, _ = qtw.QFileDialog.getOpenFileName(self, "Road Profile", "", "CSV files (*.csv);;All files (*)")
+                if not fileName:
+                    self.cmb_Road.setCurrentText(self.roadName)
+                    return
+                road = CSVRoad(fileName)
+            else:
+                road = self.roads[name]()
+        except (OSError, ValueError) as e:
+            self.cmb_Road.setCurrentText(self.roadName)
+            qtw.QMessageBox.warning(self, "Quarter Car Model", "The road could not be loaded:\n" + str(e))
+            return
+        self.roadName = name
+        self.controller.setRoad(road)
+
     def doOptimize(self):
-        app.setOverrideCursor(qtc.Qt.WaitCursor)
-        self.controller.OptimizeSuspension()
-        app.restoreOverrideCursor()
+        """
+        Starts the suspension optimization on a worker thread.  The plot and info label follow the best design so far
+        and the Cancel button stops it, keeping the best design found.
+        """
+        if self.worker is not None:
+            return
+        self.controller.model.optimizer = self.cmb_Optimizer.currentText()
+        x0 = self.controller.prepareOptimization()  #reads the widgets, so it is done here on the GUI thread
+        self.worker = OptimizeWorker(self.controller, x0, parent=self)
+        self.worker.progress.connect(self.optimizeProgress)
+        self.worker.optimized.connect(self.optimizeDone)
+        self.worker.failed.connect(self.optimizeFailed)
+        self.setOptimizing(True)
+        self.worker.start()
+
+    def doPareto(self):
+        """
+        Starts the search for the Pareto front of ride comfort, tire deflection and suspension travel on a worker
+        thread, seeded with the current design.  The front is plotted in a dialog as it evolves.
+        """
+        if self.worker is not None:
+            return
+        self.controller.prepareOptimization()  #reads the widgets
+        m = self.controller.model
+        self.worker = ParetoWorker(self.controller, (m.k1, m.c1, m.k2), parent=self)
+        self.worker.front.connect(self.paretoProgress)
+        self.worker.optimized.connect(self.paretoDone)
+        self.worker.failed.connect(self.optimizeFailed)
+        if self.paretoDialog is None:
+            self.paretoDialog = ParetoDialog(self)
+            self.paretoDialog.designPicked.connect(self.showParetoDesign)
+        self.paretoDialog.show()
+        self.setOptimizing(True)
+        self.setWindowTitle("Searching for the Pareto front")
+        self.worker.start()
+
+    def paretoProgress(self, front):
+        self.pendingFront = front
+        if not self.progressTimer.isActive():
+            self.progressTimer.start()
+
+    def paretoDone(self, model, cancelled):
+        self.finishOptimize()
+        self.controller.model.pareto = model.pareto
+        self.paretoDialog.setFront(model.pareto, "cancelled" if cancelled else None)
+        self.paretoDialog.show()
+        self.setWindowTitle("Quarter Car Model" + (" - Pareto search cancelled" if cancelled else ""))
+
+    def showParetoDesign(self, k1, c1, k2):
+        """
+        Shows a design picked on the Pareto front and animates the schematic through the simulation.
+        """
+        self.controller.showDesign((k1, c1, k2))
+        self.animationClock.start()
+        self.animationTimer.start()
+
+    def stepAnimation(self):
+        tmax = self.controller.model.tmax
+        t = self.animationClock.elapsed() / 1000.0  # frames are dropped rather than slowing down if drawing is slow
+        self.controller.animate(min(t, tmax))
+        if t >= tmax:
+            self.animationTimer.stop()
+
+    def showDesignMap(self):
+        """
+        Opens the design space map, and maps the design space if it has not been yet.
+        """
+        if self.mapDialog is None:
+            self.mapDialog = MapDialog(self)
+            self.mapDialog.pb_Compute.clicked.connect(self.doDesignMap)
+        self.mapDialog.show()
+        m = self.controller.model
+        if m.designMap is None:
+            self.doDesignMap()
+        else:
+            self.mapDialog.setMap(m.designMap, (m.k1, m.c1, m.k2))  # marks the design as it is now
+
+    def doDesignMap(self):
+        """
+        Maps SSE, accelMax and settling time over the k1 x c1 grid set up in the map dialog on a worker thread.
+        """
+        if self.worker is not None:
+            return
+        self.controller.prepareOptimization()  #reads the widgets
+        nGrid, nSlices = self.mapDialog.getGrid()
+        self.worker = MapWorker(self.controller, nGrid, nSlices, parent=self)
+        self.worker.fraction.connect(self.mapProgress)
+        self.worker.optimized.connect(self.mapDone)
+        self.worker.failed.connect(self.optimizeFailed)
+        self.setOptimizing(True)
+        self.mapProgress(0.0)
+        self.worker.start()
+
+    def mapProgress(self, fraction):
+        self.setWindowTitle("Mapping the design space:  {:0.0f}%".format(100 * fraction))
+
+    def mapDone(self, model, cancelled):
+        self.finishOptimize()
+        m = self.controller.model
+        m.designMap = model.designMap
+        self.mapDialog.setMap(m.designMap, (m.k1, m.c1, m.k2), "cancelled" if cancelled else None)
+        self.mapDialog.show()
+        self.setWindowTitle("Quarter Car Model" + (" - design map cancelled" if cancelled else ""))
+
+    def setOptimizing(self, optimizing):
+        self.pb_Optimize.setEnabled(not optimizing)
+        self.pb_Pareto.setEnabled(not optimizing)
+        self.pb_Map.setEnabled(not optimizing)
+        self.cmb_Road.setEnabled(not optimizing)
+        if self.mapDialog is not None:
+            self.mapDialog.pb_Compute.setEnabled(not optimizing)
+        self.btn_calculate.setEnabled(not optimizing)
+        self.pb_Cancel.setEnabled(optimizing)
+
+    def cancelOptimize(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.pb_Cancel.setEnabled(False)
+
+    def optimizeProgress(self, k1, c1, k2, SSE, accelMax):
+        self.pendingDesign = (k1, c1, k2, SSE, accelMax)
+        if not self.progressTimer.isActive():
+            self.progressTimer.start()
+
+    def showProgress(self):
+        if self.pendingFront is not None and self.worker is not None:
+            self.paretoDialog.setFront(self.pendingFront)
+            self.pendingFront = None
+        if self.pendingDesign is None or self.worker is None:
+            return
+        k1, c1, k2, SSE, accelMax = self.pendingDesign
+        self.pendingDesign = None
+        self.controller.showDesign((k1, c1, k2), SSE)
+        self.setWindowTitle("Optimizing:  k1={:0.1f}, c1={:0.1f}, k2={:0.1f}, SSE={:0.3f}, accel max={:0.2f}g".format(
+            k1, c1, k2, SSE, accelMax))
+
+    def finishOptimize(self):
+        self.progressTimer.stop()
+        self.pendingDesign = None
+        self.pendingFront = None
+        self.worker.wait()
+        self.worker = None
+        self.setOptimizing(False)
+
+    def optimizeDone(self, model, cancelled):
+        self.finishOptimize()
+        self.controller.model = model
+        self.controller.view.updateView(model)
+        self.setWindowTitle("Quarter Car Model" + (" - optimization cancelled, best design so far applied" if cancelled else ""))
+
+    def optimizeFailed(self, message):
+        self.finishOptimize()
+        qtw.QMessageBox.warning(self, "Quarter Car Model", "The optimization failed:\n" + message)
+
+    def closeEvent(self, event):
+        self.animationTimer.stop()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = qtw.QApplication(sys.argv)
@@ -1,5 +1,6 @@
 # region imports
 import math
+import threading
 import numpy as np
 from scipy.integrate import quad
 from scipy.optimize import fsolve
@@ -22,6 +23,7 @@ class StateDataForPlotting:
         self.u = []
         self.s = []
         self.v = []
+        self.converted = {}  # (SI, mass, total) -> (n, dict of converted columns)
 
     def clear(self):
         self.T.clear()
@@ -30,6 +32,7 @@ class StateDataForPlotting:
         self.u.clear()
         self.s.clear()
         self.v.clear()
+        self.converted.clear()
 
     def add(self, vals):
         T, P, u, h, s, v = vals
@@ -39,6 +42,42 @@ class StateDataForPlotting:
         self.u.append(u)
         self.s.append(s)
         self.v.append(v)
+        self.converted.clear()
+
+    def extend(self, other):
+        """
+        Appends all the data from another StateDataForPlotting object.  I use this to piece together the upper and
+        lower curves of a cycle from the individual process legs.
+        :param other: a StateDataForPlotting object
+        """
+        self.T.extend(other.T)
+        self.P.extend(other.P)
+        self.h.extend(other.h)
+        self.u.extend(other.u)
+        self.s.extend(other.s)
+        self.v.extend(other.v)
+        self.converted.clear()
+
+    def getConvertedCols(self, Units=None, mass=False, total=False, n=1.0, MW=1.0):
+        """
+        Returns all six property columns converted to the unit system of Units (SI or English) on a molar, mass or
+        total basis.  The converted columns are cached for each basis the first time they are asked for, so
+        changing the axes or units of a plot only has to pick two cached arrays.
+        :param Units: a units object (only Units.SI is used)
+        :param mass: True for a mass basis
+        :param total: True for total (extensive) values (ignored if mass is True)
+        :param n: number of moles for the total basis
+        :param MW: molecular weight for the mass basis
+        :return: a dict of lower case property name -> numpy array
+        """
+        Units = Units if Units is not None else units()
+        key = (Units.SI, mass, total)
+        if key in self.converted and self.converted[key][0] == n:
+            return self.converted[key][1]
+        CF = Units.getConversionFactors(SI=Units.SI, mass=mass, total=total, n=n, MW=MW)
+        cols = {w: np.array(self.getDataCol(w), dtype=float) * CF[w] for w in ('t', 'p', 'u', 'h', 's', 'v')}
+        self.converted[key] = (n, cols)
+        return cols
 
     def getAxisLabel(self, W='T', Units=None):
         Units = Units if Units is not None else units()
@@ -72,6 +111,104 @@ class StateDataForPlotting:
             return self.P
 
 
+class calculationCancelled(Exception):
+    """
+    Raised by cycleDependencies.startNode when a calculation is cancelled part way through.
+    """
+    pass
+
+
+class cycleDependencies():
+    """
+    Keeps track of which inputs each state and path leg (node) of a cycle depends on.  The nodes are given as a dict
+    of node name -> tuple of names it depends on, where a name can be an input or another node.  Nodes should be
+    listed in the order they get calculated.  When an input changes, every node downstream of it is marked dirty, so
+    the controller only needs to recompute the dirty nodes.
+    """
+
+    def __init__(self, nodes=None):
+        self.nodes = {} if nodes is None else dict(nodes)
+        self.inputs = {}
+        self.dirty = set(self.nodes)  # nothing has been calculated yet
+        self.progress = None  # optional callback progress(node, done, total) as each node is finished
+        self.cancel = None  # optional callable that returns True if the calculation should stop
+        self.nDone = 0
+        self.nTotal = 0
+
+    def setInputs(self, rel_tol=0.0, **kwargs):
+        """
+        Stores new values for the inputs and invalidates any node that depends on an input that changed.
+        Values within rel_tol of the stored value are not a change and the stored value is kept, so the caller
+        should read the inputs back from self.inputs.
+        :param rel_tol: relative tolerance for deciding if an input changed
+        :param kwargs: input name=value pairs (in SI units so a change of units is not a change of input)
+        :return: a list of the names of the inputs that changed
+        """
+        changed = [k for k, val in kwargs.items()
+                   if k not in self.inputs or not math.isclose(self.inputs[k], val, rel_tol=rel_tol)]
+        for name in changed:
+            self.inputs[name] = kwargs[name]
+            self.invalidate(name)
+        return changed
+
+    def invalidate(self, name=None):
+        """
+        Marks everything downstream of name as dirty.  If name is None, all the nodes are marked dirty.
+        :param name: an input or node name
+        """
+        if name is None:
+            self.dirty = set(self.nodes)
+            return
+        if name in self.nodes:
+            self.dirty.add(name)
+        for node, depends in self.nodes.items():
+            if name in depends and node not in self.dirty:
+                self.invalidate(node)
+
+    def isDirty(self, node):
+        return node in self.dirty
+
+    def setClean(self, node):
+        self.dirty.discard(node)
+
+    def getDirty(self):
+        """
+        :return: the dirty nodes in calculation order
+        """
+        return [node for node in self.nodes if node in self.dirty]
+
+    def setHooks(self, progress=None, cancel=None):
+        """
+        Sets (or clears) the progress and cancel callbacks used by startNode and finishNode.
+        """
+        self.progress = progress
+        self.cancel = cancel
+        self.nDone = 0
+        self.nTotal = len(self.dirty)
+
+    def startNode(self, node):
+        """
+        Called before a node is calculated.
+        :param node: node name
+        :return: True if the node is dirty and needs to be calculated
+        """
+        if node not in self.dirty:
+            return False
+        if self.cancel is not None and self.cancel():
+            raise calculationCancelled(node)
+        return True
+
+    def finishNode(self, node):
+        """
+        Called after a node is calculated.  Marks it clean and reports progress.
+        :param node: node name
+        """
+        self.dirty.discard(node)
+        self.nDone += 1
+        if self.progress is not None:
+            self.progress(node, self.nDone, max(self.nTotal, self.nDone))
+
+
 class stateProps():
     """
     for storage and retrieval of a thermodynamic state
@@ -224,6 +361,32 @@ class units():
 
         self.setPlotUnits(SI=SI, mass=mass, total=total)
 
+    def getConversionFactors(self, SI=True, mass=False, total=False, n=1.0, MW=1.0):
+        """
+        The multipliers that take molar SI values of each property to the requested units and basis.
+        :param SI: True for SI, False for English units
+        :param mass: True for a mass basis
+        :param total: True for total (extensive) values (ignored if mass is True)
+        :param n: number of moles for the total basis
+        :param MW: molecular weight for the mass basis
+        :return: a dict of lower case property name -> conversion factor
+        """
+        TCF = 1.0 if SI else self.CF_T
+        PCF = 1.0 if SI else self.CF_P
+        vCF = 1.0 if SI else self.CF_v  # convert m^3/mol to ft^3/lbmol
+        eCF = 1.0 if SI else self.CF_e  # convert J/mol to Btu/lbmol
+        sCF = 1.0 if SI else self.CF_s
+        nCF = 1.0 if SI else self.CF_n  # convert mol to lbmol
+        if mass:
+            vCF /= MW
+            eCF /= MW
+            sCF /= MW
+        elif total:
+            vCF *= n * nCF
+            eCF *= n * nCF
+            sCF *= n * nCF
+        return {'t': TCF, 'p': PCF, 'u': eCF, 'h': eCF, 's': sCF, 'v': vCF}
+
     def setPlotUnits(self, SI=True, mass=True, total=False):
         if SI:
             self.PPlotUnits = r'P $\left(Pa\right)$'
@@ -293,6 +456,13 @@ class units():
 
 
 class air():
+    # coefficients of cp/Rbar=a+b*T+c*T**2+d*T**3+e*T**4 below and above TLowRange
+    TLowRange = 1630.0
+    cpLow = (3.653, -1.337E-3, 3.294E-6, -1.913E-9, 0.2763E-12)
+    cpHigh = (2.753, 0.002, -1.0E-6, 3.0E-10, -3.0E-14)
+    propertyTable = None  # shared by all air objects, built the first time it is needed (see getPropertyTable)
+    propertyTableLock = threading.Lock()
+
     def __init__(self):
         """
         Air as an ideal gas.
@@ -334,12 +504,7 @@ class air():
         :return: molar specific heat in units of kJ/kg
         :rtype: float
         """
-        TLowRange = 1630.0
-        a = 3.653 if T < TLowRange else 2.753
-        b = -1.337E-3 if T < TLowRange else 0.002
-        c = 3.294E-6 if T < TLowRange else -1.0E-6
-        d = -1.913E-9 if T < TLowRange else 3.0E-10
-        e = 0.2763E-12 if T < TLowRange else -3.0E-14
+        a, b, c, d, e = self.cpLow if T < self.TLowRange else self.cpHigh
         return self.RBar * (a + b * T + c * T ** 2 + d * T ** 3 + e * T ** 4)
 
     def deltau(self, T1=None, T2=None):
@@ -433,6 +598,158 @@ class air():
         deltaS += self.RBar * math.log(P1 / P2)
         return deltaS
 
+    # region vectorized property functions
+    # The cp polynomial integrates in closed form, so these work on whole numpy arrays of temperatures at once
+    # instead of calling quad and fsolve for each point.  They agree with deltau, deltah and deltas_tp to round off.
+    def intCp(self, T):
+        """
+        Antiderivative of cp(T) (continuous across TLowRange), so delta h = intCp(T2)-intCp(T1).
+        :param T: array of temperatures in K
+        :return: array in J/mol
+        """
+        T = np.asarray(T, dtype=float)
+        Tb = self.TLowRange
+        F = lambda C, T: T * (C[0] + T * (C[1] / 2 + T * (C[2] / 3 + T * (C[3] / 4 + T * C[4] / 5))))
+        TL = np.minimum(T, Tb)
+        TH = np.maximum(T, Tb)
+        return self.RBar * (F(self.cpLow, TL) + F(self.cpHigh, TH) - F(self.cpHigh, Tb))
+
+    def intCpOverT(self, T):
+        """
+        Antiderivative of cp(T)/T (continuous across TLowRange), so int(cp/T*dT, T1, T2)=intCpOverT(T2)-intCpOverT(T1).
+        :param T: array of temperatures in K
+        :return: array in J/mol*K
+        """
+        T = np.asarray(T, dtype=float)
+        Tb = self.TLowRange
+        G = lambda C, T: C[0] * np.log(T) + T * (C[1] + T * (C[2] / 2 + T * (C[3] / 3 + T * C[4] / 4)))
+        TL = np.minimum(T, Tb)
+        TH = np.maximum(T, Tb)
+        return self.RBar * (G(self.cpLow, TL) + G(self.cpHigh, TH) - G(self.cpHigh, Tb))
+
+    def cpArray(self, T):
+        T = np.asarray(T, dtype=float)
+        poly = lambda C: C[0] + T * (C[1] + T * (C[2] + T * (C[3] + T * C[4])))
+        return self.RBar * np.where(T < self.TLowRange, poly(self.cpLow), poly(self.cpHigh))
+
+    def cvArray(self, T):
+        return self.cpArray(T) - self.RBar
+
+    def dcpArray(self, T):
+        """
+        d(cp)/dT, which is also d(cv)/dT
+        """
+        T = np.asarray(T, dtype=float)
+        poly = lambda C: C[1] + T * (2 * C[2] + T * (3 * C[3] + T * 4 * C[4]))
+        return self.RBar * np.where(T < self.TLowRange, poly(self.cpLow), poly(self.cpHigh))
+
+    def hArray(self, T):
+        return self.intCp(T) - self.intCp(self.StandardState.T)
+
+    def uArray(self, T):
+        return self.hArray(T) - self.RBar * (np.asarray(T, dtype=float) - self.StandardState.T)
+
+    def s0Array(self, T):
+        """
+        Temperature part of the entropy, int(cp/T*dT, T0, T), so s(T,P)=s0(T)-R ln(P/P0).
+        """
+        return self.intCpOverT(T) - self.intCpOverT(self.StandardState.T)
+
+    def getPropertyTable(self):
+        """
+        A table of u, h and s0 on a fixed temperature grid.  It is built once and shared by every air object (and
+        thread), and is only used to get starting values for the Newton iterations in solveT.
+        :return: dict with keys 'T', 'u', 'h', 's0'
+        """
+        if air.propertyTable is None:
+            with air.propertyTableLock:
+                if air.propertyTable is None:
+                    T = np.linspace(20.0, 6000.0, 1200)
+                    air.propertyTable = {'T': T, 'u': self.uArray(T), 'h': self.hArray(T), 's0': self.s0Array(T)}
+        return air.propertyTable
+
+    def solveT(self, target, fn, dfn, col=None, tol=1.0E-10):
+        """
+        Solves fn(T)=target for arrays of targets with Newton's method, starting from the property table.
+        :param target: array of target values
+        :param fn: property function of T (monotone increasing)
+        :param dfn: derivative of fn with respect to T
+        :param col: property table column that fn corresponds to, for the starting values (if None, fn is
+                    evaluated on the table temperatures)
+        :return: array of T in K
+        """
+        tbl = self.getPropertyTable()
+        target = np.asarray(target, dtype=float)
+        T = np.interp(target, tbl[col] if col is not None else fn(tbl['T']), tbl['T'])
+        for i in range(50):
+            dT = (fn(T) - target) / dfn(T)
+            T = np.maximum(T - dT, 1.0)
+            if np.all(np.abs(dT) <= tol * T):
+                break
+        return T
+
+    def setArrays(self, P=None, T=None, v=None, h=None, u=None, s=None):
+        """
+        The array version of set:  any two of the properties are given as arrays (or a scalar and an array) and
+        the states are calculated all at once (see calcArrays).
+        :return: a StateDataForPlotting object with the calculated states
+        """
+        cols = self.calcArrays(P=P, T=T, v=v, h=h, u=u, s=s)
+        data = StateDataForPlotting()
+        for name in ('T', 'P', 'u', 'h', 's', 'v'):
+            setattr(data, name, list(cols[name]))
+        return data
+
+    def calcArrays(self, P=None, T=None, v=None, h=None, u=None, s=None):
+        """
+        Any two of the properties are given as arrays (or a scalar and an array) and the states are calculated all
+        at once.  The supported pairs are those with P, T or v, plus u or h with s.
+        :param P: Pressure in Pa
+        :param T: Temperature in K
+        :param v: specific volume in m^3/mol
+        :param u: specific internal energy in J/mol
+        :param h: specific enthalpy in J/mol
+        :param s: specific entropy in J/mol*K
+        :return: a dict of property name ('T', 'P', 'u', 'h', 's', 'v') -> numpy array
+        """
+        R = self.RBar
+        P0 = self.StandardState.P
+        v0 = self.StandardState.v
+        given = [np.asarray(x, dtype=float) if x is not None else None for x in (P, T, v, h, u, s)]
+        shape = np.broadcast_shapes(*[x.shape for x in given if x is not None])
+        P, T, v, h, u, s = [np.broadcast_to(x, shape) if x is not None else None for x in given]
+        # 1. get T
+        if T is None:
+            if P is not None and v is not None:
+                T = P * v / R
+            elif u is not None:
+                T = self.solveT(u, self.uArray, self.cvArray, 'u')
+            elif h is not None:
+                T = self.solveT(h, self.hArray, self.cpArray, 'h')
+            elif P is not None and s is not None:
+                # s=s0(T)-R ln(P/P0)
+                T = self.solveT(s + R * np.log(P / P0), self.s0Array, lambda T: self.cpArray(T) / T, 's0')
+            elif v is not None and s is not None:
+                # s=s0(T)-R ln(T/T0)+R ln(v/v0) for ideal gas
+                T0 = self.StandardState.T
+                T = self.solveT(s - R * np.log(v / v0), lambda T: self.s0Array(T) - R * np.log(T / T0),
+                                lambda T: self.cvArray(T) / T)
+            else:
+                raise ValueError('setArrays needs two independent properties')
+        # 2. get P
+        if P is None:
+            if v is not None:
+                P = R * T / v
+            elif s is not None:
+                P = P0 * np.exp((self.s0Array(T) - s) / R)
+            else:
+                raise ValueError('setArrays needs two independent properties')
+        T = np.array(T, dtype=float)
+        P = np.array(P, dtype=float)
+        return {'T': T, 'P': P, 'v': R * T / P, 'u': self.uArray(T), 'h': self.hArray(T),
+                's': self.s0Array(T) - R * np.log(P / P0)}
+    # endregion
+
     def set(self, P=None, T=None, v=None, h=None, u=None, s=None, name=None):
         """
         This allows me to set two properties and calculate the state of the air
@@ -0,0 +1,736 @@
+# region imports
+from Air import *
+from CycleCache import cycleResult
+from CycleExport import cycleExporter
+from CyclePlot import cyclePlotArtists
+from matplotlib import pyplot as plt
+from PyQt5 import QtWidgets as qtw
+import sys
+
+
+# endregion
+
+# region class definitions
+class braytonBatch():
+    """
+    Calculates the states of air standard Brayton cycles for arrays of inputs with the array functions of the air
+    class.  All the stages of a multi-stage compressor or turbine are solved in the same calcArrays call, so adding
+    stages (or sweeping over many pressure ratios at once) does not add state solves.
+    All values are molar and in SI units:  T in K, P in Pa, energies in J/mol.
+    The states are numbered in the order the air goes through the cycle.  With nC compressor stages and nT turbine
+    stages there are K=2*nC+2*nT+2 states:
+    compressor inlet, (compressor stage exit, intercooler exit)*(nC-1), compressor exit, regenerator exit (cold side),
+    turbine inlet, (turbine stage exit, reheater exit)*(nT-1), turbine exit, regenerator exit (hot side).
+    """
+
+    def __init__(self, a=None):
+        self.air = air() if a is None else a
+
+    def getIndices(self, nC=1, nT=1):
+        """
+        Where each kind of state is in the cycle.
+        :return: dict of lists of state indices (0 based)
+        """
+        K = 2 * nC + 2 * nT + 2
+        return {'compIn': [0] + [2 + 2 * k for k in range(nC - 1)],
+                'compOut': [1 + 2 * k for k in range(nC)],
+                'regenCold': 2 * nC,
+                'turbIn': [2 * nC + 1] + [2 * nC + 3 + 2 * j for j in range(nT - 1)],
+                'turbOut': [2 * nC + 2 + 2 * j for j in range(nT)],
+                'regenHot': K - 1,
+                'K': K}
+
+    def compression(self, T1, P1, ratio, etaC=1.0, nStages=1):
+        """
+        Compression in nStages stages of equal pressure ratio with intercooling back to T1 between them.
+        :param T1: compressor inlet temperature(s) in K
+        :param P1: compressor inlet pressure(s) in Pa
+        :param ratio: overall pressure ratio(s)
+        :param etaC: isentropic efficiency of each stage
+        :param nStages: number of stages
+        :return: dicts of stage inlet and stage exit columns, each with shape (nStages, S)
+        """
+        a = self.air
+        T1, P1, ratio, etaC = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                                    for x in (T1, P1, ratio, etaC)])
+        P = P1 * ratio ** (np.arange(nStages + 1)[:, None] / nStages)
+        inlet = a.calcArrays(T=T1, P=P[:-1])
+        ideal = a.calcArrays(P=P[1:], s=inlet['s'])
+        exit = a.calcArrays(P=P[1:], h=inlet['h'] + (ideal['h'] - inlet['h']) / etaC)
+        return inlet, exit
+
+    def expansion(self, T_high, P2, ratio, etaT=1.0, nStages=1):
+        """
+        Expansion in nStages stages of equal pressure ratio with reheating back to T_high between them.
+        :param T_high: turbine inlet temperature(s) in K
+        :param P2: turbine inlet pressure(s) in Pa
+        :param ratio: overall pressure ratio(s)
+        :param etaT: isentropic efficiency of each stage
+        :param nStages: number of stages
+        :return: dicts of stage inlet and stage exit columns, each with shape (nStages, S)
+        """
+        a = self.air
+        T_high, P2, ratio, etaT = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float))
+                                                        for x in (T_high, P2, ratio, etaT)])
+        P = P2 / ratio ** (np.arange(nStages + 1)[:, None] / nStages)
+        inlet = a.calcArrays(T=T_high, P=P[:-1])
+        ideal = a.calcArrays(P=P[1:], s=inlet['s'])
+        exit = a.calcArrays(P=P[1:], h=inlet['h'] - etaT * (inlet['h'] - ideal['h']))
+        return inlet, exit
+
+    def regenerator(self, hC, PC, hE, PE, regen=0.0):
+        """
+        The regenerator heats the compressed air with the turbine exhaust.  It only transfers heat when the exhaust
+        is hotter than the compressed air.
+        :param hC: compressor exit enthalpy
+        :param PC: compressor exit pressure
+        :param hE: turbine exit enthalpy
+        :param PE: turbine exit pressure
+        :param regen: effectiveness (0 for no regenerator)
+        :return: cold side exit columns, hot side exit columns, heat transferred per mole
+        """
+        a = self.air
+        q = regen * np.maximum(np.asarray(hE) - np.asarray(hC), 0.0)
+        return a.calcArrays(P=PC, h=hC + q), a.calcArrays(P=PE, h=hE - q), q
+
+    def energies(self, h, nC=1, nT=1):
+        """
+        The work and heat terms from the enthalpies of the states (steady flow, so all in terms of h).
+        :param h: array of enthalpies with shape (K,) or (K, S) in state order
+        :return: dict of W_Compression, W_Power, Q_In, Q_Out, Q_Regen, W_Cycle and Eff (%)
+        """
+        I = self.getIndices(nC, nT)
+        h = np.asarray(h, dtype=float)
+        W_Compression = np.sum(h[I['compOut']] - h[I['compIn']], axis=0)
+        W_Power = np.sum(h[I['turbIn']] - h[I['turbOut']], axis=0)
+        # combustor after the regenerator and reheaters after each turbine stage but the last
+        Q_In = np.sum(h[I['turbIn']] - h[[I['regenCold']] + I['turbOut'][:-1]], axis=0)
+        # intercoolers after each compressor stage but the last and rejection after the regenerator
+        Q_Out = np.sum(h[I['compOut'][:-1]] - h[I['compIn'][1:]], axis=0) + h[I['regenHot']] - h[0]
+        Q_Regen = h[I['regenCold']] - h[I['compOut'][-1]]
+        W_Cycle = W_Power - W_Compression
+        return {'W_Compression': W_Compression, 'W_Power': W_Power, 'Q_In': Q_In, 'Q_Out': Q_Out,
+                'Q_Regen': Q_Regen, 'W_Cycle': W_Cycle, 'Eff': 100.0 * W_Cycle / Q_In}
+
+    def evaluate(self, T1=300.0, P1=101325.0, T_high=1400.0, ratio=10.0, etaC=1.0, etaT=1.0, regen=0.0,
+                 nCompression=1, nExpansion=1):
+        """
+        All the states and energy terms of a batch of cycles.  Any of the inputs except the stage counts can be
+        arrays of the same length S.
+        :return: dict of state columns with shape (K, S) and dict of energy terms with shape (S,)
+        """
+        ci, ce = self.compression(T1, P1, ratio, etaC, nCompression)
+        ti, te = self.expansion(T_high, ce['P'][-1], ratio, etaT, nExpansion)
+        cold, hot, q = self.regenerator(ce['h'][-1], ce['P'][-1], te['h'][-1], te['P'][-1], regen)
+        states = {}
+        for p in ('T', 'P', 'u', 'h', 's', 'v'):
+            rows = [ci[p][0]]
+            for k in range(nCompression):
+                rows += [ce[p][k]] + ([ci[p][k + 1]] if k < nCompression - 1 else [])
+            rows += [cold[p], ti[p][0]]
+            for j in range(nExpansion):
+                rows += [te[p][j]] + ([ti[p][j + 1]] if j < nExpansion - 1 else [])
+            rows += [hot[p]]
+            states[p] = np.array(rows)
+        return states, self.energies(states['h'], nCompression, nExpansion)
+
+    def legs(self, states, nC=1, nT=1, nPoints=30):
+        """
+        The path between each state and the next.  Compressor and turbine stages are drawn as straight lines in
+        s with P changing geometrically (the path of an irreversible stage is not defined, but its end states are),
+        everything else is at constant pressure.  All the legs of each kind are calculated in one batch.
+        :param states: dict of state columns with shape (K,)
+        :return: list of K dicts of columns, leg i goes from state i to state i+1 (the last one back to state 1)
+        """
+        a = self.air
+        I = self.getIndices(nC, nT)
+        K = I['K']
+        nxt = np.roll(np.arange(K), -1)
+        f = np.linspace(0.0, 1.0, nPoints)
+        stage = np.zeros(K, dtype=bool)
+        stage[I['compIn'] + I['turbIn']] = True
+        iS, iP = np.nonzero(stage)[0], np.nonzero(~stage)[0]
+        P, T, s = [np.asarray(states[p], dtype=float) for p in ('P', 'T', 's')]
+        legs = [None] * K
+        cols = a.calcArrays(P=P[iS, None] * (P[nxt[iS], None] / P[iS, None]) ** f,
+                            s=s[iS, None] + (s[nxt[iS], None] - s[iS, None]) * f)
+        for n, i in enumerate(iS):
+            legs[i] = {p: cols[p][n] for p in cols}
+        cols = a.calcArrays(T=T[iP, None] + (T[nxt[iP], None] - T[iP, None]) * f, P=P[iP, None])
+        for n, i in enumerate(iP):
+            legs[i] = {p: cols[p][n] for p in cols}
+        return legs
+
+
+class braytonCycleModel():
+    def __init__(self, p_initial=101325.0, v_cylinder=1.0E-3, t_initial=300.0, t_high=1400.0, ratio=10.0,
+                 eta_c=1.0, eta_t=1.0, regen=0.0, n_compression=1, n_expansion=1, name='Air Standard Brayton Cycle'):
+        """
+        Constructor for an air standard Brayton (gas turbine) cycle.  The simple cycle consists of four steady flow
+        processes:
+        1. Compression from P1 to P2=rp*P1 with an isentropic efficiency
+        2. Constant pressure heat addition to T High
+        3. Expansion from P2 to P1 with an isentropic efficiency
+        4. Constant pressure heat rejection.
+        A regenerator heats the compressed air with the turbine exhaust before the combustor.  The compression and
+        expansion can be split into stages of equal pressure ratio with intercooling (back to T1) and reheating
+        (back to T High) between the stages.  The number of states depends on the number of stages
+        (see braytonBatch).
+        Compressor work = sum(h exit-h inlet) over the compressor stages
+        Turbine work = sum(h inlet-h exit) over the turbine stages
+        Heat in = combustor + reheaters
+        Heat out = intercoolers + heat rejected after the regenerator
+        :param p_initial: compressor inlet pressure in Pa
+        :param v_cylinder: volume of air at the compressor inlet in m^3 (sets the amount of air)
+        :param t_initial: compressor inlet temperature in K
+        :param t_high: turbine inlet temperature in K
+        :param ratio: overall pressure ratio P2/P1
+        :param eta_c: isentropic efficiency of each compressor stage
+        :param eta_t: isentropic efficiency of each turbine stage
+        :param regen: regenerator effectiveness (0 for no regenerator)
+        :param n_compression: number of compressor stages
+        :param n_expansion: number of turbine stages
+        :param name: a name
+        """
+        self.units = units()
+        self.units.SI = False
+        self.air = air()  # the working fluid
+        self.p_initial = p_initial
+        self.T_initial = t_initial
+        self.T_high = t_high
+        self.Ratio = ratio  # the pressure ratio P2/P1
+        self.EtaC = eta_c
+        self.EtaT = eta_t
+        self.Regen = regen
+        self.V_Cylinder = v_cylinder
+        self.name = name
+        self.air.set(P=p_initial, T=t_initial)
+        self.air.n = self.V_Cylinder / self.air.State.v  # calculate number of moles of air
+        self.air.m = self.air.n * self.air.MW
+
+        self.W_Compression = 0.0
+        self.W_Power = 0.0
+        self.Q_In = 0.0
+        self.Q_Out = 0.0
+        self.Q_Regen = 0.0
+        self.W_Cycle = 0.0
+        self.Eff = 0.0
+
+        self.upperCurve = StateDataForPlotting()
+        self.lowerCurve = StateDataForPlotting()
+        self.statePoints = StateDataForPlotting()  # all the states as columns for the markers on the plot
+        self.PathPoints = 30  # number of points in each path leg
+        # each group of states and the path legs record what they depend on so the controller only recomputes
+        # what changed.  The number of stages changes which state is which, so everything depends on it.
+        self.dependencies = cycleDependencies(nodes={'Compression': ('p_initial', 'T_initial', 'Ratio', 'EtaC',
+                                                                     'NCompression'),
+                                                     'Expansion': ('Compression', 'T_high', 'EtaT', 'NExpansion'),
+                                                     'Regenerator': ('Compression', 'Expansion', 'Regen'),
+                                                     'Legs': ('Compression', 'Expansion', 'Regenerator',
+                                                              'PathPoints')})
+        self.energyNames = ['W_Compression', 'W_Power', 'Q_In', 'Q_Out', 'Q_Regen', 'W_Cycle', 'Eff']
+        self.setStages(n_compression, n_expansion)
+        self.calculated = False
+        self.cycleType = 'brayton'
+
+    def setStages(self, nCompression=1, nExpansion=1):
+        """
+        Sets the number of compressor and turbine stages and the state and leg names that go with them.
+        The state attributes are State1..StateK and leg i_j goes from state i to state j.
+        """
+        self.NCompression = nCompression
+        self.NExpansion = nExpansion
+        K = braytonBatch().getIndices(nCompression, nExpansion)['K']
+        # names of the attributes that make up a calculated result (see CycleCache.cycleResult)
+        self.stateNames = ['State{}'.format(i + 1) for i in range(K)]
+        self.legNames = ['leg{}_{}'.format(i + 1, (i + 1) % K + 1) for i in range(K)]
+        for name in self.legNames:
+            if not hasattr(self, name):
+                setattr(self, name, StateDataForPlotting())
+
+    def getKeyStates(self):
+        """
+        :return: compressor inlet, compressor exit, turbine inlet and turbine exit states
+        """
+        I = braytonBatch().getIndices(self.NCompression, self.NExpansion)
+        return [getattr(self, self.stateNames[i]) for i in (0, I['compOut'][-1], I['turbIn'][0], I['turbOut'][-1])]
+
+    def getSI(self):
+        return self.units.SI
+
+    def getPlotColumns(self, mass=False, total=False):
+        """
+        Gets all six property columns of the lower curve, upper curve and state points converted to the current
+        units on the requested basis.  These are cached by StateDataForPlotting, so only the first request for a
+        basis does any arithmetic.
+        :param mass: True for a mass basis
+        :param total: True for total (extensive) values
+        :return: lowerCurve, upperCurve, statePoints as dicts of lower case property name -> numpy array
+        """
+        args = dict(Units=self.units, mass=mass, total=total, n=self.air.n, MW=self.air.MW)
+        return (self.lowerCurve.getConvertedCols(**args), self.upperCurve.getConvertedCols(**args),
+                self.statePoints.getConvertedCols(**args))
+
+
+class braytonCycleController():
+    def __init__(self, model=None, ax=None):
+        self.model = braytonCycleModel() if model is None else model
+        self.view = braytonCycleView()
+        self.view.ax = ax
+        self.cache = None  # an optional CycleCache.cycleResultCache shared between controllers
+        self.batch = braytonBatch()
+
+    # region Functions that operate on the model (i.e., change model state)
+    def calc(self):
+        self.set(**self.getInputs())
+
+    def getInputs(self):
+        """
+        Reads the values from the GUI.  The T High box holds the turbine inlet temperature and the compression ratio
+        box holds the pressure ratio.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
+        T0 = float(self.view.le_TLow.text())
+        P0 = float(self.view.le_P0.text())
+        V0 = float(self.view.le_V0.text())
+        TH = float(self.view.le_THigh.text())
+        PR = float(self.view.le_CR.text())
+        etaC = float(self.view.le_EtaC.text())
+        etaT = float(self.view.le_EtaT.text())
+        regen = float(self.view.le_Regen.text())
+        nC = self.view.spn_NCompression.value()
+        nT = self.view.spn_NExpansion.value()
+        metric = self.view.rdo_Metric.isChecked()
+        return dict(T_0=T0, P_0=P0, V_0=V0, T_High=TH, ratio=PR, etaC=etaC, etaT=etaT, regen=regen,
+                    nCompression=nC, nExpansion=nT, SI=metric)
+
+    def getModelInputs(self, model=None):
+        """
+        The inputs the model was last calculated with, in SI units.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
+        model = self.model if model is None else model
+        return dict(T_0=model.T_initial, P_0=model.p_initial, V_0=model.V_Cylinder, T_High=model.T_high,
+                    ratio=model.Ratio, etaC=model.EtaC, etaT=model.EtaT, regen=model.Regen,
+                    nCompression=model.NCompression, nExpansion=model.NExpansion, SI=True)
+
+    def set(self, T_0=300.0, P_0=101325.0, V_0=1.0E-3, T_High=1400.0, ratio=10.0, etaC=1.0, etaT=1.0, regen=0.0,
+            nCompression=1, nExpansion=1, SI=True):
+        """
+        Sets the compressor inlet state of the air and converts units from input
+        :param T_0: Compressor inlet temperature in absolute units (R or K)
+        :param P_0: Compressor inlet pressure in (atm or pa)
+        :param V_0: Volume of air at the compressor inlet in (ft^3 or m^3)
+        :param T_High: Turbine inlet temperature in (R or K)
+        :param ratio: Pressure ratio
+        :param etaC: isentropic efficiency of each compressor stage
+        :param etaT: isentropic efficiency of each turbine stage
+        :param regen: regenerator effectiveness
+        :param nCompression: number of compressor stages (intercooled)
+        :param nExpansion: number of turbine stages (reheated)
+        :param SI: boolean
+        :return: none
+        """
+        self.calcModel(self.model, T_0=T_0, P_0=P_0, V_0=V_0, T_High=T_High, ratio=ratio, etaC=etaC, etaT=etaT,
+                       regen=regen, nCompression=nCompression, nExpansion=nExpansion, SI=SI)
+        self.updateView()
+
+    def calcModel(self, model, T_0=300.0, P_0=101325.0, V_0=1.0E-3, T_High=1400.0, ratio=10.0, etaC=1.0, etaT=1.0,
+                  regen=0.0, nCompression=1, nExpansion=1, SI=True, progress=None, cancel=None):
+        """
+        Does the work of set() on the given model without touching the view.  This lets a worker thread calculate
+        on a copy of the model and hand it back to the GUI thread when it is done.
+        :param model: the cycle model to calculate
+        :param progress: optional callback progress(name, done, total) called as each group of states is finished
+        :param cancel: optional callable that returns True to stop the calculation (raises calculationCancelled)
+        :return: the model
+        """
+        if ratio <= 1.0:
+            raise ValueError('the pressure ratio must be greater than 1')
+        if not (0.0 < etaC <= 1.0 and 0.0 < etaT <= 1.0):
+            raise ValueError('the compressor and turbine efficiencies must be between 0 and 1')
+        if not 0.0 <= regen <= 1.0:
+            raise ValueError('the regenerator effectiveness must be between 0 and 1')
+        if int(nCompression) < 1 or int(nExpansion) < 1:
+            raise ValueError('there must be at least one compressor and one turbine stage')
+        dep = model.dependencies
+        model.units.set(SI=SI)
+        model.T_initial = T_0 if SI else T_0 / model.units.CF_T
+        model.p_initial = P_0 if SI else P_0 / model.units.CF_P
+        model.T_high = T_High if SI else T_High / model.units.CF_T
+        model.V_Cylinder = V_0 if SI else V_0 / model.units.CF_V
+        model.Ratio = ratio
+        model.EtaC = etaC
+        model.EtaT = etaT
+        model.Regen = regen
+        model.setStages(int(nCompression), int(nExpansion))
+        # inputs are compared in SI units, so switching units alone does not invalidate anything.  The tolerance
+        # keeps values that were only rounded for display (e.g., T in K to 2 decimals) from counting as a change.
+        dep.setInputs(rel_tol=5.0E-5, p_initial=model.p_initial, T_initial=model.T_initial, T_high=model.T_high,
+                      Ratio=model.Ratio, EtaC=model.EtaC, EtaT=model.EtaT, Regen=model.Regen,
+                      NCompression=model.NCompression, NExpansion=model.NExpansion, PathPoints=model.PathPoints)
+        model.p_initial = dep.inputs['p_initial']
+        model.T_initial = dep.inputs['T_initial']
+        model.T_high = dep.inputs['T_high']
+        model.Ratio = dep.inputs['Ratio']
+        model.EtaC = dep.inputs['EtaC']
+        model.EtaT = dep.inputs['EtaT']
+        model.Regen = dep.inputs['Regen']
+
+        dep.setHooks(progress=progress, cancel=cancel)
+        try:
+            # if the states are not all current, see if this calculation has already been done
+            dirty = dep.getDirty()
+            key, result = None, None
+            if dirty and self.cache is not None:
+                key = self.cache.makeKey(model.cycleType, dep.inputs)
+                result = self.cache.get(key)
+                if result is not None:
+                    result.restore(model)
+
+            self.calcStates(model)
+
+            model.air.n = model.V_Cylinder / model.State1.v  # calculate number of moles of air
+            model.air.m = model.air.n * model.air.MW
+
+            h = [getattr(model, name).h for name in model.stateNames]
+            for name, val in self.batch.energies(h, model.NCompression, model.NExpansion).items():
+                setattr(model, name, float(val))
+            model.calculated = True
+
+            self.buildDataForPlotting(model)
+            if dirty and result is None and self.cache is not None:
+                self.cache.put(key, cycleResult().store(model))
+        finally:
+            dep.setHooks()
+        return model
+
+    def export(self, fileName):
+        """
+        Writes the states, energy terms and path legs of the model in every unit basis to a .npz or .csv file.
+        :param fileName: the extension picks the format
+        """
+        cycleExporter().export(self.model, fileName, inputs=self.getModelInputs())
+
+    def exportSweep(self, fileName, sweep, progress=None):
+        """
+        Calculates a sweep of cycles on a copy of the model and writes them to a .npz or .csv file as it goes.
+        :param sweep: an iterable of dicts of calcModel inputs
+        :return: number of runs written
+        """
+        return cycleExporter().exportSweep(self, sweep, fileName, progress=progress)
+
+    def setCache(self, cache=None):
+        """
+        Sets the result cache used by set().
+        :param cache: a CycleCache.cycleResultCache or None to turn caching off
+        """
+        self.cache = cache
+
+    def setStates(self, model, indices, cols, labels):
+        """
+        Stores columns from the batch calculation as the model's states.
+        :param indices: state indices (0 based)
+        :param cols: dict of columns with the states in the same order as indices
+        :param labels: a name for each state
+        """
+        for n, (i, label) in enumerate(zip(indices, labels)):
+            st = stateProps()
+            st.name = 'State {} - {}'.format(i + 1, label)
+            st.T, st.P, st.u, st.h, st.s, st.v = [float(np.ravel(cols[p])[n]) for p in ('T', 'P', 'u', 'h', 's', 'v')]
+            setattr(model, model.stateNames[i], st)
+
+    def calcStates(self, model=None):
+        """
+        Recalculates only the groups of states that were invalidated by a change of input.  Each group is one batch
+        calculation however many stages there are.
+        Note that all state calculations are for molar values.
+        :return: none
+        """
+        model = self.model if model is None else model
+        dep = model.dependencies
+        nC, nT = model.NCompression, model.NExpansion
+        I = self.batch.getIndices(nC, nT)
+        if dep.startNode('Compression'):
+            inlet, exit = self.batch.compression(model.T_initial, model.p_initial, model.Ratio, model.EtaC, nC)
+            self.setStates(model, I['compIn'], inlet,
+                           ['Compressor inlet'] + ['Intercooler {} exit'.format(k + 1) for k in range(nC - 1)])
+            self.setStates(model, I['compOut'], exit,
+                           ['Compressor {} exit'.format(k + 1) for k in range(nC - 1)] + ['Compressor exit'])
+            dep.finishNode('Compression')
+        if dep.startNode('Expansion'):
+            P2 = getattr(model, model.stateNames[I['compOut'][-1]]).P
+            inlet, exit = self.batch.expansion(model.T_high, P2, model.Ratio, model.EtaT, nT)
+            self.setStates(model, I['turbIn'], inlet,
+                           ['Turbine inlet'] + ['Reheater {} exit'.format(j + 1) for j in range(nT - 1)])
+            self.setStates(model, I['turbOut'], exit,
+                           ['Turbine {} exit'.format(j + 1) for j in range(nT - 1)] + ['Turbine exit'])
+            dep.finishNode('Expansion')
+        if dep.startNode('Regenerator'):
+            C = getattr(model, model.stateNames[I['compOut'][-1]])
+            E = getattr(model, model.stateNames[I['turbOut'][-1]])
+            cold, hot, q = self.batch.regenerator(C.h, C.P, E.h, E.P, model.Regen)
+            self.setStates(model, [I['regenCold'], I['regenHot']],
+                           {p: np.array([cold[p], hot[p]]) for p in cold},
+                           ['Regenerator exit (cold side)', 'Regenerator exit (hot side)'])
+            dep.finishNode('Regenerator')
+
+    def buildDataForPlotting(self, model=None):
+        """
+        Builds a path leg from each state to the next in two batches (see braytonBatch.legs).
+        The lowerCurve data set is the compression (with any intercooling) and the upperCurve is everything else.
+        :return:
+        """
+        model = self.model if model is None else model
+        dep = model.dependencies
+        nC, nT = model.NCompression, model.NExpansion
+        if dep.startNode('Legs'):
+            states = {p: np.array([getattr(model, name).getVal(p) for name in model.stateNames])
+                      for p in ('T', 'P', 's')}
+            for name, cols in zip(model.legNames, self.batch.legs(states, nC, nT, model.PathPoints)):
+                leg = getattr(model, name)
+                leg.clear()
+                for p in ('T', 'P', 'u', 'h', 's', 'v'):
+                    setattr(leg, p, list(cols[p]))
+            dep.finishNode('Legs')
+
+        # piece together the lowerCurve from the compressor legs and the upperCurve from the rest
+        nLower = 2 * nC - 1
+        model.lowerCurve.clear()
+        for name in model.legNames[:nLower]:
+            model.lowerCurve.extend(getattr(model, name))
+        model.upperCurve.clear()
+        for name in model.legNames[nLower:]:
+            model.upperCurve.extend(getattr(model, name))
+        model.statePoints.clear()
+        for name in model.stateNames:
+            state = getattr(model, name)
+            model.statePoints.add((state.T, state.P, state.u, state.h, state.s, state.v))
+
+    # endregion
+
+    # region Functions that operate on the view
+    def plot_cycle_XY(self, X='s', Y='T', logx=False, logy=False, mass=False, total=False):
+        self.view.plot_cycle_XY(self.model, X=X, Y=Y, logx=logx, logy=logy, mass=mass, total=total)
+
+    def print_summary(self):
+        self.view.print_summary(self.model)
+
+    def setWidgets(self, w=None, extra=None):
+        """
+        Takes the same list of widgets as the other cycle controllers plus the widgets only the Brayton cycle uses.
+        :param w: the list of widgets shared by all the cycle controllers
+        :param extra: [le_EtaC, le_EtaT, le_Regen, spn_NCompression, spn_NExpansion]
+        """
+        self.view.lbl_THigh, self.view.lbl_TLow, self.view.lbl_P0, self.view.lbl_V0, self.view.lbl_CR, \
+            self.view.le_THigh, self.view.le_TLow, self.view.le_P0, self.view.le_V0, self.view.le_CR, \
+            self.view.le_T1, self.view.le_T2, self.view.le_T3, self.view.le_T4, \
+            self.view.lbl_T1Units, self.view.lbl_T2Units, self.view.lbl_T3Units, self.view.lbl_T4Units, \
+            self.view.le_PowerStroke, self.view.le_CompressionStroke, self.view.le_HeatAdded, self.view.le_Efficiency, \
+            self.view.lbl_PowerStrokeUnits, self.view.lbl_CompressionStrokeUnits, self.view.lbl_HeatInUnits, \
+            self.view.rdo_Metric, self.view.cmb_Abcissa, self.view.cmb_Ordinate, \
+            self.view.chk_LogAbcissa, self.view.chk_LogOrdinate, self.view.ax, self.view.canvas = w
+        if extra is not None:
+            self.view.le_EtaC, self.view.le_EtaT, self.view.le_Regen, self.view.spn_NCompression, \
+                self.view.spn_NExpansion = extra
+
+    def updateView(self):
+        self.view.updateView(cycle=self.model)
+    # endregion
+
+
+class braytonCycleView():
+    def __init__(self):
+        # region define some widgets
+        self.lbl_THigh = qtw.QLabel()
+        self.lbl_TLow = qtw.QLabel()
+        self.lbl_P0 = qtw.QLabel()
+        self.lbl_V0 = qtw.QLabel()
+        self.lbl_CR = qtw.QLabel()
+        self.le_THigh = qtw.QLineEdit()
+        self.le_TLow = qtw.QLineEdit()
+        self.le_P0 = qtw.QLineEdit()
+        self.le_V0 = qtw.QLineEdit()
+        self.le_CR = qtw.QLineEdit()
+        self.le_EtaC = qtw.QLineEdit('1.0')
+        self.le_EtaT = qtw.QLineEdit('1.0')
+        self.le_Regen = qtw.QLineEdit('0.0')
+        self.spn_NCompression = qtw.QSpinBox()
+        self.spn_NExpansion = qtw.QSpinBox()
+        self.le_T1 = qtw.QLineEdit()
+        self.le_T2 = qtw.QLineEdit()
+        self.le_T3 = qtw.QLineEdit()
+        self.le_T4 = qtw.QLineEdit()
+        self.lbl_T1Units = qtw.QLabel()
+        self.lbl_T2Units = qtw.QLabel()
+        self.lbl_T3Units = qtw.QLabel()
+        self.lbl_T4Units = qtw.QLabel()
+        self.le_Efficiency = qtw.QLineEdit()
+        self.le_PowerStroke = qtw.QLineEdit()
+        self.le_CompressionStroke = qtw.QLineEdit()
+        self.le_HeatAdded = qtw.QLineEdit()
+        self.lbl_PowerStrokeUnits = qtw.QLabel()
+        self.lbl_CompressionStrokeUnits = qtw.QLabel()
+        self.lbl_HeatInUnits = qtw.QLabel()
+        self.rdo_Metric = qtw.QRadioButton()
+        self.cmb_Abcissa = qtw.QComboBox()
+        self.cmb_Ordinate = qtw.QComboBox()
+        self.chk_LogAbcissa = qtw.QCheckBox()
+        self.chk_LogOrdinate = qtw.QCheckBox()
+        self.canvas = None
+        self.ax = None
+        # endregion
+        for spn in (self.spn_NCompression, self.spn_NExpansion):
+            spn.setRange(1, 10)
+        self.artists = cyclePlotArtists()  # the plot artists are created once and then updated
+        self.summary = ''  # text to show on the plot (e.g., the result of an optimization)
+
+    def updateView(self, cycle):
+        cycle.units.set(SI=self.rdo_Metric.isChecked())
+        logx = self.chk_LogAbcissa.isChecked()
+        logy = self.chk_LogOrdinate.isChecked()
+        xvar = self.cmb_Abcissa.currentText()
+        yvar = self.cmb_Ordinate.currentText()
+        if cycle.calculated:
+            self.plot_cycle_XY(cycle, X=xvar, Y=yvar, logx=logx, logy=logy, mass=False, total=True)
+        self.updateDisplayWidgets(Model=cycle)
+
+    def print_summary(self, cycle):
+        print('Cycle Summary for: ', cycle.name)
+        print('\tEfficiency: {:0.3f}%'.format(cycle.Eff))
+        print('\tTurbine Work: {:0.3f} J/mol'.format(cycle.W_Power))
+        print('\tCompressor Work: {:0.3f} J/mol'.format(cycle.W_Compression))
+        print('\tBack Work Ratio: {:0.3f}'.format(cycle.W_Compression / cycle.W_Power))
+        print('\tHeat Added: {:0.3f} J/mol'.format(cycle.Q_In))
+        print('\tHeat Regenerated: {:0.3f} J/mol'.format(cycle.Q_Regen))
+        for name in cycle.stateNames:
+            st = getattr(cycle, name)
+            print('\t{}: T={:0.2f} K, P={:0.1f} Pa'.format(st.name, st.T, st.P))
+
+    def plot_cycle_XY(self, cycle, X='s', Y='T', logx=False, logy=False, mass=False, total=False):
+        """
+        I want to plot any two thermodynaimc properties on X and Y
+        Data is in molar metric units.  I may need to convert it.
+        The curves and markers are created once by self.artists and updated in place after that.
+        :param X: letter for which variable to plot on X axis
+        :param Y: letter for which variable to plot on Y axis
+        :return:
+        """
+        if X == Y:
+            return
+        QTPlotting = True  # assumes we are plotting onto a QT GUI form
+        if self.ax == None:
+            self.ax = plt.subplot()
+            QTPlotting = False  # actually, we are just using CLI and showing the plot
+
+        # the upper and lower curves and the states using the columns cached for this basis
+        LC, UC, ST = cycle.getPlotColumns(mass=mass, total=total)
+        x, y = X.lower(), Y.lower()
+
+        # axis labels
+        cycle.units.setPlotUnits(SI=cycle.units.SI, mass=mass, total=total)
+        xlabel = cycle.lowerCurve.getAxisLabel(X, Units=cycle.units)
+        ylabel = cycle.lowerCurve.getAxisLabel(Y, Units=cycle.units)
+
+        # put a title on the plot
+        cycle.name = 'Brayton Cycle'
+
+        self.artists.plot(self.ax, self.canvas if QTPlotting else None, curves=[(LC[x], LC[y]), (UC[x], UC[y])],
+                          markers=(ST[x], ST[y]), xlabel=xlabel, ylabel=ylabel, title=cycle.name, logx=logx,
+                          logy=logy, summary=self.summary)
+
+    def updateDisplayWidgets(self, Model=None):
+        # fill out the temperature values
+        U = Model.units
+        SI = U.SI
+
+        self.lbl_THigh.setText('T High ({})'.format(Model.units.TUnits))
+        self.lbl_TLow.setText('T Low ({})'.format(Model.units.TUnits))
+        self.lbl_P0.setText('P0 ({})'.format(Model.units.PUnits))
+        self.lbl_V0.setText('V0 ({})'.format(Model.units.VUnits))
+        self.lbl_CR.setText('Pressure Ratio')
+
+        self.lbl_T1Units.setText(Model.units.TUnits)
+        self.lbl_T2Units.setText(Model.units.TUnits)
+        self.lbl_T3Units.setText(Model.units.TUnits)
+        self.lbl_T4Units.setText(Model.units.TUnits)
+
+        if Model.units.changed or Model.calculated:
+            if Model.calculated:
+                CFE = 1.0 if SI else U.CF_E
+                CFP = 1.0 if SI else U.CF_P
+                CFV = 1.0 if SI else U.CF_V
+                self.le_TLow.setText(('{:0.2f}'.format(Model.T_initial if SI else U.T_KtoR(Model.T_initial))))
+                self.le_THigh.setText(('{:0.2f}'.format(Model.T_high if SI else U.T_KtoR(Model.T_high))))
+                self.le_P0.setText('{:0.2f}'.format(Model.p_initial * CFP))
+                self.le_V0.setText('{:0.4f}'.format(Model.V_Cylinder * CFV))
+                self.le_CR.setText('{:0}'.format(Model.Ratio))
+                self.le_EtaC.setText('{:0}'.format(Model.EtaC))
+                self.le_EtaT.setText('{:0}'.format(Model.EtaT))
+                self.le_Regen.setText('{:0}'.format(Model.Regen))
+                self.spn_NCompression.setValue(Model.NCompression)
+                self.spn_NExpansion.setValue(Model.NExpansion)
+
+                # T1-T4 are the compressor inlet and exit and the turbine inlet and exit
+                for le, state in zip((self.le_T1, self.le_T2, self.le_T3, self.le_T4), Model.getKeyStates()):
+                    le.setText('{:0.2f}'.format(state.T if SI else U.T_KtoR(state.T)))
+
+                # fill out the other properties for the brayton cycle
+                self.le_Efficiency.setText('{:0.3f}'.format(Model.Eff))
+                self.le_PowerStroke.setText('{:0.3f}'.format(Model.air.n * Model.W_Power * CFE))
+                self.le_CompressionStroke.setText('{:0.3f}'.format(Model.air.n * Model.W_Compression * CFE))
+                self.le_HeatAdded.setText('{:0.3f}'.format(Model.air.n * Model.Q_In * CFE))
+                self.lbl_PowerStrokeUnits.setText(Model.units.EUnits)
+                self.lbl_CompressionStrokeUnits.setText(Model.units.EUnits)
+                self.lbl_HeatInUnits.setText(Model.units.EUnits)
+            else:
+                CFP = 1 / U.CF_P if SI else U.CF_P
+                CFV = 1 / U.CF_V if SI else U.CF_V
+                t_initial = float(self.le_TLow.text())
+                t_high = float(self.le_THigh.text())
+                p_initial = float(self.le_P0.text())
+                v_initial = float(self.le_V0.text())
+                self.le_TLow.setText(('{:0.2f}'.format(U.T_RtoK(t_initial) if SI else U.T_KtoR(t_initial))))
+                self.le_THigh.setText(('{:0.2f}'.format(U.T_RtoK(t_high) if SI else U.T_KtoR(t_high))))
+                self.le_P0.setText('{:0.2f}'.format(p_initial * CFP))
+                self.le_V0.setText('{:0.4f}'.format(v_initial * CFV))
+            Model.units.changed = False
+
+
+def braytonSweep(ratios, nCompression=(1,), nExpansion=(1,), T_initial=300.0, p_initial=101325.0, T_high=1400.0,
+                 etaC=1.0, etaT=1.0, regen=0.0):
+    """
+    Evaluates Brayton cycles over pressure ratios and numbers of compressor and turbine stages.  Each combination of
+    stage counts is one batch over all the pressure ratios.
+    :param ratios: array of pressure ratios
+    :param nCompression: numbers of compressor stages to try
+    :param nExpansion: numbers of turbine stages to try
+    :return: dict of energy terms (J/mol) and Eff (%), each with shape (len(nCompression), len(nExpansion), len(ratios))
+    """
+    batch = braytonBatch()
+    ratios = np.atleast_1d(np.asarray(ratios, dtype=float))
+    out = {}
+    for i, nC in enumerate(nCompression):
+        for j, nT in enumerate(nExpansion):
+            states, E = batch.evaluate(T_initial, p_initial, T_high, ratios, etaC, etaT, regen, nC, nT)
+            for name, val in E.items():
+                out.setdefault(name, np.zeros((len(nCompression), len(nExpansion), len(ratios))))[i, j] = val
+    return out
+# endregion
+
+
+def main():
+    bc = braytonCycleController()
+    bc.set(T_0=300.0, P_0=101325.0, V_0=1.0E-3, T_High=1400.0, ratio=10.0, etaC=0.85, etaT=0.88, regen=0.8,
+           nCompression=2, nExpansion=2, SI=True)
+    bc.print_summary()
+    sweep = braytonSweep(np.linspace(2.0, 30.0, 200), nCompression=(1, 2, 3), nExpansion=(1, 2, 3), etaC=0.85,
+                         etaT=0.88, regen=0.8)
+    print('best efficiency {:0.2f}%'.format(np.max(sweep['Eff'])))
+    bc.plot_cycle_XY(X='s', Y='T', total=True)
+    plt.show()
+
+
+if __name__ == "__main__":
+    app = qtw.QApplication(sys.argv)
+    main()
@@ -0,0 +1,177 @@
+# region imports
+import numpy as np
+from matplotlib.patches import Rectangle, Circle
+from PyQt5 import QtCore as qtc
+
+
+# endregion
+
+# region class definitions
+class cycleAnimator():
+    """
+    Animates a marker going around the cycle on an existing plot together with a piston and crank schematic.
+    All the frames (marker position, piston and crank positions) are worked out from the path data when the
+    animation starts, and a QTimer just steps through them, blitting the few animated artists onto a cached
+    background, so nothing is solved or redrawn while it plays.
+    """
+    # schematic geometry in arbitrary units:  crank radius and connecting rod length
+    crankRadius = 1.0
+    rodLength = 3.5
+    pistonHeight = 0.9
+    bore = 2.2
+
+    def __init__(self, fps=60, cycleTime=4.0):
+        """
+        :param fps: frames per second
+        :param cycleTime: seconds for the marker to go around the cycle once
+        """
+        self.fps = fps
+        self.cycleTime = cycleTime
+        self.timer = qtc.QTimer()
+        self.timer.setInterval(int(round(1000.0 / fps)))
+        self.timer.timeout.connect(self.nextFrame)
+        self.ax = None
+        self.canvas = None
+        self.pistonAx = None
+        self.artists = []
+        self.background = None
+        self.drawCid = None
+        self.frame = 0
+        self.frames = None  # dict of arrays, one value per frame
+
+    def isRunning(self):
+        return self.timer.isActive()
+
+    def buildFrames(self, model, X='v', Y='P', mass=False, total=True):
+        """
+        Works out every frame from the model's path data.  The marker goes 1-2 along the lower curve and then
+        around the upper curve, one path point per frame step, resampled to the number of frames in a cycle.
+        :param model: a calculated cycle model with getPlotColumns
+        :param X: letter for the x axis variable
+        :param Y: letter for the y axis variable
+        :return: dict of frame arrays: x, y, pistonY, pinX, pinY
+        """
+        LC, UC, ST = model.getPlotColumns(mass=mass, total=total)
+        x, y = X.lower(), Y.lower()
+        px = np.concatenate([LC[x], UC[x]])
+        py = np.concatenate([LC[y], UC[y]])
+        pv = np.concatenate([LC['v'], UC['v']])
+        nFrames = max(int(round(self.fps * self.cycleTime)), 2)
+        s = np.linspace(0.0, len(px) - 1.0, nFrames)
+        idx = np.arange(len(px))
+        fx, fy, fv = np.interp(s, idx, px), np.interp(s, idx, py), np.interp(s, idx, pv)
+
+        # crank angle from the volume:  0 at TDC, pi at BDC.  The volume goes down on compression (pi to 2pi) and
+        # up on expansion (0 to pi).  During constant volume processes the crank is held where it is.
+        vMin, vMax = pv.min(), pv.max()
+        if vMax > vMin:
+            f = np.clip((fv - vMin) / (vMax - vMin), 0.0, 1.0)
+            phi = np.arccos(1.0 - 2.0 * f)
+            dv = np.gradient(fv)
+            lastMoving = np.maximum.accumulate(np.where(np.abs(dv) > 1.0E-9 * vMax, np.arange(nFrames), 0))
+            compressing = dv[lastMoving] < 0
+            theta = np.where(compressing, 2.0 * np.pi - phi, phi)
+        else:
+            theta = np.zeros(nFrames)  # the volume never changes (or is not a number), so the crank holds at TDC
+        a, l = self.crankRadius, self.rodLength
+        pinX = a * np.sin(theta)
+        pinY = a * np.cos(theta)
+        pistonY = pinY + np.sqrt(l ** 2 - pinX ** 2)
+        self.frames = {'x': fx, 'y': fy, 'pistonY': pistonY, 'pinX': pinX, 'pinY': pinY}
+        return self.frames
+
+    def createSchematic(self, parentAx):
+        """
+        Adds a small inset axes in the lower right of the plot with the cylinder outline, and the animated piston,
+        rod and crank.
+        """
+        a, l, h, b = self.crankRadius, self.rodLength, self.pistonHeight, self.bore
+        self.pistonAx = parentAx.inset_axes([0.80, 0.03, 0.18, 0.40])
+        ax = self.pistonAx
+        ax.set_xlim(-1.6, 1.6)
+        ax.set_ylim(-1.4, l + a + h + 1.0)
+        ax.set_aspect('equal')
+        ax.axis('off')
+        top = l + a + h + 0.5  # cylinder head, leaving a clearance volume above the piston at TDC
+        ax.plot([-b / 2, -b / 2, b / 2, b / 2], [l - a - 0.2, top, top, l - a - 0.2], color='k', lw=2)
+        ax.add_patch(Circle((0.0, 0.0), a, fill=False, linestyle=':', edgecolor='gray'))  # crank pin path
+        piston = Rectangle((-b / 2 + 0.05, 0.0), b - 0.1, h, facecolor='silver', edgecolor='k', animated=True)
+        ax.add_patch(piston)
+        rod = ax.plot([], [], color='dimgray', lw=3, animated=True)[0]
+        crank = ax.plot([], [], color='k', lw=3, marker='o', markersize=4, animated=True)[0]
+        return piston, rod, crank
+
+    def start(self, ax, canvas, model, X='v', Y='P', mass=False, total=True):
+        """
+        Builds the frames and starts playing them on ax.
+        :param ax: the axes the cycle is plotted on
+        :param canvas: the FigureCanvas
+        :param model: a calculated cycle model
+        """
+        self.stop()
+        if not model.calculated or X == Y:
+            return
+        self.buildFrames(model, X=X, Y=Y, mass=mass, total=total)
+        self.ax = ax
+        self.canvas = canvas
+        marker = ax.plot([], [], linestyle='', marker='o', markersize=10, markerfacecolor='r',
+                         markeredgecolor='k', animated=True)[0]
+        piston, rod, crank = self.createSchematic(ax)
+        self.artists = [marker, piston, rod, crank]
+        self.frame = 0
+        self.drawCid = canvas.mpl_connect('draw_event', self.onDraw)
+        canvas.draw()  # onDraw caches the background
+        self.timer.start()
+
+    def stop(self):
+        """
+        Stops playing and removes the animated artists and the schematic.
+        """
+        self.timer.stop()
+        if self.canvas is not None and self.drawCid is not None:
+            self.canvas.mpl_disconnect(self.drawCid)
+        self.drawCid = None
+        for artist in self.artists:
+            try:
+                artist.remove()
+            except (ValueError, NotImplementedError, AttributeError):
+                pass  # the axes were cleared already
+        self.artists = []
+        if self.pistonAx is not None:
+            try:
+                self.pistonAx.remove()
+            except (ValueError, KeyError):
+                pass
+            self.pistonAx = None
+            if self.canvas is not None:
+                self.canvas.draw_idle()
+        self.background = None
+
+    def onDraw(self, event=None):
+        """
+        After every full draw (e.g., a resize), grab the new background and draw the current frame on it.
+        """
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.drawFrame()
+
+    def drawFrame(self):
+        marker, piston, rod, crank = self.artists
+        i = self.frame
+        F = self.frames
+        marker.set_data([F['x'][i]], [F['y'][i]])
+        piston.set_y(F['pistonY'][i])
+        rod.set_data([F['pinX'][i], 0.0], [F['pinY'][i], F['pistonY'][i]])
+        crank.set_data([0.0, F['pinX'][i]], [0.0, F['pinY'][i]])
+        self.ax.draw_artist(marker)
+        for artist in (piston, rod, crank):
+            self.pistonAx.draw_artist(artist)
+
+    def nextFrame(self):
+        if self.background is None or not self.artists:
+            return
+        self.frame = (self.frame + 1) % len(self.frames['x'])
+        self.canvas.restore_region(self.background)
+        self.drawFrame()
+        self.canvas.blit(self.canvas.figure.bbox)
+# endregion
+
@@ -0,0 +1,219 @@
+# region imports
+import os
+import sys
+import json
+import time
+import math
+import platform
+import argparse
+import statistics
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # the views create Qt widgets, but nothing is shown
+import matplotlib
+matplotlib.use('Agg')  # before anything imports pyplot, so plotting is timed without a GUI
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PyQt5 import QtWidgets as qtw
+from CyclePlot import cyclePlotArtists
+from Otto import ottoCycleModel, ottoCycleController
+from Diesel import dieselCycleModel, dieselCycleController
+from Dual import dualCycleModel, dualCycleController
+from Brayton import braytonCycleModel, braytonCycleController
+
+
+# endregion
+
+# region class definitions
+class cycleBenchmark():
+    """
+    Times the parts of a cycle calculation for each cycle type:
+    construct - building the model (air object, empty curves, dependency graph)
+    calc - calcModel from scratch (every state and leg dirty, no result cache)
+    set - the controller's set() from scratch including the view update, plotted on an Agg canvas
+    build - buildDataForPlotting with only the path legs dirty
+    plot - plot_cycle_XY onto a fresh set of artists (creates the lines and draws the figure)
+    replot - plot_cycle_XY again with the artists already created
+    Everything but construct is repeated for each path resolution (points per leg).  Each timing is run repeat
+    times and the min, median and mean are kept; the min is what gets compared against a baseline since it is the
+    least sensitive to other load on the machine.
+    """
+    # keyword arguments for set() of each cycle type (SI units)
+    cycles = {'otto': (ottoCycleModel, ottoCycleController,
+                       dict(T_0=300.0, P_0=100000.0, V_0=0.001, T_High=1800.0, ratio=8.0, SI=True)),
+              'diesel': (dieselCycleModel, dieselCycleController,
+                         dict(T_0=300.0, P_0=100000.0, V_0=0.001, cutoff=2.0, ratio=18.0, SI=True)),
+              'dual': (dualCycleModel, dualCycleController,
+                       dict(T_0=300.0, P_0=100000.0, V_0=0.001, pressureRatio=1.5, cutoff=1.2, ratio=18.0,
+                            SI=True)),
+              'brayton': (braytonCycleModel, braytonCycleController,
+                          dict(T_0=300.0, P_0=101325.0, V_0=0.001, T_High=1400.0, ratio=10.0, etaC=0.85,
+                               etaT=0.9, regen=0.7, nCompression=2, nExpansion=2, SI=True))}
+
+    def __init__(self, cycleTypes=('otto', 'diesel', 'dual'), points=(30, 100, 300), repeat=10, X='v', Y='P'):
+        """
+        :param cycleTypes: cycle types to time (keys of cycleBenchmark.cycles)
+        :param points: path resolutions (points per leg)
+        :param repeat: number of times each timing is run
+        :param X: x axis variable for the plot timings
+        :param Y: y axis variable for the plot timings
+        """
+        for c in cycleTypes:
+            if c not in self.cycles:
+                raise ValueError('unknown cycle type {}'.format(c))
+        self.cycleTypes = tuple(cycleTypes)
+        self.points = tuple(int(n) for n in points)
+        self.repeat = max(int(repeat), 1)
+        self.X = X
+        self.Y = Y
+        self.results = {}
+
+    def time(self, func, setup=None):
+        """
+        Runs setup() then times func() repeat times.
+        :return: dict of min_ms, median_ms, mean_ms and runs
+        """
+        times = []
+        for i in range(self.repeat):
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            func()
+            times.append(1000.0 * (time.perf_counter() - t0))
+        return {'min_ms': min(times), 'median_ms': statistics.median(times), 'mean_ms': statistics.mean(times),
+                'runs': len(times)}
+
+    def makeController(self, cycleType, nPoints):
+        """
+        A controller with no result cache whose view plots on an Agg canvas, set up like the GUI would be.
+        """
+        modelClass, controllerClass, inputs = self.cycles[cycleType]
+        controller = controllerClass()
+        controller.setCache(None)
+        controller.model.PathPoints = nPoints
+        view = controller.view
+        fig = Figure(figsize=(8, 6))
+        view.canvas = FigureCanvasAgg(fig)
+        view.ax = fig.add_subplot()
+        view.rdo_Metric.setChecked(True)
+        view.cmb_Abcissa.addItems([self.X])
+        view.cmb_Ordinate.addItems([self.Y])
+        view.chk_LogAbcissa.setChecked(False)
+        view.chk_LogOrdinate.setChecked(False)
+        return controller
+
+    def runCycle(self, cycleType):
+        modelClass, controllerClass, inputs = self.cycles[cycleType]
+        self.results['{}/construct'.format(cycleType)] = self.time(modelClass)
+        for n in self.points:
+            c = self.makeController(cycleType, n)
+            model = c.model
+            dep = model.dependencies
+
+            def reset():
+                dep.invalidate()
+                dep.inputs.clear()  # so setInputs sees every input as new
+
+            def newArtists():
+                c.view.artists = cyclePlotArtists()
+                c.view.ax.clear()
+
+            plotArgs = dict(X=self.X, Y=self.Y, logx=False, logy=False, mass=False, total=True)
+            tag = '{}/{{}}/n={}'.format(cycleType, n)
+            self.results[tag.format('calc')] = self.time(lambda: c.calcModel(model, **inputs), reset)
+            self.results[tag.format('set')] = self.time(lambda: c.set(**inputs), lambda: (reset(), newArtists()))
+            self.results[tag.format('build')] = self.time(lambda: c.buildDataForPlotting(model),
+                                                          lambda: dep.invalidate('PathPoints'))
+            self.results[tag.format('plot')] = self.time(lambda: c.plot_cycle_XY(**plotArgs), newArtists)
+            self.results[tag.format('replot')] = self.time(lambda: c.plot_cycle_XY(**plotArgs))
+
+    def run(self, verbose=False):
+        """
+        Times every cycle type.
+        :return: dict with meta data and the results, ready for json
+        """
+        self.results = {}
+        for cycleType in self.cycleTypes:
+            self.runCycle(cycleType)
+            if verbose:
+                print('{} done'.format(cycleType), file=sys.stderr)
+        return self.getReport()
+
+    def getReport(self):
+        meta = {'python': platform.python_version(), 'numpy': np.__version__, 'matplotlib': matplotlib.__version__,
+                'platform': platform.platform(), 'machine': platform.machine(), 'cycles': list(self.cycleTypes),
+                'points': list(self.points), 'repeat': self.repeat, 'X': self.X, 'Y': self.Y,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        return {'meta': meta, 'results': self.results}
+# endregion
+
+
+def compareReports(report, baseline, threshold=0.2, stat='min_ms'):
+    """
+    Compares the timings in report against a baseline report.
+    :param report: dict from cycleBenchmark.run()
+    :param baseline: a report read from a json file
+    :param threshold: fractional slow down that counts as a regression (0.2 = 20% slower)
+    :param stat: which statistic to compare
+    :return: list of (name, baseline ms, new ms, ratio, status) rows and the number of regressions
+    """
+    rows = []
+    nRegressions = 0
+    old, new = baseline.get('results', {}), report.get('results', {})
+    for name in sorted(new):  # timings only in the baseline were not asked for this time
+        if name not in old:
+            rows.append((name, math.nan, new[name][stat], math.nan, 'new'))
+            continue
+        a, b = old[name][stat], new[name][stat]
+        ratio = b / a if a > 0 else math.inf
+        if ratio > 1.0 + threshold:
+            status = 'REGRESSION'
+            nRegressions += 1
+        elif ratio < 1.0 / (1.0 + threshold):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, a, b, ratio, status))
+    return rows, nRegressions
+
+
+def formatComparison(rows):
+    lines = ['{:<28s} {:>12s} {:>12s} {:>8s}  {}'.format('timing', 'baseline ms', 'new ms', 'ratio', 'status')]
+    for name, a, b, ratio, status in rows:
+        lines.append('{:<28s} {:>12.3f} {:>12.3f} {:>8.2f}  {}'.format(name, a, b, ratio, status))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times the cycle model, set(), path building and plotting.')
+    parser.add_argument('--cycles', nargs='+', default=['otto', 'diesel', 'dual'],
+                        choices=sorted(cycleBenchmark.cycles), help='cycle types to time')
+    parser.add_argument('--points', nargs='+', type=int, default=[30, 100, 300], help='points per path leg')
+    parser.add_argument('--repeat', type=int, default=10, help='runs of each timing')
+    parser.add_argument('--output', '-o', default=None, help='json file for the results (default: stdout)')
+    parser.add_argument('--baseline', default=None, help='json file from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fractional slow down that counts as a regression (default 0.2)')
+    args = parser.parse_args(argv)
+
+    app = qtw.QApplication.instance() or qtw.QApplication(sys.argv[:1])
+    bench = cycleBenchmark(cycleTypes=args.cycles, points=args.points, repeat=args.repeat)
+    report = bench.run(verbose=args.output is not None)
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, nRegressions = compareReports(report, baseline, threshold=args.threshold)
+        print(formatComparison(rows), file=sys.stderr)
+        if nRegressions:
+            print('{} regression(s) beyond {:0.0f}%'.format(nRegressions, 100 * args.threshold), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
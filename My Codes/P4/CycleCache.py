@@ -0,0 +1,214 @@
+# region imports
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from Air import stateProps
+
+
+# endregion
+
+# region class definitions
+class cycleResult():
+    """
+    A compact snapshot of a calculated cycle:  the states, the energy terms and the path legs.
+    States are stored as rows of (T, P, u, h, s, v) and each path leg as a 6xN array in the same order, all in
+    molar SI units, so a result can be restored into a model without any state solves.
+    """
+    props = ('T', 'P', 'u', 'h', 's', 'v')
+
+    def __init__(self):
+        self.stateNames = []
+        self.stateLabels = []
+        self.states = np.zeros((0, 6))
+        self.energyNames = []
+        self.energies = np.zeros(0)
+        self.legNames = []
+        self.legs = {}
+
+    def store(self, model):
+        """
+        Takes a snapshot of a calculated cycle model.
+        :param model: a cycle model with stateNames, energyNames and legNames lists
+        :return: self
+        """
+        self.stateNames = list(model.stateNames)
+        self.energyNames = list(model.energyNames)
+        self.legNames = list(model.legNames)
+        states = [getattr(model, name) for name in self.stateNames]
+        self.stateLabels = ['' if st.name is None else st.name for st in states]
+        self.states = np.array([[st.getVal(p) for p in self.props] for st in states], dtype=float)
+        self.energies = np.array([getattr(model, name) for name in self.energyNames], dtype=float)
+        self.legs = {}
+        for name in self.legNames:
+            leg = getattr(model, name)
+            self.legs[name] = np.array([leg.getDataCol(p) for p in self.props], dtype=float)
+        return self
+
+    def restore(self, model):
+        """
+        Puts the snapshot back into a cycle model.  The model's dependencies are all marked clean since the states
+        and legs now match the inputs.
+        :param model: a cycle model of the same type the snapshot was taken from
+        """
+        for name, label, row in zip(self.stateNames, self.stateLabels, self.states):
+            st = stateProps()
+            st.name = label if label != '' else None
+            st.T, st.P, st.u, st.h, st.s, st.v = [float(x) for x in row]
+            setattr(model, name, st)
+        for name, val in zip(self.energyNames, self.energies):
+            setattr(model, name, float(val))
+        for name in self.legNames:
+            leg = getattr(model, name)
+            leg.clear()
+            for vals in self.legs[name].T:
+                T, P, u, h, s, v = vals
+                leg.add((T, P, u, h, s, v))
+        model.dependencies.dirty = set()
+
+    def save(self, fileName):
+        data = {'stateNames': np.array(self.stateNames), 'stateLabels': np.array(self.stateLabels),
+                'states': self.states, 'energyNames': np.array(self.energyNames), 'energies': self.energies,
+                'legNames': np.array(self.legNames)}
+        for name in self.legNames:
+            data['leg_' + name] = self.legs[name]
+        np.savez_compressed(fileName, **data)
+
+    def load(self, fileName):
+        with np.load(fileName, allow_pickle=False) as data:
+            self.stateNames = [str(x) for x in data['stateNames']]
+            self.stateLabels = [str(x) for x in data['stateLabels']]
+            self.states = data['states']
+            self.energyNames = [str(x) for x in data['energyNames']]
+            self.energies = data['energies']
+            self.legNames = [str(x) for x in data['legNames']]
+            self.legs = {name: data['leg_' + name] for name in self.legNames}
+        return self
+
+
+class cycleResultCache():
+    """
+    An LRU cache of cycleResult objects keyed by the cycle type and its canonical SI inputs.  If diskDir is given,
+    results are also written there as .npz files so they survive a restart of the program.  The files are capped in
+    number and total size, and the oldest ones are removed first.
+    The cache can be shared by calculations running on worker threads.
+    """
+    # bump this when the cycle models or the cycleResult layout change, so results from older versions are not used
+    formatVersion = 1
+
+    def __init__(self, maxSize=64, diskDir=None, digits=6, maxDiskFiles=1000, maxDiskBytes=50 * 2 ** 20):
+        """
+        :param maxSize: number of results to keep in memory
+        :param diskDir: directory for the persistent tier (None for memory only)
+        :param digits: significant digits used to normalize the inputs for the key
+        :param maxDiskFiles: number of results to keep on disk
+        :param maxDiskBytes: total size of the results kept on disk
+        """
+        self.maxSize = maxSize
+        self.diskDir = diskDir
+        self.maxDiskFiles = maxDiskFiles
+        self.maxDiskBytes = maxDiskBytes
+        self.digits = digits
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        if self.diskDir is not None:
+            os.makedirs(self.diskDir, exist_ok=True)
+
+    def makeKey(self, cycleType, inputs):
+        """
+        Builds a key from the cycle type and a dict of SI inputs.  The inputs are rounded to self.digits
+        significant digits so values that differ only by round off map to the same key.
+        :param cycleType: e.g., 'otto'
+        :param inputs: dict of input name -> value in SI units
+        :return: a hashable key
+        """
+        fmt = '{:0.' + str(self.digits) + 'g}'
+        return ('v{}'.format(self.formatVersion), cycleType) + tuple((name, fmt.format(inputs[name])) for name in sorted(inputs))
+
+    def getFileName(self, key):
+        return os.path.join(self.diskDir, hashlib.sha1(repr(key).encode()).hexdigest() + '.npz')
+
+    def get(self, key):
+        """
+        Looks for a result in memory first and then on disk.
+        :param key: from makeKey
+        :return: a cycleResult or None
+        """
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return self.results[key]
+            if self.diskDir is not None:
+                fileName = self.getFileName(key)
+                if os.path.exists(fileName):
+                    try:
+                        result = cycleResult().load(fileName)
+                    except (OSError, ValueError, KeyError):
+                        result = None  # a partial or corrupt file is just a miss
+                    if result is not None:
+                        os.utime(fileName)  # recently used, so it is the last to be removed from disk
+                        self.hits += 1
+                        self.put(key, result, toDisk=False)
+                        return result
+            self.misses += 1
+            return None
+
+    def put(self, key, result, toDisk=True):
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxSize:
+                self.results.popitem(last=False)
+            if toDisk and self.diskDir is not None:
+                # write to a temporary file first so a reader never sees a partial file
+                fileName = self.getFileName(key)
+                tmpName = fileName[:-4] + '.tmp.npz'
+                result.save(tmpName)
+                os.replace(tmpName, fileName)
+                self.trimDisk()
+
+    def trimDisk(self):
+        """
+        Removes the oldest results on disk until they are within maxDiskFiles and maxDiskBytes.
+        """
+        with self.lock:
+            if self.diskDir is None:
+                return
+            files = []
+            for entry in os.scandir(self.diskDir):
+                if entry.name.endswith('.npz') and not entry.name.endswith('.tmp.npz'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # removed by another process
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+            nFiles, nBytes = len(files), sum(f[1] for f in files)
+            for mtime, size, path in files:
+                if nFiles <= self.maxDiskFiles and nBytes <= self.maxDiskBytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                nFiles -= 1
+                nBytes -= size
+
+    def setMaxSize(self, maxSize):
+        with self.lock:
+            self.maxSize = maxSize
+            while len(self.results) > self.maxSize:
+                self.results.popitem(last=False)
+
+    def clear(self, disk=False):
+        with self.lock:
+            self.results.clear()
+            if disk and self.diskDir is not None:
+                for f in os.listdir(self.diskDir):
+                    if f.endswith('.npz'):
+                        os.remove(os.path.join(self.diskDir, f))
+# endregion
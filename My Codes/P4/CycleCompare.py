@@ -0,0 +1,123 @@
+# region imports
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy as dc
+from matplotlib import pyplot as plt
+from Air import air, units
+from CyclePlot import cyclePlotArtists
+
+
+# endregion
+
+# region class definitions
+class cycleComparison():
+    """
+    Calculates several cycles (e.g., Otto, Diesel and Dual) at the same initial state and compression ratio, each on
+    its own worker thread, and plots them on one set of axes.  The cycle specific inputs (T High, cutoff, pressure
+    ratio) are whatever each controller's model was last calculated with.
+    """
+    # (lower curve, upper curve) colors for each cycle
+    colors = (('k', 'gray'), ('g', 'limegreen'), ('b', 'cornflowerblue'), ('r', 'salmon'))
+    # rows of the comparison table:  (label, model attribute, energy?)
+    rows = (('Efficiency (%)', 'Eff', False), ('Net work', 'W_Cycle', True), ('Power stroke', 'W_Power', True),
+            ('Compression stroke', 'W_Compression', True), ('Heat added', 'Q_In', True),
+            ('Heat rejected', 'Q_Out', True))
+
+    def __init__(self, controllers, names=None, maxWorkers=None):
+        """
+        :param controllers: the cycle controllers to compare
+        :param names: a name for each cycle (for the legend and table)
+        :param maxWorkers: number of worker threads (defaults to one per cycle)
+        """
+        self.controllers = list(controllers)
+        self.names = list(names) if names is not None else [c.model.cycleType.title() for c in self.controllers]
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers or len(self.controllers))
+        self.models = [c.model for c in self.controllers]
+        self.units = units()
+        self.artists = cyclePlotArtists()
+        self.calculated = False
+        self.wallTime = 0.0
+
+    def calc(self, T_0=300.0, P_0=101325.0, V_0=1.0E-3, ratio=8.0, SI=True, inputs=None):
+        """
+        Calculates all the cycles concurrently on copies of the controllers' models and then hands each controller
+        its new model.
+        :param T_0: Initial temperature in absolute units (R or K)
+        :param P_0: Initial pressure in (atm or pa)
+        :param V_0: Initial volume in (ft^3 or m^3)
+        :param ratio: Compression ratio
+        :param SI: boolean
+        :param inputs: optional dict of controller -> complete calcModel inputs (e.g., from the GUI for the cycle
+                       that is showing) to use instead of the model's inputs
+        :return: the calculated models
+        """
+        startTime = time.perf_counter()
+        U = self.units
+        U.set(SI=SI)
+        common = dict(T_0=T_0 if SI else T_0 / U.CF_T, P_0=P_0 if SI else P_0 / U.CF_P,
+                      V_0=V_0 if SI else V_0 / U.CF_V, ratio=ratio)
+        air().getPropertyTable()  # build the shared property table once before the workers need it
+        futures = []
+        for c in self.controllers:
+            if inputs is not None and c in inputs:
+                cInputs = inputs[c]
+            else:
+                cInputs = c.getModelInputs()
+                cInputs.update(common)
+            futures.append(self.executor.submit(c.calcModel, dc(c.model), **cInputs))
+        self.models = [f.result() for f in futures]
+        for c, model in zip(self.controllers, self.models):
+            model.units.set(SI=SI)
+            c.model = model
+        self.calculated = True
+        self.wallTime = time.perf_counter() - startTime
+        return self.models
+
+    def getTable(self):
+        """
+        The efficiency, work and heat of each cycle in the current units (energies are totals for the cylinder).
+        :return: list of row labels, list of rows of values (one value per cycle)
+        """
+        U = self.units
+        CFE = 1.0 if U.SI else U.CF_E
+        labels, values = [], []
+        for label, name, energy in self.rows:
+            labels.append(label + (' ({})'.format(U.EUnits) if energy else ''))
+            values.append([getattr(m, name) * (m.air.n * CFE if energy else 1.0) for m in self.models])
+        return labels, values
+
+    def plot(self, ax=None, canvas=None, X='s', Y='T', logx=False, logy=False, mass=False, total=True):
+        """
+        Overlays the cycles on one set of axes.
+        :param ax: the axes to draw on (None to plot from the command line)
+        :param canvas: the FigureCanvas (None when plotting from the command line)
+        :param X: letter for which variable to plot on X axis
+        :param Y: letter for which variable to plot on Y axis
+        """
+        if not self.calculated or X == Y:
+            return
+        if ax is None:
+            ax = plt.subplot()
+            canvas = None
+        x, y = X.lower(), Y.lower()
+        curves, colors, labels, markerX, markerY = [], [], [], [], []
+        for i, (name, model) in enumerate(zip(self.names, self.models)):
+            model.units.set(SI=self.units.SI)
+            LC, UC, ST = model.getPlotColumns(mass=mass, total=total)
+            curves += [(LC[x], LC[y]), (UC[x], UC[y])]
+            colors += list(self.colors[i % len(self.colors)])
+            labels += [name, None]
+            markerX += list(ST[x])
+            markerY += list(ST[y])
+        model = self.models[0]
+        model.units.setPlotUnits(SI=self.units.SI, mass=mass, total=total)
+        xlabel = model.lowerCurve.getAxisLabel(X, Units=model.units)
+        ylabel = model.lowerCurve.getAxisLabel(Y, Units=model.units)
+        summary = '\n'.join('{}: $\\eta$ = {:0.1f}%'.format(n, m.Eff) for n, m in zip(self.names, self.models))
+        self.artists.plot(ax, canvas, curves=curves, markers=(markerX, markerY), xlabel=xlabel, ylabel=ylabel,
+                          title=' / '.join(self.names) + ' Cycles', logx=logx, logy=logy, summary=summary,
+                          colors=colors, labels=labels)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+# endregion
@@ -0,0 +1,279 @@
+# region imports
+import os
+import csv
+import zipfile
+from copy import deepcopy as dc
+import numpy as np
+from Air import units
+from CycleCache import cycleResult
+
+
+# endregion
+
+# region class definitions
+class cycleExporter():
+    """
+    Writes the states, energy terms and path legs of calculated cycles to files in every unit basis.
+    A .npz file (compressed numpy arrays) is meant for bulk results and a .csv file for spreadsheets.
+    The arrays in a .npz file are named '<basis>/states', '<basis>/energies' and '<basis>/<leg name>' where basis is
+    one of the names in bases, e.g., 'SI_molar/leg12'.  States are rows of (T, P, u, h, s, v) and each leg is a
+    6xN array in the same order.  The units of each basis are in '<basis>/units'.
+    A sweep of many cycles is written a chunk of runs at a time, so memory stays bounded however long the sweep is.
+    In a sweep .npz file every array gets a leading run dimension and is stored under 'chunkNNNNN/'.
+    """
+    # name, SI, mass, total
+    bases = (('SI_molar', True, False, False), ('SI_mass', True, True, False), ('SI_total', True, False, True),
+             ('English_molar', False, False, False), ('English_mass', False, True, False),
+             ('English_total', False, False, True))
+    props = cycleResult.props
+
+    def __init__(self, bases=None, chunkSize=256):
+        """
+        :param bases: names of the unit bases to write (None for all of them)
+        :param chunkSize: number of runs held in memory before a chunk of a sweep is written
+        """
+        self.bases = tuple(b for b in cycleExporter.bases if bases is None or b[0] in bases)
+        self.chunkSize = chunkSize
+        self.units = units()
+
+    # region converting
+    def getRaw(self, model):
+        """
+        The states, energy terms and legs of a calculated model as arrays in molar SI units.
+        :param model: a calculated cycle model
+        :return: a cycleResult
+        """
+        if not model.calculated:
+            raise ValueError('the {} cycle has not been calculated'.format(model.cycleType))
+        return cycleResult().store(model)
+
+    def getUnits(self, SI=True, mass=False, total=False):
+        U = self.units
+        U.set(SI=SI, mass=mass, total=total)
+        return [U.TUnits, U.PUnits, U.uUnits, U.hUnits, U.sUnits, U.vUnits]
+
+    def convert(self, raw, n, MW, SI=True, mass=False, total=False):
+        """
+        Converts a raw result to one unit basis.
+        :param raw: a cycleResult (molar SI units)
+        :param n: moles of air in the cylinder
+        :param MW: molecular weight of the air
+        :return: states, energies and a dict of leg name -> leg, all numpy arrays
+        """
+        CF = self.units.getConversionFactors(SI=SI, mass=mass, total=total, n=n, MW=MW)
+        cf = np.array([CF[p.lower()] for p in self.props])
+        # the energy terms are per mole like u, except the efficiency which is a percentage
+        eCF = np.array([1.0 if name == 'Eff' else CF['u'] for name in raw.energyNames])
+        legs = {name: raw.legs[name] * cf[:, None] for name in raw.legNames}
+        return raw.states * cf, raw.energies * eCF, legs
+    # endregion
+
+    # region single cycle
+    def export(self, model, fileName, inputs=None):
+        """
+        Writes one calculated cycle to fileName.  The format is picked from the extension (.npz or .csv).
+        :param model: a calculated cycle model
+        :param fileName: name of the file to write
+        :param inputs: optional dict of the inputs the model was calculated with (e.g., from getModelInputs)
+        """
+        if os.path.splitext(fileName)[1].lower() == '.csv':
+            self.exportCSV(model, fileName, inputs=inputs)
+        else:
+            self.exportNPZ(model, fileName, inputs=inputs)
+
+    def exportNPZ(self, model, fileName, inputs=None):
+        raw = self.getRaw(model)
+        inputNames, inputValues = self.splitInputs(inputs)
+        data = self.getHeader(model, raw, inputNames)
+        data['inputs'] = np.array(inputValues, dtype=float)
+        data['n'] = np.array(model.air.n)
+        for name, SI, mass, total in self.bases:
+            states, energies, legs = self.convert(raw, model.air.n, model.air.MW, SI=SI, mass=mass, total=total)
+            data[name + '/states'] = states
+            data[name + '/energies'] = energies
+            for legName, leg in legs.items():
+                data[name + '/' + legName] = leg
+        np.savez_compressed(fileName, **data)
+
+    def exportCSV(self, model, fileName, inputs=None):
+        """
+        Writes the states and path legs to fileName with one row per point, and the energy terms to
+        <fileName>_energies.csv with one row per unit basis.
+        """
+        stem = os.path.splitext(fileName)[0]
+        with open(fileName, 'w', newline='') as f, open(stem + '_energies.csv', 'w', newline='') as fe:
+            pathWriter, energyWriter = csv.writer(f), csv.writer(fe)
+            raw = self.getRaw(model)
+            inputNames, inputValues = self.splitInputs(inputs)
+            self.writeCSVHeaders(pathWriter, energyWriter, raw, inputNames)
+            self.writeCSVRows(pathWriter, energyWriter, 0, model, raw, inputValues)
+    # endregion
+
+    # region sweeps
+    def exportSweep(self, controller, sweep, fileName, progress=None):
+        """
+        Calculates and writes a sweep of cycles.  One model is recalculated for every run, so only the states
+        that depend on the inputs that change from run to run are solved again.
+        :param controller: the controller of the cycle type to sweep (its model is not changed)
+        :param sweep: an iterable of dicts of calcModel inputs (a generator keeps long sweeps out of memory)
+        :param fileName: a .npz or .csv file name
+        :param progress: optional callback progress(runsDone)
+        :return: number of runs written
+        """
+        model = dc(controller.model)
+
+        def runs():
+            for inputs in sweep:
+                controller.calcModel(model, **inputs)
+                yield model, controller.getModelInputs(model)
+
+        return self.writeSweep(runs(), fileName, progress=progress)
+
+    def writeSweep(self, runs, fileName, progress=None):
+        """
+        Writes already calculated cycles as they come from runs.
+        :param runs: an iterable of (model, inputs) pairs.  All the models must be the same cycle type.
+        :return: number of runs written
+        """
+        if os.path.splitext(fileName)[1].lower() == '.csv':
+            return self.writeSweepCSV(runs, fileName, progress=progress)
+        return self.writeSweepNPZ(runs, fileName, progress=progress)
+
+    def writeSweepNPZ(self, runs, fileName, progress=None):
+        nRuns, chunk, header = 0, [], None
+        # write to a temporary file first so a reader never sees a partial file
+        tmpName = fileName + '.tmp'
+        with zipfile.ZipFile(tmpName, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for model, inputs in runs:
+                raw = self.getRaw(model)
+                inputNames, inputValues = self.splitInputs(inputs)
+                if header is None:
+                    header = self.getHeader(model, raw, inputNames)
+                elif not self.isSameShape(header, raw):
+                    raise ValueError('all the cycles of a sweep must be the same type with the same path points')
+                chunk.append((raw, model.air.n, model.air.MW, inputValues))
+                nRuns += 1
+                if len(chunk) == self.chunkSize:
+                    self.writeChunk(zf, nRuns // self.chunkSize - 1, chunk)
+                    chunk = []
+                if progress is not None:
+                    progress(nRuns)
+            if chunk:
+                self.writeChunk(zf, (nRuns - 1) // self.chunkSize, chunk)
+            if header is not None:
+                header['nRuns'] = np.array(nRuns)
+                for name, arr in header.items():
+                    self.writeArray(zf, name, arr)
+        os.replace(tmpName, fileName)
+        return nRuns
+
+    def writeChunk(self, zf, k, chunk):
+        prefix = 'chunk{:05d}/'.format(k)
+        self.writeArray(zf, prefix + 'inputs', np.array([c[3] for c in chunk], dtype=float))
+        self.writeArray(zf, prefix + 'n', np.array([c[1] for c in chunk], dtype=float))
+        raw0 = chunk[0][0]
+        for name, SI, mass, total in self.bases:
+            converted = [self.convert(raw, n, MW, SI=SI, mass=mass, total=total) for raw, n, MW, i in chunk]
+            self.writeArray(zf, prefix + name + '/states', np.array([c[0] for c in converted]))
+            self.writeArray(zf, prefix + name + '/energies', np.array([c[1] for c in converted]))
+            for legName in raw0.legNames:
+                self.writeArray(zf, prefix + name + '/' + legName, np.array([c[2][legName] for c in converted]))
+
+    def writeArray(self, zf, name, arr):
+        with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asarray(arr), allow_pickle=False)
+
+    def writeSweepCSV(self, runs, fileName, progress=None):
+        """
+        Streams a sweep to fileName (states and path legs) and <fileName>_energies.csv.  Each run is written as
+        soon as it is calculated.
+        """
+        nRuns, header = 0, None
+        stem = os.path.splitext(fileName)[0]
+        with open(fileName, 'w', newline='') as f, open(stem + '_energies.csv', 'w', newline='') as fe:
+            pathWriter, energyWriter = csv.writer(f), csv.writer(fe)
+            for model, inputs in runs:
+                raw = self.getRaw(model)
+                inputNames, inputValues = self.splitInputs(inputs)
+                if header is None:
+                    header = self.getHeader(model, raw, inputNames)
+                    self.writeCSVHeaders(pathWriter, energyWriter, raw, inputNames)
+                elif not self.isSameShape(header, raw):
+                    raise ValueError('all the cycles of a sweep must be the same type with the same path points')
+                self.writeCSVRows(pathWriter, energyWriter, nRuns, model, raw, inputValues)
+                nRuns += 1
+                if progress is not None:
+                    progress(nRuns)
+        return nRuns
+
+    def readSweep(self, fileName):
+        """
+        Reads a sweep .npz file back one chunk at a time.
+        :param fileName: a file written by exportSweep
+        :return: a generator of dicts of array name (without the chunk prefix) -> array
+        """
+        with np.load(fileName, allow_pickle=False) as data:
+            chunks = sorted({key.split('/')[0] for key in data.files if key.startswith('chunk')})
+            for chunk in chunks:
+                prefix = chunk + '/'
+                yield {key[len(prefix):]: data[key] for key in data.files if key.startswith(prefix)}
+    # endregion
+
+    # region helpers
+    def splitInputs(self, inputs):
+        """
+        :param inputs: dict of input name -> value (flags like SI are left out)
+        :return: list of names, list of values
+        """
+        if inputs is None:
+            return [], []
+        names = [k for k, v in inputs.items() if not isinstance(v, bool)]
+        return names, [float(inputs[k]) for k in names]
+
+    def getHeader(self, model, raw, inputNames):
+        """
+        The arrays that describe the layout of the file.
+        """
+        data = {'cycleType': np.array(model.cycleType), 'props': np.array(self.props),
+                'stateNames': np.array(raw.stateNames), 'energyNames': np.array(raw.energyNames),
+                'legNames': np.array(raw.legNames), 'inputNames': np.array(inputNames, dtype=str),
+                'bases': np.array([b[0] for b in self.bases]),
+                'legLengths': np.array([raw.legs[name].shape[1] for name in raw.legNames])}
+        for name, SI, mass, total in self.bases:
+            data[name + '/units'] = np.array(self.getUnits(SI=SI, mass=mass, total=total))
+        return data
+
+    def isSameShape(self, header, raw):
+        return list(header['legNames']) == raw.legNames and \
+            list(header['legLengths']) == [raw.legs[name].shape[1] for name in raw.legNames]
+
+    def writeCSVHeaders(self, pathWriter, energyWriter, raw, inputNames):
+        pathWriter.writerow(['run'] + inputNames + ['basis', 'item', 'point'] + list(self.props))
+        # the units of each basis go in the energies file (the energy terms are in the units of u, Eff is in %)
+        energyWriter.writerow(['run'] + inputNames + ['basis'] + ['{} units'.format(p) for p in self.props] +
+                              raw.energyNames)
+
+    def writeCSVRows(self, pathWriter, energyWriter, run, model, raw, inputValues):
+        for name, SI, mass, total in self.bases:
+            states, energies, legs = self.convert(raw, model.air.n, model.air.MW, SI=SI, mass=mass, total=total)
+            lead = [run] + inputValues + [name]
+            pathWriter.writerows(lead + [stateName, 0] + list(row) for stateName, row in zip(raw.stateNames, states))
+            for legName in raw.legNames:
+                pathWriter.writerows(lead + [legName, i] + list(row) for i, row in enumerate(legs[legName].T))
+            energyWriter.writerow(lead + self.getUnits(SI=SI, mass=mass, total=total) + list(energies))
+    # endregion
+# endregion
+
+
+def main():
+    from Otto import ottoCycleController
+    oc = ottoCycleController()
+    oc.calcModel(oc.model, T_0=300.0, P_0=101325.0, V_0=1.0E-3, T_High=1500.0, ratio=8.0)
+    exporter = cycleExporter()
+    exporter.export(oc.model, 'otto.npz', inputs=oc.getModelInputs())
+    sweep = (dict(T_0=300.0, P_0=101325.0, V_0=1.0E-3, T_High=1500.0, ratio=r) for r in np.linspace(4, 20, 1000))
+    print(exporter.exportSweep(oc, sweep, 'ottoSweep.npz'), 'runs written')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# region imports
+import os
+import copy
+import itertools
+from copy import deepcopy as dc
+from collections import OrderedDict
+from CycleCache import cycleResult
+
+
+# endregion
+
+# region class definitions
+class historyEntry():
+    """
+    One calculation in the run history:  the inputs it was done with and the snapshot of its results.
+    """
+
+    def __init__(self, id=0, cycleType='', inputs=None, result=None, label=''):
+        self.id = id
+        self.cycleType = cycleType
+        self.inputs = {} if inputs is None else dict(inputs)  # SI inputs from the controller's getModelInputs
+        self.result = result  # a cycleResult, or None while it is spilled to disk
+        self.fileName = None
+        self.label = label
+
+
+class recallCache():
+    """
+    Stands in for a cycleResultCache that always returns one result, so a controller's calcModel puts that result in
+    the model instead of solving any states.
+    """
+
+    def __init__(self, result):
+        self.result = result
+
+    def makeKey(self, cycleType, inputs):
+        return cycleType
+
+    def get(self, key):
+        return self.result
+
+    def put(self, key, result, toDisk=True):
+        pass
+
+
+class cycleHistory():
+    """
+    Keeps the last maxSize calculations as compact cycleResult snapshots so any of them can be put back into its
+    controller without solving anything.  At most maxMemory snapshots are held in memory; if diskDir is given the
+    least recently used ones beyond that are spilled to .npz files there and read back when they are recalled.
+    """
+
+    def __init__(self, maxSize=20, maxMemory=None, diskDir=None):
+        """
+        :param maxSize: number of calculations in the history
+        :param maxMemory: number of snapshots held in memory (only less than maxSize if there is a diskDir)
+        :param diskDir: directory for spilled snapshots (None to keep everything in memory)
+        """
+        self.maxSize = maxSize
+        self.diskDir = diskDir
+        self.maxMemory = maxSize if (maxMemory is None or diskDir is None) else min(maxMemory, maxSize)
+        self.entries = OrderedDict()  # id -> historyEntry, oldest first
+        self.resident = OrderedDict()  # ids of the entries with a snapshot in memory, least recently used first
+        self.ids = itertools.count(1)
+        if self.diskDir is not None:
+            os.makedirs(self.diskDir, exist_ok=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def makeLabel(self, model, inputs):
+        """
+        A short description of a run for the history list.
+        """
+        skip = ('T_0', 'P_0', 'V_0')
+        args = ', '.join('{}={:0.4g}'.format(k, v) for k, v in inputs.items() if k not in skip and
+                         not isinstance(v, bool))
+        return '{}:  eff={:0.2f}%  ({})'.format(model.cycleType.title(), model.Eff, args)
+
+    def find(self, cycleType, inputs):
+        """
+        :return: the id of an entry with the same cycle type and inputs, or None
+        """
+        for id, entry in self.entries.items():
+            if entry.cycleType == cycleType and entry.inputs == inputs:
+                return id
+        return None
+
+    def add(self, controller, model=None):
+        """
+        Takes a snapshot of a calculated model.  Recalculating a configuration that is already in the history moves
+        it to the end instead of adding it again.
+        :param controller: the cycle controller (for getModelInputs)
+        :param model: the calculated model (defaults to the controller's)
+        :return: the new (or moved) historyEntry
+        """
+        model = controller.model if model is None else model
+        inputs = controller.getModelInputs(model)
+        id = self.find(model.cycleType, inputs)
+        if id is not None:
+            self.entries.move_to_end(id)
+            self.touch(id)
+            return self.entries[id]
+        entry = historyEntry(next(self.ids), model.cycleType, inputs, cycleResult().store(model),
+                             self.makeLabel(model, inputs))
+        self.entries[entry.id] = entry
+        self.touch(entry.id)
+        while len(self.entries) > self.maxSize:
+            self.remove(next(iter(self.entries)))
+        return entry
+
+    def remove(self, id):
+        entry = self.entries.pop(id)
+        self.resident.pop(id, None)
+        if entry.fileName is not None and os.path.exists(entry.fileName):
+            os.remove(entry.fileName)
+
+    def touch(self, id):
+        """
+        Marks an entry's snapshot as the most recently used and spills the least recently used ones over the
+        memory limit.
+        """
+        self.resident[id] = None
+        self.resident.move_to_end(id)
+        while len(self.resident) > self.maxMemory:
+            oldId, _ = self.resident.popitem(last=False)
+            self.spill(self.entries[oldId])
+
+    def spill(self, entry):
+        if entry.fileName is None:
+            entry.fileName = os.path.join(self.diskDir, 'run{}_{}.npz'.format(os.getpid(), entry.id))
+            entry.result.save(entry.fileName)
+        entry.result = None
+
+    def getResult(self, id):
+        """
+        :return: the snapshot of an entry, read back from disk if it was spilled
+        """
+        entry = self.entries[id]
+        if entry.result is None:
+            entry.result = cycleResult().load(entry.fileName)
+        self.touch(id)
+        return entry.result
+
+    def recall(self, controller, id):
+        """
+        Puts a run back into a model for its controller.  The snapshot takes the place of the state solves, so this
+        only costs the energy arithmetic and piecing the curves together.
+        :param controller: the controller for the entry's cycle type
+        :param id: the entry id
+        :return: a new calculated model (the controller's model is not changed)
+        """
+        entry = self.entries[id]
+        if controller.model.cycleType != entry.cycleType:
+            raise ValueError('a {} run cannot be recalled into a {} cycle'.format(entry.cycleType,
+                                                                                   controller.model.cycleType))
+        recaller = copy.copy(controller)  # so the controller's own cache is left alone
+        recaller.cache = recallCache(self.getResult(id))
+        model = dc(controller.model)
+        model.dependencies.invalidate()
+        return recaller.calcModel(model, **entry.inputs)
+
+    def clear(self):
+        for id in list(self.entries):
+            self.remove(id)
+# endregion
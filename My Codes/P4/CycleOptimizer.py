@@ -0,0 +1,252 @@
+# region imports
+import time
+import numpy as np
+from scipy.optimize import differential_evolution, minimize, NonlinearConstraint
+from Air import air, calculationCancelled
+
+
+# endregion
+
+# region class definitions
+class cycleBatch():
+    """
+    Evaluates many air standard cycles at once with the array functions of the air class.  The initial state is
+    fixed and the design variables are given as arrays, so a whole population (or all the points of a finite
+    difference gradient) costs about the same as a single cycle.
+    All values are in SI units:  T in K, P in Pa, V in m^3, energies in J.
+    """
+    # design variables of each cycle type, in the order they are passed to evaluate
+    varNames = {'otto': ('Ratio',),
+                'diesel': ('Ratio', 'Cutoff'),
+                'dual': ('Ratio', 'PressureRatio', 'Cutoff')}
+
+    def __init__(self, cycleType='otto', T_initial=300.0, p_initial=101325.0, V_Cylinder=1.0E-3, T_high=1500.0):
+        """
+        :param cycleType: 'otto', 'diesel' or 'dual'
+        :param T_initial: temperature at BDC before compression in K
+        :param p_initial: pressure at BDC before compression in Pa
+        :param V_Cylinder: cylinder volume at BDC in m^3
+        :param T_high: temperature after heat addition for the otto cycle in K
+        """
+        self.cycleType = cycleType.lower()
+        self.air = air()
+        self.T_initial = T_initial
+        self.p_initial = p_initial
+        self.V_Cylinder = V_Cylinder
+        self.T_high = T_high
+        self.nEval = 0  # number of cycles evaluated
+
+    def evaluate(self, X):
+        """
+        :param X: array of design variables with shape (nVar,) or (nVar, S) in the order of varNames
+        :return: a dict of arrays with shape (S,):  Eff (%), W_Cycle (J), Q_In (J), PPeak (Pa), TPeak (K) and
+                 T2 (K), the temperature at the end of compression
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float).T).T
+        a = self.air
+        S1 = a.calcArrays(T=self.T_initial, P=self.p_initial)
+        n = self.V_Cylinder / S1['v']  # moles of air
+        r = X[0]
+        S2 = a.calcArrays(v=S1['v'] / r, s=S1['s'] * np.ones_like(r))
+        W_Compression = S2['u'] - S1['u']
+        if self.cycleType == 'otto':
+            S3 = a.calcArrays(T=self.T_high, v=S2['v'])
+            S4 = a.calcArrays(v=S1['v'] * np.ones_like(r), s=S3['s'])
+            W_Power = S3['u'] - S4['u']
+            Q_In = S3['u'] - S2['u']
+            PPeak, TPeak = S3['P'], S3['T']
+        elif self.cycleType == 'diesel':
+            S3 = a.calcArrays(P=S2['P'], v=S2['v'] * X[1])
+            S4 = a.calcArrays(v=S1['v'] * np.ones_like(r), s=S3['s'])
+            W_Power = S3['u'] - S4['u'] + S2['P'] * (S3['v'] - S2['v'])
+            Q_In = S3['h'] - S2['h']
+            PPeak, TPeak = S3['P'], S3['T']
+        else:
+            S3 = a.calcArrays(v=S2['v'], P=S2['P'] * X[1])
+            S4 = a.calcArrays(P=S3['P'], v=S3['v'] * X[2])
+            S5 = a.calcArrays(v=S1['v'] * np.ones_like(r), s=S4['s'])
+            W_Power = S4['u'] - S5['u'] + S3['P'] * (S4['v'] - S3['v'])
+            Q_In = S3['u'] - S2['u'] + S4['h'] - S3['h']
+            PPeak, TPeak = S3['P'], S4['T']
+        self.nEval += len(r)
+        W_Cycle = W_Power - W_Compression
+        return {'Eff': 100.0 * W_Cycle / Q_In, 'W_Cycle': n * W_Cycle, 'Q_In': n * Q_In, 'PPeak': PPeak,
+                'TPeak': TPeak, 'T2': S2['T']}
+
+
+class cycleOptimum():
+    """
+    The result of a cycleOptimizer run.
+    """
+
+    def __init__(self):
+        self.cycleType = ''
+        self.objective = ''
+        self.varNames = ()
+        self.x = None  # the optimum design variables
+        self.values = {}  # Eff, W_Cycle, Q_In, PPeak, TPeak at the optimum
+        self.feasible = False
+        self.nEval = 0
+        self.wallTime = 0.0
+        self.message = ''
+
+    def getInputs(self):
+        return dict(zip(self.varNames, [float(x) for x in self.x]))
+
+    def getSummary(self):
+        s = 'Optimum ({}):'.format('max. efficiency' if self.objective == 'Eff' else 'max. net work')
+        for name, x in zip(self.varNames, self.x):
+            s += '\n{} = {:0.4g}'.format(name, x)
+        s += '\n$\\eta$ = {:0.2f}%'.format(self.values['Eff'])
+        if not self.feasible:
+            s += '\n(limits not met)'
+        s += '\n{} cycles in {:0.2f} s'.format(self.nEval, self.wallTime)
+        return s
+
+
+class cycleOptimizer():
+    """
+    Maximizes the efficiency or the net work of a cycle subject to a peak pressure and a peak temperature.
+    A differential evolution search over the whole population at once (one batched evaluation per generation) is
+    followed by SLSQP from the best point, with the gradients from a single batched central difference evaluation.
+    """
+
+    def __init__(self, cycleType='otto', objective='Eff', T_initial=300.0, p_initial=101325.0, V_Cylinder=1.0E-3,
+                 T_high=1500.0, PMax=10.0E6, TMax=2500.0, bounds=None):
+        """
+        :param cycleType: 'otto', 'diesel' or 'dual'
+        :param objective: 'Eff' or 'W_Cycle'
+        :param T_initial: temperature at BDC before compression in K
+        :param p_initial: pressure at BDC before compression in Pa
+        :param V_Cylinder: cylinder volume at BDC in m^3
+        :param T_high: temperature after heat addition for the otto cycle in K (the otto cycle is optimized over
+                       the compression ratio only)
+        :param PMax: peak pressure limit in Pa
+        :param TMax: peak temperature limit in K
+        :param bounds: optional dict of design variable name -> (low, high) to replace the defaults
+        """
+        self.batch = cycleBatch(cycleType, T_initial=T_initial, p_initial=p_initial, V_Cylinder=V_Cylinder,
+                                T_high=T_high)
+        self.objective = objective
+        self.PMax = PMax
+        self.TMax = TMax
+        self.varNames = cycleBatch.varNames[self.batch.cycleType]
+        defaults = {'Ratio': (2.0, 30.0), 'Cutoff': (1.01, 5.0), 'PressureRatio': (1.0, 5.0)}
+        if bounds is not None:
+            defaults.update(bounds)
+        self.bounds = np.array([defaults[name] for name in self.varNames], dtype=float)
+        self.lastZ = None  # the point of the last gradient evaluation so SLSQP's fun and jac calls share it
+        self.lastGrad = None
+        self.cancel = None  # set by optimize
+
+    # region scaled problem
+    # the optimizers work on z in [0, 1] for every variable so the compression ratio and the heat addition ratios
+    # are on equal terms
+    def toX(self, Z):
+        lo, hi = self.bounds[:, 0], self.bounds[:, 1]
+        return (lo + (hi - lo) * np.asarray(Z).T).T
+
+    def objectiveAndConstraints(self, Z):
+        """
+        :param Z: scaled design variables with shape (nVar, S)
+        :return: f (to minimize) with shape (S,) and constraints with shape (3, S) that are <= 0 when satisfied:
+                 peak pressure, peak temperature and compression must end below the peak temperature (so heat
+                 is actually added)
+        """
+        if self.cancel is not None and self.cancel():
+            raise calculationCancelled('optimizer')
+        vals = self.batch.evaluate(self.toX(Z))
+        f = -vals['Eff'] / 100.0 if self.objective == 'Eff' else -vals['W_Cycle'] / 1000.0
+        c = np.array([vals['PPeak'] / self.PMax - 1.0, vals['TPeak'] / self.TMax - 1.0,
+                      vals['T2'] / vals['TPeak'] - 1.0 + 1.0E-3])
+        return f, c
+
+    def gradient(self, z, h=1.0E-6):
+        """
+        f, c and their gradients at z from one batched evaluation of the 2*nVar+1 central difference points.
+        """
+        z = np.asarray(z, dtype=float)
+        if self.lastZ is not None and np.array_equal(z, self.lastZ):
+            return self.lastGrad
+        nVar = len(z)
+        Z = np.tile(z[:, None], (1, 2 * nVar + 1))
+        for i in range(nVar):
+            Z[i, 1 + 2 * i] += h
+            Z[i, 2 + 2 * i] -= h
+        f, c = self.objectiveAndConstraints(Z)
+        df = (f[1::2] - f[2::2]) / (2 * h)
+        dc = (c[:, 1::2] - c[:, 2::2]) / (2 * h)
+        self.lastZ = z.copy()
+        self.lastGrad = (f[0], df, c[:, 0], dc)
+        return self.lastGrad
+    # endregion
+
+    def optimize(self, popSize=15, maxIter=200, seed=None, polish=True, progress=None, cancel=None):
+        """
+        Runs the global search and then the local polish.
+        :param popSize: population size multiplier for differential evolution
+        :param maxIter: maximum generations
+        :param seed: random seed
+        :param polish: refine the best point with SLSQP
+        :param progress: optional callback progress(stage name, iterations done, iterations allowed)
+        :param cancel: optional callable that returns True to stop; the search then raises calculationCancelled
+        :return: a cycleOptimum
+        """
+        self.batch.nEval = 0
+        self.lastZ = None
+        self.cancel = cancel
+        startTime = time.perf_counter()
+        nVar = len(self.varNames)
+        count = [0]
+
+        def report(stage, total):
+            def callback(*args, **kwargs):
+                count[0] += 1
+                if progress is not None:
+                    progress(stage, count[0], total)
+            count[0] = 0
+            return callback
+
+        fn = lambda Z: self.objectiveAndConstraints(Z)[0]
+        con = NonlinearConstraint(lambda Z: self.objectiveAndConstraints(Z)[1], -np.inf, 0.0)
+        de = differential_evolution(fn, [(0.0, 1.0)] * nVar, constraints=con, popsize=popSize, maxiter=maxIter,
+                                    seed=seed, polish=False, vectorized=True, updating='deferred', tol=1.0E-8,
+                                    callback=report('Differential evolution', maxIter))
+        z = de.x
+        message = de.message
+        if polish:
+            sl = minimize(lambda z: self.gradient(z)[0], z, jac=lambda z: self.gradient(z)[1], method='SLSQP',
+                          bounds=[(0.0, 1.0)] * nVar,
+                          constraints={'type': 'ineq', 'fun': lambda z: -self.gradient(z)[2],
+                                       'jac': lambda z: -self.gradient(z)[3]},
+                          options={'ftol': 1.0E-12, 'maxiter': 100}, callback=report('SLSQP polish', 100))
+            f, c = self.objectiveAndConstraints(sl.x[:, None])
+            if np.all(c <= 1.0E-6) and (f[0] <= de.fun or not np.all(de.constr_violation <= 0)):
+                z = sl.x
+                message = sl.message
+        result = cycleOptimum()
+        result.cycleType = self.batch.cycleType
+        result.objective = self.objective
+        result.varNames = self.varNames
+        result.x = self.toX(z)
+        result.values = {k: float(v[0]) for k, v in self.batch.evaluate(result.x[:, None]).items()}
+        result.feasible = result.values['PPeak'] <= self.PMax * (1 + 1.0E-6) and \
+            result.values['TPeak'] <= self.TMax * (1 + 1.0E-6)
+        result.nEval = self.batch.nEval
+        result.wallTime = time.perf_counter() - startTime
+        result.message = str(message)
+        return result
+# endregion
+
+
+def main():
+    for cycleType in ('otto', 'diesel', 'dual'):
+        for objective in ('Eff', 'W_Cycle'):
+            opt = cycleOptimizer(cycleType=cycleType, objective=objective, PMax=8.0E6, TMax=2500.0)
+            result = opt.optimize(seed=1)
+            print(cycleType, result.getInputs(), result.values)
+            print(result.getSummary())
+
+
+if __name__ == "__main__":
+    main()
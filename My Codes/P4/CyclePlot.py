@@ -0,0 +1,125 @@
+# region imports
+from matplotlib import pyplot as plt
+
+
+# endregion
+
+# region class definitions
+class cyclePlotArtists():
+    """
+    Holds the matplotlib artists for a cycle plot so a view can create them once and then just update them.
+    The curves, axis labels, title and summary text are changed with set_data/set_text and the axes are rescaled
+    in place rather than cleared.  The state markers are animated artists drawn on top of a cached background, so
+    a change that only moves the markers is done by blitting instead of redrawing the whole figure.
+    """
+
+    def __init__(self):
+        self.ax = None
+        self.canvas = None
+        self.curves = []
+        self.colors = ()
+        self.labels = ()
+        self.markers = None
+        self.summary = None
+        self.background = None
+        self.drawCid = None
+        self.lastCurves = None  # (x, y) arrays of the curves last drawn
+        self.lastLayout = None  # labels, title and scales last drawn
+
+    def hasArtists(self, ax):
+        """
+        The artists are only usable if they are still on ax (another view or an ax.clear() may have removed them).
+        """
+        return self.ax is ax and self.markers is not None and self.markers in ax.lines
+
+    def createArtists(self, ax, canvas=None, colors=('k', 'g'), labels=None):
+        """
+        Clears ax and creates one line per curve, one line for all the state markers and the summary text.
+        :param ax: the axes to draw on
+        :param canvas: the FigureCanvas (None when plotting from the command line)
+        :param colors: one color per curve
+        :param labels: optional legend label per curve (None to leave a curve out of the legend)
+        """
+        ax.clear()
+        self.ax = ax
+        self.colors = tuple(colors)
+        self.labels = tuple(labels) if labels is not None else ()
+        labels = labels if labels is not None else [None] * len(colors)
+        self.curves = [ax.plot([], [], color=c, label='_nolegend_' if l is None else l)[0]
+                       for c, l in zip(colors, labels)]
+        if any(l is not None for l in labels):
+            ax.legend(loc='best')
+        self.markers = ax.plot([], [], linestyle='', marker='o', markerfacecolor='w', markeredgecolor='k',
+                               animated=canvas is not None)[0]
+        self.summary = ax.text(0.05, 0.7, '', transform=ax.transAxes)
+        ax.tick_params(axis='both', which='both', direction='in', top=True, right=True, labelsize='large')
+        self.lastCurves = None
+        self.lastLayout = None
+        self.background = None
+        if canvas is not self.canvas:
+            if self.canvas is not None and self.drawCid is not None:
+                self.canvas.mpl_disconnect(self.drawCid)
+            self.canvas = canvas
+            self.drawCid = None if canvas is None else canvas.mpl_connect('draw_event', self.onDraw)
+
+    def onDraw(self, event=None):
+        """
+        After every full draw (including resizes), grab the background and put the animated markers back on top.
+        """
+        if self.canvas is None or not self.hasArtists(self.ax):
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.markers)
+
+    def plot(self, ax, canvas, curves, markers, xlabel='', ylabel='', title='', logx=False, logy=False,
+             summary='', colors=None, labels=None):
+        """
+        Updates the plot.  If the curves and the layout are unchanged, only the markers get blitted.
+        :param ax: the axes to draw on
+        :param canvas: the FigureCanvas (None when plotting from the command line)
+        :param curves: list of (x, y) arrays, one per curve
+        :param markers: (x, y) arrays for the state markers
+        :param xlabel: x axis label
+        :param ylabel: y axis label
+        :param title: plot title
+        :param logx: log scale for x
+        :param logy: log scale for y
+        :param summary: text to show on the plot
+        :param colors: one color per curve (defaults to black, green, blue, ...)
+        :param labels: optional legend label per curve
+        """
+        colors = tuple(colors) if colors is not None else ('k', 'g', 'b', 'r', 'm', 'c', 'y')[:len(curves)]
+        labelKey = tuple(labels) if labels is not None else ()
+        if not self.hasArtists(ax) or len(self.curves) != len(curves) or self.colors != colors or \
+                self.labels != labelKey:
+            self.createArtists(ax, canvas, colors=colors, labels=labels)
+        self.markers.set_data(markers[0], markers[1])
+        layout = (xlabel, ylabel, title, logx, logy, summary)
+        sameCurves = self.lastCurves is not None and len(self.lastCurves) == len(curves) and \
+            all(x0 is x1 and y0 is y1 for (x0, y0), (x1, y1) in zip(self.lastCurves, curves))
+        if canvas is not None and sameCurves and layout == self.lastLayout and self.background is not None:
+            # marker-only change:  restore the cached background and blit the markers
+            canvas.restore_region(self.background)
+            ax.draw_artist(self.markers)
+            canvas.blit(ax.bbox)
+            return
+
+        for line, (x, y) in zip(self.curves, curves):
+            line.set_data(x, y)
+        if self.lastLayout is None or self.lastLayout[3:5] != (logx, logy):
+            ax.set_xscale('log' if logx else 'linear')
+            ax.set_yscale('log' if logy else 'linear')
+        ax.set_xlabel(xlabel, fontsize='large')
+        ax.set_ylabel(ylabel, fontsize='large')
+        ax.set_title(title, fontsize='large')
+        self.summary.set_text(summary)
+        # rescale to the data in place (the markers are included since they are on the curves)
+        ax.relim()
+        ax.autoscale_view()
+        self.lastCurves = list(curves)
+        self.lastLayout = layout
+        if canvas is None:
+            plt.show()
+        else:
+            canvas.draw()  # onDraw caches the background and draws the markers
+# endregion
@@ -0,0 +1,105 @@
+# region imports
+import threading
+from copy import deepcopy as dc
+from PyQt5 import QtCore as qtc
+from Air import calculationCancelled
+
+
+# endregion
+
+# region class definitions
+class cycleCalcWorker(qtc.QThread):
+    """
+    Runs a cycle controller's calcModel() on a worker thread so the GUI does not freeze during the state solves
+    and path building.  The calculation is done on a copy of the controller's model (made on the GUI thread when
+    the worker is created) and the finished model is handed back through the calculated signal, so the GUI thread
+    can swap it in all at once.
+    """
+    progress = qtc.pyqtSignal(str, int, int)  # node name, nodes done, nodes to do
+    calculated = qtc.pyqtSignal(object, object)  # controller, calculated model
+    cancelled = qtc.pyqtSignal(object)  # controller
+    failed = qtc.pyqtSignal(object, str)  # controller, error message
+
+    def __init__(self, controller, inputs, parent=None):
+        """
+        :param controller: a cycle controller with a calcModel(model, ..., progress=, cancel=) method
+        :param inputs: dict of keyword arguments for calcModel (e.g., from controller.getInputs())
+        :param parent: parent QObject
+        """
+        super().__init__(parent)
+        self.controller = controller
+        self.inputs = dict(inputs)
+        self.model = dc(controller.model)
+        self.stopEvent = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the calculation to stop at the next state or path leg.
+        """
+        self.stopEvent.set()
+
+    def isCancelled(self):
+        return self.stopEvent.is_set()
+
+    def run(self):
+        try:
+            self.controller.calcModel(self.model, progress=self.progress.emit, cancel=self.stopEvent.is_set,
+                                      **self.inputs)
+        except calculationCancelled:
+            self.cancelled.emit(self.controller)
+            return
+        except Exception as e:  # report anything else to the GUI rather than losing it on this thread
+            self.failed.emit(self.controller, str(e))
+            return
+        if self.stopEvent.is_set():
+            self.cancelled.emit(self.controller)
+            return
+        self.calculated.emit(self.controller, self.model)
+
+
+class cycleOptimizeWorker(qtc.QThread):
+    """
+    Runs a cycleOptimizer on a worker thread so the GUI does not freeze during the differential evolution search
+    and the polish.  The optimizer works on its own batch of cycles, so nothing is shared with the GUI thread until
+    the result is handed back through the optimized signal.
+    """
+    progress = qtc.pyqtSignal(str, int, int)  # stage name, iterations done, iterations allowed
+    optimized = qtc.pyqtSignal(object)  # cycleOptimum
+    cancelled = qtc.pyqtSignal()
+    failed = qtc.pyqtSignal(str)  # error message
+
+    def __init__(self, optimizer, parent=None, **options):
+        """
+        :param optimizer: a cycleOptimizer
+        :param parent: parent QObject
+        :param options: keyword arguments for optimizer.optimize (e.g., seed)
+        """
+        super().__init__(parent)
+        self.optimizer = optimizer
+        self.options = options
+        self.stopEvent = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the search to stop at the next batch of cycles.
+        """
+        self.stopEvent.set()
+
+    def isCancelled(self):
+        return self.stopEvent.is_set()
+
+    def run(self):
+        try:
+            result = self.optimizer.optimize(progress=self.progress.emit, cancel=self.stopEvent.is_set,
+                                             **self.options)
+        except calculationCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:  # report anything else to the GUI rather than losing it on this thread
+            self.failed.emit(str(e))
+            return
+        if self.stopEvent.is_set():
+            self.cancelled.emit()
+            return
+        self.optimized.emit(result)
+# endregion
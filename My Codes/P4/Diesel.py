@@ -1,5 +1,8 @@
 # region imports
 from Air import *
+from CycleCache import cycleResult
+from CycleExport import cycleExporter
+from CyclePlot import cyclePlotArtists
 from matplotlib import pyplot as plt
 from PyQt5 import QtWidgets as qtw
 import sys
@@ -64,23 +67,62 @@ class dieselCycleModel():
 
         self.upperCurve = StateDataForPlotting()
         self.lowerCurve = StateDataForPlotting()
+        self.statePoints = StateDataForPlotting()  # states 1-4 as columns for the markers on the plot
+        # path legs that get pieced together into the upper and lower curves
+        self.leg12 = StateDataForPlotting()
+        self.leg23 = StateDataForPlotting()
+        self.leg34 = StateDataForPlotting()
+        self.leg41 = StateDataForPlotting()
+        self.PathPoints = 30  # number of points in each path leg
+        # each state and path leg records what it depends on so the controller only recomputes what changed
+        self.dependencies = cycleDependencies(nodes={'State1': ('p_initial', 'T_initial'),
+                                                     'State2': ('State1', 'Ratio'),
+                                                     'State3': ('State2', 'Cutoff'),
+                                                     'State4': ('State1', 'State3'),
+                                                     'Leg12': ('State1', 'State2', 'PathPoints'),
+                                                     'Leg23': ('State2', 'State3', 'PathPoints'),
+                                                     'Leg34': ('State3', 'State4', 'PathPoints'),
+                                                     'Leg41': ('State4', 'State1', 'PathPoints')})
+        # names of the attributes that make up a calculated result (see CycleCache.cycleResult)
+        self.stateNames = ['State1', 'State2', 'State3', 'State4']
+        self.energyNames = ['W_Compression', 'W_Power', 'Q_In', 'Q_Out', 'W_Cycle', 'Eff']
+        self.legNames = ['leg12', 'leg23', 'leg34', 'leg41']
         self.calculated = False
         self.cycleType = 'diesel'
 
     def getSI(self):
         return self.units.SI
 
+    def getPlotColumns(self, mass=False, total=False):
+        """
+        Gets all six property columns of the lower curve, upper curve and state points converted to the current
+        units on the requested basis.  These are cached by StateDataForPlotting, so only the first request for a
+        basis does any arithmetic.
+        :param mass: True for a mass basis
+        :param total: True for total (extensive) values
+        :return: lowerCurve, upperCurve, statePoints as dicts of lower case property name -> numpy array
+        """
+        args = dict(Units=self.units, mass=mass, total=total, n=self.air.n, MW=self.air.MW)
+        return (self.lowerCurve.getConvertedCols(**args), self.upperCurve.getConvertedCols(**args),
+                self.statePoints.getConvertedCols(**args))
+
 
 class dieselCycleController():
     def __init__(self, model=None, ax=None):
         self.model = dieselCycleModel() if model is None else model
         self.view = dieselCycleView()
         self.view.ax = ax
+        self.cache = None  # an optional CycleCache.cycleResultCache shared between controllers
 
     # region Functions that operate on the model (i.e., change model state)
     def calc(self):
-        # read values from the GUI
-        t0 = self.view.le_TLow.text()
+        self.set(**self.getInputs())
+
+    def getInputs(self):
+        """
+        Reads the values from the GUI.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
         T0 = float(self.view.le_TLow.text())
         P0 = float(self.view.le_P0.text())
         V0 = float(self.view.le_V0.text())
@@ -88,7 +130,16 @@ class dieselCycleController():
         CR = float(self.view.le_CR.text())
         cutoff = TH
         metric = self.view.rdo_Metric.isChecked()
-        self.set(T_0=T0, P_0=P0, V_0=V0, cutoff=cutoff, ratio=CR, SI=metric)
+        return dict(T_0=T0, P_0=P0, V_0=V0, cutoff=cutoff, ratio=CR, SI=metric)
+
+    def getModelInputs(self, model=None):
+        """
+        The inputs the model was last calculated with, in SI units.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
+        model = self.model if model is None else model
+        return dict(T_0=model.T_initial, P_0=model.p_initial, V_0=model.V_Cylinder, cutoff=model.Cutoff,
+                    ratio=model.Ratio, SI=True)
 
     def set(self, T_0=25.0, P_0=100.0, V_0=1.0, cutoff=2, ratio=18.0, SI=True):
         """
@@ -101,79 +152,161 @@ class dieselCycleController():
         :param SI: boolean
         :return: none
         """
-        self.model.units.set(SI=SI)
-        self.model.T_initial = T_0 if SI else T_0 / self.model.units.CF_T
-        self.model.p_initial = P_0 if SI else P_0 / self.model.units.CF_P
-        self.model.Cutoff = cutoff
-        self.model.V_Cylinder = V_0 if SI else V_0 / self.model.units.CF_V
-        self.model.Ratio = ratio
-
-        # note that all state calculations are for molar values
-        self.model.State1 = self.model.air.set(P=self.model.p_initial, T=self.model.T_initial, name='State 1 - BDC')
-        self.model.State2 = self.model.air.set(v=self.model.State1.v / self.model.Ratio, s=self.model.State1.s,
-                                               name='State 2 - TDC')
-        # DIESEL MODIFICATION HERE for state 3 calculation
-        self.model.State3 = self.model.air.set(P=self.model.State2.P, v=self.model.State2.v * self.model.Cutoff,
-                                               name='State 3 - State 3')
-        self.model.State4 = self.model.air.set(v=self.model.State1.v, s=self.model.State3.s, name='State 4 - BDC')
-
-        self.model.air.n = self.model.V_Cylinder / self.model.air.State.v  # calcualte number of moles of air
-        self.model.air.m = self.model.air.n * self.model.air.MW
+        self.calcModel(self.model, T_0=T_0, P_0=P_0, V_0=V_0, cutoff=cutoff, ratio=ratio, SI=SI)
+        self.updateView()
 
-        self.model.W_Compression = self.model.State2.u - self.model.State1.u
-        self.model.W_Power = self.model.State3.u - self.model.State4.u + self.model.State2.P * (
-                    self.model.State2.v * (self.model.Cutoff - 1))
-        self.model.Q_In = self.model.State3.h - self.model.State2.h
-        self.model.Q_Out = self.model.State4.u - self.model.State1.u
+    def calcModel(self, model, T_0=25.0, P_0=100.0, V_0=1.0, cutoff=2, ratio=18.0, SI=True,
+                  progress=None, cancel=None):
+        """
+        Does the work of set() on the given model without touching the view.  This lets a worker thread calculate
+        on a copy of the model and hand it back to the GUI thread when it is done.
+        :param model: the cycle model to calculate
+        :param progress: optional callback progress(name, done, total) called as each state and path leg is finished
+        :param cancel: optional callable that returns True to stop the calculation (raises calculationCancelled)
+        :return: the model
+        """
+        dep = model.dependencies
+        model.units.set(SI=SI)
+        model.T_initial = T_0 if SI else T_0 / model.units.CF_T
+        model.p_initial = P_0 if SI else P_0 / model.units.CF_P
+        model.Cutoff = cutoff
+        model.V_Cylinder = V_0 if SI else V_0 / model.units.CF_V
+        model.Ratio = ratio
+        # inputs are compared in SI units, so switching units alone does not invalidate anything.  The tolerance
+        # keeps values that were only rounded for display (e.g., T in K to 2 decimals) from counting as a change.
+        dep.setInputs(rel_tol=5.0E-5, p_initial=model.p_initial, T_initial=model.T_initial, Cutoff=model.Cutoff,
+                      Ratio=model.Ratio, PathPoints=model.PathPoints)
+        model.p_initial = dep.inputs['p_initial']
+        model.T_initial = dep.inputs['T_initial']
+        model.Cutoff = dep.inputs['Cutoff']
+        model.Ratio = dep.inputs['Ratio']
+
+        dep.setHooks(progress=progress, cancel=cancel)
+        try:
+            # if the states are not all current, see if this calculation has already been done
+            dirty = dep.getDirty()
+            key, result = None, None
+            if dirty and self.cache is not None:
+                key = self.cache.makeKey(model.cycleType, dep.inputs)
+                result = self.cache.get(key)
+                if result is not None:
+                    result.restore(model)
+
+            self.calcStates(model)
+
+            model.air.n = model.V_Cylinder / model.State1.v  # calculate number of moles of air
+            model.air.m = model.air.n * model.air.MW
+
+            model.W_Compression = model.State2.u - model.State1.u
+            model.W_Power = model.State3.u - model.State4.u + model.State2.P * (
+                        model.State2.v * (model.Cutoff - 1))
+            model.Q_In = model.State3.h - model.State2.h
+            model.Q_Out = model.State4.u - model.State1.u
+
+            model.W_Cycle = model.W_Power - model.W_Compression
+            model.Eff = 100.0 * model.W_Cycle / model.Q_In
+            model.calculated = True
+
+            self.buildDataForPlotting(model)
+            if dirty and result is None and self.cache is not None:
+                self.cache.put(key, cycleResult().store(model))
+        finally:
+            dep.setHooks()
+        return model
+
+    def export(self, fileName):
+        """
+        Writes the states, energy terms and path legs of the model in every unit basis to a .npz or .csv file.
+        :param fileName: the extension picks the format
+        """
+        cycleExporter().export(self.model, fileName, inputs=self.getModelInputs())
 
-        self.model.W_Cycle = self.model.W_Power - self.model.W_Compression
-        self.model.Eff = 100.0 * self.model.W_Cycle / self.model.Q_In
-        self.model.calculated = True
+    def exportSweep(self, fileName, sweep, progress=None):
+        """
+        Calculates a sweep of cycles on a copy of the model and writes them to a .npz or .csv file as it goes.
+        :param sweep: an iterable of dicts of calcModel inputs
+        :return: number of runs written
+        """
+        return cycleExporter().exportSweep(self, sweep, fileName, progress=progress)
 
-        self.buildDataForPlotting()
-        self.updateView()
+    def setCache(self, cache=None):
+        """
+        Sets the result cache used by set().
+        :param cache: a CycleCache.cycleResultCache or None to turn caching off
+        """
+        self.cache = cache
 
-    def buildDataForPlotting(self):
+    def calcStates(self, model=None):
+        """
+        Recalculates only the states that were invalidated by a change of input.
+        Note that all state calculations are for molar values.
+        :return: none
+        """
+        model = self.model if model is None else model
+        dep = model.dependencies
+        if dep.startNode('State1'):
+            model.State1 = model.air.set(P=model.p_initial, T=model.T_initial, name='State 1 - BDC')
+            dep.finishNode('State1')
+        if dep.startNode('State2'):
+            model.State2 = model.air.set(v=model.State1.v / model.Ratio, s=model.State1.s, name='State 2 - TDC')
+            dep.finishNode('State2')
+        if dep.startNode('State3'):
+            # DIESEL MODIFICATION HERE for state 3 calculation
+            model.State3 = model.air.set(P=model.State2.P, v=model.State2.v * model.Cutoff,
+                                         name='State 3 - State 3')
+            dep.finishNode('State3')
+        if dep.startNode('State4'):
+            model.State4 = model.air.set(v=model.State1.v, s=model.State3.s, name='State 4 - BDC')
+            dep.finishNode('State4')
+
+    def buildDataForPlotting(self, model=None):
         """
         I want to create state data between states 1-2, 2-3, 3-4, 4-1
         I'll piece together an upperCurve data set from 2-3, 3-4, 4-1
         The lowerCurve data set is 1-2
+        Only the legs invalidated by a change of input get rebuilt, and each leg is calculated in one batch.
         :return:
         """
-        # clear out any old data
-        self.model.upperCurve.clear()
-        self.model.lowerCurve.clear()
+        model = self.model if model is None else model
+        dep = model.dependencies
         a = air()  # an air object
-        # region build upperCurve
-        # region states from 2-3 (v=const, T from T2->T3)
-        DeltaT = np.linspace(self.model.State2.T, self.model.State3.T, 30)
-        for T in DeltaT:
-            state = a.set(T=T, P=self.model.State2.P)
-            self.model.upperCurve.add((state.T, state.P, state.u, state.h, state.s, state.v))
+        N = model.PathPoints  # points in each leg
+        # region states from 2-3 (P=const, T from T2->T3)
+        if dep.startNode('Leg23'):
+            model.leg23.clear()
+            model.leg23.extend(a.setArrays(T=np.linspace(model.State2.T, model.State3.T, N), P=model.State2.P))
+            dep.finishNode('Leg23')
         # endregion
         # region states from 3-4 (v=from TDC to BDC, s=const.)
-        DeltaV = np.linspace(self.model.State3.v, self.model.State4.v, 30)
-        for v in DeltaV:
-            state = a.set(v=v, s=self.model.State3.s)
-            self.model.upperCurve.add((state.T, state.P, state.u, state.h, state.s, state.v))
+        if dep.startNode('Leg34'):
+            model.leg34.clear()
+            model.leg34.extend(a.setArrays(v=np.linspace(model.State3.v, model.State4.v, N), s=model.State3.s))
+            dep.finishNode('Leg34')
         # endregion
         # region states from 4-1 (v=const, T from T4->T1)
-        DeltaT = np.linspace(self.model.State4.T, self.model.State1.T, 30)
-        for T in DeltaT:
-            state = a.set(T=T, v=self.model.State4.v)
-            self.model.upperCurve.add((state.T, state.P, state.u, state.h, state.s, state.v))
+        if dep.startNode('Leg41'):
+            model.leg41.clear()
+            model.leg41.extend(a.setArrays(T=np.linspace(model.State4.T, model.State1.T, N), v=model.State4.v))
+            dep.finishNode('Leg41')
         # endregion
-        # endregion
-
-        # region build lowerCurve
         # region states from 1-2 (v=from BDC to TDC, s=const.)
-        DeltaV = np.linspace(self.model.State1.v, self.model.State2.v, 30)
-        for v in DeltaV:
-            state = a.set(v=v, s=self.model.State1.s)
-            self.model.lowerCurve.add((state.T, state.P, state.u, state.h, state.s, state.v))
-        # endregion
+        if dep.startNode('Leg12'):
+            model.leg12.clear()
+            model.leg12.extend(a.setArrays(v=np.linspace(model.State1.v, model.State2.v, N), s=model.State1.s))
+            dep.finishNode('Leg12')
         # endregion
 
+        # piece together the upperCurve from 2-3, 3-4, 4-1 and the lowerCurve from 1-2
+        model.upperCurve.clear()
+        model.upperCurve.extend(model.leg23)
+        model.upperCurve.extend(model.leg34)
+        model.upperCurve.extend(model.leg41)
+        model.lowerCurve.clear()
+        model.lowerCurve.extend(model.leg12)
+        model.statePoints.clear()
+        for state in (model.State1, model.State2, model.State3, model.State4):
+            model.statePoints.add((state.T, state.P, state.u, state.h, state.s, state.v))
+
     # endregion
 
     # region Functions that operate on the view
@@ -241,6 +374,8 @@ class dieselCycleView():
         self.canvas = None
         self.ax = None
         # endregion
+        self.artists = cyclePlotArtists()  # the plot artists are created once and then updated
+        self.summary = ''  # text to show on the plot (e.g., the result of an optimization)
 
     def updateView(self, cycle):
         cycle.units.set(SI=self.rdo_Metric.isChecked())
@@ -278,44 +413,15 @@ class dieselCycleView():
 
     def convertDataCol(self, cycle, data=None, colName='T', mass=False, total=False):
         UC = cycle.units
-        n = cycle.air.n
-        MW = cycle.air.MW
-        TCF = 1.0 if UC.SI else UC.CF_T
-        PCF = 1.0 if UC.SI else UC.CF_P
-        hCF = 1.0 if UC.SI else UC.CF_e
-        uCF = 1.0 if UC.SI else UC.CF_e
-        sCF = 1.0 if UC.SI else UC.CF_s
-        vCF = 1.0 if UC.SI else UC.CF_v  # convert m^3/mol to ft^3/lbmol
-        nCF = 1.0 if UC.SI else UC.CF_n  # convert mol to lbmol
-        mCF = 1.0 if UC.SI else UC.CF_Mass
-        if mass:
-            hCF /= MW  # kJ/kmol to kJ/kg  or Btu/lbmol to Btu/lbmass
-            uCF /= MW
-            sCF /= MW
-            vCF /= MW
-        elif total:
-            hCF *= n * nCF
-            uCF *= n * nCF
-            sCF *= n * nCF
-            vCF *= n * nCF
+        CF = UC.getConversionFactors(SI=UC.SI, mass=mass, total=total, n=cycle.air.n, MW=cycle.air.MW)
         w = colName.lower()
-        if w == 't':
-            return [T * TCF for T in data]
-        if w == 'h':
-            return [h * hCF for h in data]
-        if w == 'u':
-            return [u * uCF for u in data]
-        if w == 's':
-            return [s * sCF for s in data]
-        if w == 'v':
-            return [v * vCF for v in data]
-        if w == 'p':
-            return [P * PCF for P in data]
+        return [x * CF[w] for x in data]
 
     def plot_cycle_XY(self, cycle, X='s', Y='T', logx=False, logy=False, mass=False, total=False):
         """
         I want to plot any two thermodynaimc properties on X and Y
         Data is in molar metric units.  I may need to convert it.
+        The curves and markers are created once by self.artists and updated in place after that.
         :param X: letter for which variable to plot on X axis
         :param Y: letter for which variable to plot on Y axis
         :return:
@@ -327,66 +433,21 @@ class dieselCycleView():
             self.ax = plt.subplot()
             QTPlotting = False  # actually, we are just using CLI and showing the plot
 
-        ax = self.ax
-        ax.clear()
+        # the upper and lower curves and the states using the columns cached for this basis
+        LC, UC, ST = cycle.getPlotColumns(mass=mass, total=total)
+        x, y = X.lower(), Y.lower()
 
-        ax.set_xscale('log' if logx else 'linear')
-        ax.set_yscale('log' if logy else 'linear')
-
-        # plot the upper and lower curves
-        XdataLC = self.convertDataCol(cycle, colName=X, data=cycle.lowerCurve.getDataCol(X), mass=mass, total=total)
-        YdataLC = self.convertDataCol(cycle, colName=Y, data=cycle.lowerCurve.getDataCol(Y), mass=mass, total=total)
-        XdataUC = self.convertDataCol(cycle, colName=X, data=cycle.upperCurve.getDataCol(X), mass=mass, total=total)
-        YdataUC = self.convertDataCol(cycle, colName=Y, data=cycle.upperCurve.getDataCol(Y), mass=mass, total=total)
-        ax.plot(XdataLC, YdataLC, color='k')
-        ax.plot(XdataUC, YdataUC, color='g')
-
-        # add axis labels
+        # axis labels
         cycle.units.setPlotUnits(SI=cycle.units.SI, mass=mass, total=total)
-        ax.set_ylabel(cycle.lowerCurve.getAxisLabel(Y, Units=cycle.units), fontsize='large')
-        ax.set_xlabel(cycle.lowerCurve.getAxisLabel(X, Units=cycle.units), fontsize='large')
+        xlabel = cycle.lowerCurve.getAxisLabel(X, Units=cycle.units)
+        ylabel = cycle.lowerCurve.getAxisLabel(Y, Units=cycle.units)
 
         # put a title on the plot
         cycle.name = 'Diesel Cycle'
-        ax.set_title(cycle.name, fontsize='large')
-
-        # modify the tick marks
-        ax.tick_params(axis='both', which='both', direction='in', top=True, right=True, labelsize='large')
-
-        # plot the circles for states 1, 2, 3, and 4
-        state1 = dc(cycle.State1)
-        state1.ConvertStateData(SI=cycle.getSI(), Units=cycle.units, n=cycle.air.n, MW=cycle.air.MW, mass=mass,
-                                total=total)
-        state2 = dc(cycle.State2)
-        state2.ConvertStateData(SI=cycle.getSI(), Units=cycle.units, n=cycle.air.n, MW=cycle.air.MW, mass=mass,
-                                total=total)
-        state3 = dc(cycle.State3)
-        state3.ConvertStateData(SI=cycle.getSI(), Units=cycle.units, n=cycle.air.n, MW=cycle.air.MW, mass=mass,
-                                total=total)
-        state4 = dc(cycle.State4)
-        state4.ConvertStateData(SI=cycle.getSI(), Units=cycle.units, n=cycle.air.n, MW=cycle.air.MW, mass=mass,
-                                total=total)
-
-        ax.plot(state1.getVal(X), state1.getVal(Y), marker='o', markerfacecolor='w', markeredgecolor='k')
-        ax.plot(state2.getVal(X), state2.getVal(Y), marker='o', markerfacecolor='w', markeredgecolor='k')
-        ax.plot(state3.getVal(X), state3.getVal(Y), marker='o', markerfacecolor='w', markeredgecolor='k')
-        ax.plot(state4.getVal(X), state4.getVal(Y), marker='o', markerfacecolor='w', markeredgecolor='k')
-        # # set limits on x and y
-        xmin = min(min(cycle.upperCurve.getDataCol(X)), min(cycle.lowerCurve.getDataCol(X)))
-        xmax = max(max(cycle.upperCurve.getDataCol(X)), max(cycle.lowerCurve.getDataCol(X)))
-        ymin = min(min(cycle.upperCurve.getDataCol(Y)), min(cycle.lowerCurve.getDataCol(Y)))
-        ymax = max(max(cycle.upperCurve.getDataCol(Y)), max(cycle.lowerCurve.getDataCol(Y)))
-        # ax.set_xlim(xmin,xmax)
-        # ax.set_ylim(ymin,ymax)
-        deltax = xmax - xmin
-        deltay = ymax - ymin
-        # add the summary text to the plot
-        # ax.text(xmin+0.05*deltax, ymin+0.7*deltay, self.get_summary(cycle))
-        # show the plot
-        if QTPlotting == False:
-            plt.show()
-        else:
-            self.canvas.draw()
+
+        self.artists.plot(self.ax, self.canvas if QTPlotting else None, curves=[(LC[x], LC[y]), (UC[x], UC[y])],
+                          markers=(ST[x], ST[y]), xlabel=xlabel, ylabel=ylabel, title=cycle.name, logx=logx,
+                          logy=logy, summary=self.summary)
 
     def updateDisplayWidgets(self, Model=None):
         # fill out the temperature values
@@ -413,6 +474,7 @@ class dieselCycleView():
                 self.le_TLow.setText(('{:0.2f}'.format(Model.T_initial if SI else U.T_KtoR(Model.T_initial))))
                 self.le_P0.setText('{:0.2f}'.format(Model.p_initial * CFP))
                 self.le_V0.setText('{:0.4f}'.format(Model.V_Cylinder * CFV))
+                self.le_CR.setText('{:0}'.format(Model.Ratio))
 
                 self.le_T1.setText('{:0.2f}'.format(Model.State1.T if SI else U.T_KtoR(Model.State1.T)))
                 self.le_T2.setText('{:0.2f}'.format(Model.State2.T if SI else U.T_KtoR(Model.State2.T)))
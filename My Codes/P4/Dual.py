@@ -1,100 +1,527 @@
 # region imports
-from Air import AirStandardCycle
-import numpy as np
+from Air import *
+from CycleCache import cycleResult
+from CycleExport import cycleExporter
+from CyclePlot import cyclePlotArtists
+from matplotlib import pyplot as plt
+from PyQt5 import QtWidgets as qtw
+import sys
+
+
 # endregion
 
-class dualCycleController():
-    def __init__(self):
-        self.model = AirStandardCycle()
-        self.widgets = []
+# region class definitions
+class dualCycleModel():
+    def __init__(self, p_initial=101325.0, v_cylinder=3.0E-3, t_initial=300.0, pressure_ratio=1.5, cutoff=1.2,
+                 ratio=18.0, name='Air Standard Dual Cycle'):
+        """
+        Constructor for an air standard dual cycle.  The Dual has 5 primary states and consists of five
+        thermodynamic processes:
+        1. Isentropic compression from: v1, T1, P1 to v2, T2, P2 (Note v2=v1/C.R.)
+        2. Constant volume heat addition:  v3=v2, P3=rp*P2
+        3. Constant pressure heat addition:  P4=P3, v4=rc*v3
+        4. Isentropic expansion (power stroke): v5=v1
+        5. Constant volume heat rejection.
+        Compression stroke work = (u2-u1)
+        Power stroke work = (u4-u5)+P3*(v4-v3)
+        Heat in = (u3-u2)+(h4-h3)
+        Heat out = (u5-u1)
+        :param p_initial: Pressure in Pa
+        :type p_initial: float
+        :param v_cylinder: Volume in m^3
+        :type v_cylinder: float
+        :param t_initial: Initial Temperature in K
+        :type t_initial: float
+        :param pressure_ratio: pressure ratio for the constant volume heat addition (P3/P2)
+        :type pressure_ratio: float
+        :param cutoff: cutoff ratio for the constant pressure heat addition (v4/v3)
+        :type cutoff: float
+        :param ratio: Compression ratio (v1/v2)
+        :type ratio: float
+        :param name: a name
+        :type name: string
+        """
+        self.units = units()
+        self.units.SI = False
+        self.air = air()  # the working fluid
+        self.air.set(P=p_initial, T=t_initial)  # initial state if fixed at p_initial, t_initial
+        self.p_initial = p_initial
+        self.T_initial = t_initial
+        self.Ratio = ratio  # the compression ratio V_BDC/V_TDC
+        self.PressureRatio = pressure_ratio  # P3/P2
+        self.Cutoff = cutoff  # v4/v3
+        self.V_Cylinder = v_cylinder
+        self.air.n = self.V_Cylinder / self.air.State.v  # calculate number of moles of air
+        self.air.m = self.air.n * self.air.MW
+        self.name = name
+
+        self.State1 = self.air.set(P=self.p_initial, T=self.T_initial)
+        self.State2 = self.air.set(v=self.State1.v / self.Ratio, s=self.State1.s)
+        self.State3 = self.air.set(v=self.State2.v, P=self.State2.P * self.PressureRatio)
+        self.State4 = self.air.set(P=self.State3.P, v=self.State3.v * self.Cutoff)
+        self.State5 = self.air.set(v=self.State1.v, s=self.State4.s)
+
+        self.W_Compression = self.State2.u - self.State1.u
+        self.W_Power = self.State4.u - self.State5.u + self.State3.P * (self.State4.v - self.State3.v)
+        self.Q_In = self.State3.u - self.State2.u + self.State4.h - self.State3.h
+        self.Q_Out = self.State5.u - self.State1.u
+
+        self.W_Cycle = self.W_Power - self.W_Compression
+        self.Eff = 100.0 * self.W_Cycle / self.Q_In
 
-    def setWidgets(self, w):
-        self.widgets = w
+        self.upperCurve = StateDataForPlotting()
+        self.lowerCurve = StateDataForPlotting()
+        self.statePoints = StateDataForPlotting()  # states 1-5 as columns for the markers on the plot
+        # path legs that get pieced together into the upper and lower curves
+        self.leg12 = StateDataForPlotting()
+        self.leg23 = StateDataForPlotting()
+        self.leg34 = StateDataForPlotting()
+        self.leg45 = StateDataForPlotting()
+        self.leg51 = StateDataForPlotting()
+        self.PathPoints = 30  # number of points in each path leg
+        # each state and path leg records what it depends on so the controller only recomputes what changed
+        self.dependencies = cycleDependencies(nodes={'State1': ('p_initial', 'T_initial'),
+                                                     'State2': ('State1', 'Ratio'),
+                                                     'State3': ('State2', 'PressureRatio'),
+                                                     'State4': ('State3', 'Cutoff'),
+                                                     'State5': ('State1', 'State4'),
+                                                     'Leg12': ('State1', 'State2', 'PathPoints'),
+                                                     'Leg23': ('State2', 'State3', 'PathPoints'),
+                                                     'Leg34': ('State3', 'State4', 'PathPoints'),
+                                                     'Leg45': ('State4', 'State5', 'PathPoints'),
+                                                     'Leg51': ('State5', 'State1', 'PathPoints')})
+        # names of the attributes that make up a calculated result (see CycleCache.cycleResult)
+        self.stateNames = ['State1', 'State2', 'State3', 'State4', 'State5']
+        self.energyNames = ['W_Compression', 'W_Power', 'Q_In', 'Q_Out', 'W_Cycle', 'Eff']
+        self.legNames = ['leg12', 'leg23', 'leg34', 'leg45', 'leg51']
+        self.calculated = False
+        self.cycleType = 'dual'
 
+    def getSI(self):
+        return self.units.SI
+
+    def getPlotColumns(self, mass=False, total=False):
+        """
+        Gets all six property columns of the lower curve, upper curve and state points converted to the current
+        units on the requested basis.  These are cached by StateDataForPlotting, so only the first request for a
+        basis does any arithmetic.
+        :param mass: True for a mass basis
+        :param total: True for total (extensive) values
+        :return: lowerCurve, upperCurve, statePoints as dicts of lower case property name -> numpy array
+        """
+        args = dict(Units=self.units, mass=mass, total=total, n=self.air.n, MW=self.air.MW)
+        return (self.lowerCurve.getConvertedCols(**args), self.upperCurve.getConvertedCols(**args),
+                self.statePoints.getConvertedCols(**args))
+
+
+class dualCycleController():
+    def __init__(self, model=None, ax=None):
+        self.model = dualCycleModel() if model is None else model
+        self.view = dualCycleView()
+        self.view.ax = ax
+        self.cache = None  # an optional CycleCache.cycleResultCache shared between controllers
+
+    # region Functions that operate on the model (i.e., change model state)
     def calc(self):
-        # Parse input widgets
-        THigh = float(self.widgets[5].text())
-        TLow = float(self.widgets[6].text())
-        P0 = float(self.widgets[7].text())
-        V0 = float(self.widgets[8].text())
-        CR = float(self.widgets[9].text())
-
-        # Example extra dual cycle params (you may want to expose in UI later)
-        rc = 1.2               # cutoff ratio
-        rp = 1.5               # pressure ratio (P3/P2)
-        gamma = 1.4            # assume air
-
-        # T1 and P1
-        T1 = TLow
-        P1 = P0 * 101.325      # convert atm to kPa if needed
-        V1 = V0
-        V2 = V1 / CR
-
-        # Process 1-2: isentropic compression
-        T2 = T1 * (CR)**(gamma - 1)
-        P2 = P1 * (CR)**gamma
-
-        # Process 2-3: constant volume heat addition
-        T3 = T2 * rp
-        V3 = V2
-        P3 = P2 * (T3 / T2)
-
-        # Process 3-4: constant pressure heat addition
-        V4 = rc * V3
-        T4 = T3 * (V4 / V3)
-        P4 = P3
-
-        # Process 4-5: isentropic expansion
-        V5 = V1
-        T5 = T4 * (V4 / V5)**(1 - gamma)
-        P5 = P4 * (V4 / V5)**gamma
-
-        # Process 5-1: constant volume heat rejection
-
-        # Calculate work and efficiency
-        cv = 0.718
-        cp = 1.005
-        q_in = cv * (T3 - T2) + cp * (T4 - T3)
-        q_out = cv * (T5 - T1)
-        w_net = q_in - q_out
-        eta = w_net / q_in * 100  # %
-
-        # Update output widgets
-        self.widgets[10].setText(f"{T1:.2f}")
-        self.widgets[11].setText(f"{T2:.2f}")
-        self.widgets[12].setText(f"{T3:.2f}")
-        self.widgets[13].setText(f"{T4:.2f}")
-        self.widgets[18].setText(f"{w_net:.2f}")
-        self.widgets[19].setText(f"{cv*(T2-T1):.2f}")  # Compression stroke
-        self.widgets[20].setText(f"{q_in:.2f}")        # Heat added
-        self.widgets[21].setText(f"{eta:.2f}")
+        self.set(**self.getInputs())
+
+    def getInputs(self):
+        """
+        Reads the values from the GUI.  Like the diesel cycle, the T High box holds the cutoff ratio and the
+        pressure ratio has a box of its own.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
+        T0 = float(self.view.le_TLow.text())
+        P0 = float(self.view.le_P0.text())
+        V0 = float(self.view.le_V0.text())
+        cutoff = float(self.view.le_THigh.text())
+        rp = float(self.view.le_rp.text())
+        CR = float(self.view.le_CR.text())
+        metric = self.view.rdo_Metric.isChecked()
+        return dict(T_0=T0, P_0=P0, V_0=V0, pressureRatio=rp, cutoff=cutoff, ratio=CR, SI=metric)
+
+    def getModelInputs(self, model=None):
+        """
+        The inputs the model was last calculated with, in SI units.
+        :return: a dict of keyword arguments for set() or calcModel()
+        """
+        model = self.model if model is None else model
+        return dict(T_0=model.T_initial, P_0=model.p_initial, V_0=model.V_Cylinder,
+                    pressureRatio=model.PressureRatio, cutoff=model.Cutoff, ratio=model.Ratio, SI=True)
 
+    def set(self, T_0=25.0, P_0=100.0, V_0=1.0, pressureRatio=1.5, cutoff=1.2, ratio=18.0, SI=True):
+        """
+        Sets the initial state of the air and converts units from input
+        :param T_0: Initial temperature in absolute units (R or K)
+        :param P_0: Initial pressure in (atm or pa)
+        :param V_0: Initial volume in (ft^3 or m^3)
+        :param pressureRatio: pressure ratio of the constant volume heat addition (P3/P2)
+        :param cutoff: cutoff ratio of the constant pressure heat addition (v4/v3)
+        :param ratio: Compression ratio
+        :param SI: boolean
+        :return: none
+        """
+        self.calcModel(self.model, T_0=T_0, P_0=P_0, V_0=V_0, pressureRatio=pressureRatio, cutoff=cutoff,
+                       ratio=ratio, SI=SI)
         self.updateView()
 
+    def calcModel(self, model, T_0=25.0, P_0=100.0, V_0=1.0, pressureRatio=1.5, cutoff=1.2, ratio=18.0, SI=True,
+                  progress=None, cancel=None):
+        """
+        Does the work of set() on the given model without touching the view.  This lets a worker thread calculate
+        on a copy of the model and hand it back to the GUI thread when it is done.
+        :param model: the cycle model to calculate
+        :param progress: optional callback progress(name, done, total) called as each state and path leg is finished
+        :param cancel: optional callable that returns True to stop the calculation (raises calculationCancelled)
+        :return: the model
+        """
+        dep = model.dependencies
+        model.units.set(SI=SI)
+        model.T_initial = T_0 if SI else T_0 / model.units.CF_T
+        model.p_initial = P_0 if SI else P_0 / model.units.CF_P
+        model.PressureRatio = pressureRatio
+        model.Cutoff = cutoff
+        model.V_Cylinder = V_0 if SI else V_0 / model.units.CF_V
+        model.Ratio = ratio
+        # inputs are compared in SI units, so switching units alone does not invalidate anything.  The tolerance
+        # keeps values that were only rounded for display (e.g., T in K to 2 decimals) from counting as a change.
+        dep.setInputs(rel_tol=5.0E-5, p_initial=model.p_initial, T_initial=model.T_initial,
+                      PressureRatio=model.PressureRatio, Cutoff=model.Cutoff, Ratio=model.Ratio,
+                      PathPoints=model.PathPoints)
+        model.p_initial = dep.inputs['p_initial']
+        model.T_initial = dep.inputs['T_initial']
+        model.PressureRatio = dep.inputs['PressureRatio']
+        model.Cutoff = dep.inputs['Cutoff']
+        model.Ratio = dep.inputs['Ratio']
+
+        dep.setHooks(progress=progress, cancel=cancel)
+        try:
+            # if the states are not all current, see if this calculation has already been done
+            dirty = dep.getDirty()
+            key, result = None, None
+            if dirty and self.cache is not None:
+                key = self.cache.makeKey(model.cycleType, dep.inputs)
+                result = self.cache.get(key)
+                if result is not None:
+                    result.restore(model)
+
+            self.calcStates(model)
+
+            model.air.n = model.V_Cylinder / model.State1.v  # calculate number of moles of air
+            model.air.m = model.air.n * model.air.MW
+
+            model.W_Compression = model.State2.u - model.State1.u
+            model.W_Power = model.State4.u - model.State5.u + model.State3.P * (model.State4.v - model.State3.v)
+            model.Q_In = model.State3.u - model.State2.u + model.State4.h - model.State3.h
+            model.Q_Out = model.State5.u - model.State1.u
+
+            model.W_Cycle = model.W_Power - model.W_Compression
+            model.Eff = 100.0 * model.W_Cycle / model.Q_In
+            model.calculated = True
+
+            self.buildDataForPlotting(model)
+            if dirty and result is None and self.cache is not None:
+                self.cache.put(key, cycleResult().store(model))
+        finally:
+            dep.setHooks()
+        return model
+
+    def export(self, fileName):
+        """
+        Writes the states, energy terms and path legs of the model in every unit basis to a .npz or .csv file.
+        :param fileName: the extension picks the format
+        """
+        cycleExporter().export(self.model, fileName, inputs=self.getModelInputs())
+
+    def exportSweep(self, fileName, sweep, progress=None):
+        """
+        Calculates a sweep of cycles on a copy of the model and writes them to a .npz or .csv file as it goes.
+        :param sweep: an iterable of dicts of calcModel inputs
+        :return: number of runs written
+        """
+        return cycleExporter().exportSweep(self, sweep, fileName, progress=progress)
+
+    def setCache(self, cache=None):
+        """
+        Sets the result cache used by set().
+        :param cache: a CycleCache.cycleResultCache or None to turn caching off
+        """
+        self.cache = cache
+
+    def calcStates(self, model=None):
+        """
+        Recalculates only the states that were invalidated by a change of input.
+        Note that all state calculations are for molar values.
+        :return: none
+        """
+        model = self.model if model is None else model
+        dep = model.dependencies
+        if dep.startNode('State1'):
+            model.State1 = model.air.set(P=model.p_initial, T=model.T_initial, name='State 1 - BDC')
+            dep.finishNode('State1')
+        if dep.startNode('State2'):
+            model.State2 = model.air.set(v=model.State1.v / model.Ratio, s=model.State1.s, name='State 2 - TDC')
+            dep.finishNode('State2')
+        if dep.startNode('State3'):
+            model.State3 = model.air.set(v=model.State2.v, P=model.State2.P * model.PressureRatio,
+                                         name='State 3 - TDC')
+            dep.finishNode('State3')
+        if dep.startNode('State4'):
+            model.State4 = model.air.set(P=model.State3.P, v=model.State3.v * model.Cutoff, name='State 4')
+            dep.finishNode('State4')
+        if dep.startNode('State5'):
+            model.State5 = model.air.set(v=model.State1.v, s=model.State4.s, name='State 5 - BDC')
+            dep.finishNode('State5')
+
+    def buildDataForPlotting(self, model=None):
+        """
+        I want to create state data between states 1-2, 2-3, 3-4, 4-5, 5-1
+        I'll piece together an upperCurve data set from 2-3, 3-4, 4-5, 5-1
+        The lowerCurve data set is 1-2
+        Only the legs invalidated by a change of input get rebuilt, and each leg is calculated in one batch.
+        :return:
+        """
+        model = self.model if model is None else model
+        dep = model.dependencies
+        a = air()  # an air object
+        N = model.PathPoints  # points in each leg
+        # region states from 2-3 (v=const, T from T2->T3)
+        if dep.startNode('Leg23'):
+            model.leg23.clear()
+            model.leg23.extend(a.setArrays(T=np.linspace(model.State2.T, model.State3.T, N), v=model.State2.v))
+            dep.finishNode('Leg23')
+        # endregion
+        # region states from 3-4 (P=const, T from T3->T4)
+        if dep.startNode('Leg34'):
+            model.leg34.clear()
+            model.leg34.extend(a.setArrays(T=np.linspace(model.State3.T, model.State4.T, N), P=model.State3.P))
+            dep.finishNode('Leg34')
+        # endregion
+        # region states from 4-5 (v=from v4 to BDC, s=const.)
+        if dep.startNode('Leg45'):
+            model.leg45.clear()
+            model.leg45.extend(a.setArrays(v=np.linspace(model.State4.v, model.State5.v, N), s=model.State4.s))
+            dep.finishNode('Leg45')
+        # endregion
+        # region states from 5-1 (v=const, T from T5->T1)
+        if dep.startNode('Leg51'):
+            model.leg51.clear()
+            model.leg51.extend(a.setArrays(T=np.linspace(model.State5.T, model.State1.T, N), v=model.State5.v))
+            dep.finishNode('Leg51')
+        # endregion
+        # region states from 1-2 (v=from BDC to TDC, s=const.)
+        if dep.startNode('Leg12'):
+            model.leg12.clear()
+            model.leg12.extend(a.setArrays(v=np.linspace(model.State1.v, model.State2.v, N), s=model.State1.s))
+            dep.finishNode('Leg12')
+        # endregion
+
+        # piece together the upperCurve from 2-3, 3-4, 4-5, 5-1 and the lowerCurve from 1-2
+        model.upperCurve.clear()
+        model.upperCurve.extend(model.leg23)
+        model.upperCurve.extend(model.leg34)
+        model.upperCurve.extend(model.leg45)
+        model.upperCurve.extend(model.leg51)
+        model.lowerCurve.clear()
+        model.lowerCurve.extend(model.leg12)
+        model.statePoints.clear()
+        for state in (model.State1, model.State2, model.State3, model.State4, model.State5):
+            model.statePoints.add((state.T, state.P, state.u, state.h, state.s, state.v))
+
+    # endregion
+
+    # region Functions that operate on the view
+    def plot_cycle_XY(self, X='s', Y='T', logx=False, logy=False, mass=False, total=False):
+        self.view.plot_cycle_XY(self.model, X=X, Y=Y, logx=logx, logy=logy, mass=mass, total=total)
+
+    def print_summary(self):
+        self.view.print_summary(self.model)
+
+    def setWidgets(self, w=None, extra=None):
+        """
+        Takes the same list of widgets as the otto and diesel controllers plus the widgets only the dual cycle uses.
+        :param w: the list of widgets shared by all the cycle controllers
+        :param extra: [lbl_rp, le_rp, le_T5, lbl_T5Units]
+        """
+        self.view.lbl_THigh, self.view.lbl_TLow, self.view.lbl_P0, self.view.lbl_V0, self.view.lbl_CR, \
+            self.view.le_THigh, self.view.le_TLow, self.view.le_P0, self.view.le_V0, self.view.le_CR, \
+            self.view.le_T1, self.view.le_T2, self.view.le_T3, self.view.le_T4, \
+            self.view.lbl_T1Units, self.view.lbl_T2Units, self.view.lbl_T3Units, self.view.lbl_T4Units, \
+            self.view.le_PowerStroke, self.view.le_CompressionStroke, self.view.le_HeatAdded, self.view.le_Efficiency, \
+            self.view.lbl_PowerStrokeUnits, self.view.lbl_CompressionStrokeUnits, self.view.lbl_HeatInUnits, \
+            self.view.rdo_Metric, self.view.cmb_Abcissa, self.view.cmb_Ordinate, \
+            self.view.chk_LogAbcissa, self.view.chk_LogOrdinate, self.view.ax, self.view.canvas = w
+        if extra is not None:
+            self.view.lbl_rp, self.view.le_rp, self.view.le_T5, self.view.lbl_T5Units = extra
+
     def updateView(self):
-        # Get selected x/y variables from UI
-        x_choice = self.widgets[24].currentText()
-        y_choice = self.widgets[25].currentText()
-        logx = self.widgets[26].isChecked()
-        logy = self.widgets[27].isChecked()
-
-        # Prepare dummy curve data
-        states = [1, 2, 3, 4, 5]
-        T = [float(self.widgets[10].text()), float(self.widgets[11].text()),
-             float(self.widgets[12].text()), float(self.widgets[13].text()), float(self.widgets[10].text())]
-        P = [100, 200, 300, 250, 100]
-        v = [1.0, 0.1, 0.1, 0.15, 1.0]
-
-        x = {'T': T, 'P': P, 'v': v, 'u': T, 'h': T, 's': T}[x_choice]
-        y = {'T': T, 'P': P, 'v': v, 'u': T, 'h': T, 's': T}[y_choice]
-
-        ax = self.widgets[28]
-        ax.clear()
-        ax.plot(x, y, marker='o')
-
-        if logx: ax.set_xscale('log')
-        if logy: ax.set_yscale('log')
-
-        ax.set_xlabel(x_choice)
-        ax.set_ylabel(y_choice)
-        self.widgets[29].draw()
+        self.view.updateView(cycle=self.model)
+    # endregion
+
+
+class dualCycleView():
+    def __init__(self):
+        # region define some widgets
+        self.lbl_THigh = qtw.QLabel()
+        self.lbl_TLow = qtw.QLabel()
+        self.lbl_P0 = qtw.QLabel()
+        self.lbl_V0 = qtw.QLabel()
+        self.lbl_CR = qtw.QLabel()
+        self.lbl_rp = qtw.QLabel()
+        self.le_THigh = qtw.QLineEdit()
+        self.le_TLow = qtw.QLineEdit()
+        self.le_P0 = qtw.QLineEdit()
+        self.le_V0 = qtw.QLineEdit()
+        self.le_CR = qtw.QLineEdit()
+        self.le_rp = qtw.QLineEdit()
+        self.le_T1 = qtw.QLineEdit()
+        self.le_T2 = qtw.QLineEdit()
+        self.le_T3 = qtw.QLineEdit()
+        self.le_T4 = qtw.QLineEdit()
+        self.le_T5 = qtw.QLineEdit()
+        self.lbl_T1Units = qtw.QLabel()
+        self.lbl_T2Units = qtw.QLabel()
+        self.lbl_T3Units = qtw.QLabel()
+        self.lbl_T4Units = qtw.QLabel()
+        self.lbl_T5Units = qtw.QLabel()
+        self.le_Efficiency = qtw.QLineEdit()
+        self.le_PowerStroke = qtw.QLineEdit()
+        self.le_CompressionStroke = qtw.QLineEdit()
+        self.le_HeatAdded = qtw.QLineEdit()
+        self.lbl_PowerStrokeUnits = qtw.QLabel()
+        self.lbl_CompressionStrokeUnits = qtw.QLabel()
+        self.lbl_HeatInUnits = qtw.QLabel()
+        self.rdo_Metric = qtw.QRadioButton()
+        self.cmb_Abcissa = qtw.QComboBox()
+        self.cmb_Ordinate = qtw.QComboBox()
+        self.chk_LogAbcissa = qtw.QCheckBox()
+        self.chk_LogOrdinate = qtw.QCheckBox()
+        self.canvas = None
+        self.ax = None
+        # endregion
+        self.artists = cyclePlotArtists()  # the plot artists are created once and then updated
+        self.summary = ''  # text to show on the plot (e.g., the result of an optimization)
+
+    def updateView(self, cycle):
+        cycle.units.set(SI=self.rdo_Metric.isChecked())
+        logx = self.chk_LogAbcissa.isChecked()
+        logy = self.chk_LogOrdinate.isChecked()
+        xvar = self.cmb_Abcissa.currentText()
+        yvar = self.cmb_Ordinate.currentText()
+        if cycle.calculated:
+            self.plot_cycle_XY(cycle, X=xvar, Y=yvar, logx=logx, logy=logy, mass=False, total=True)
+        self.updateDisplayWidgets(Model=cycle)
+
+    def print_summary(self, cycle):
+        print('Cycle Summary for: ', cycle.name)
+        print('\tEfficiency: {:0.3f}%'.format(cycle.Eff))
+        print('\tPower Stroke: {:0.3f} kJ/kmol'.format(cycle.W_Power))
+        print('\tCompression Stroke: {:0.3f} kJ/kmol'.format(cycle.W_Compression))
+        print('\tHeat Added: {:0.3f} kJ/kmol'.format(cycle.Q_In))
+        cycle.State1.print()
+        cycle.State2.print()
+        cycle.State3.print()
+        cycle.State4.print()
+        cycle.State5.print()
+
+    def plot_cycle_XY(self, cycle, X='s', Y='T', logx=False, logy=False, mass=False, total=False):
+        """
+        I want to plot any two thermodynaimc properties on X and Y
+        Data is in molar metric units.  I may need to convert it.
+        The curves and markers are created once by self.artists and updated in place after that.
+        :param X: letter for which variable to plot on X axis
+        :param Y: letter for which variable to plot on Y axis
+        :return:
+        """
+        if X == Y:
+            return
+        QTPlotting = True  # assumes we are plotting onto a QT GUI form
+        if self.ax == None:
+            self.ax = plt.subplot()
+            QTPlotting = False  # actually, we are just using CLI and showing the plot
+
+        # the upper and lower curves and the states using the columns cached for this basis
+        LC, UC, ST = cycle.getPlotColumns(mass=mass, total=total)
+        x, y = X.lower(), Y.lower()
+
+        # axis labels
+        cycle.units.setPlotUnits(SI=cycle.units.SI, mass=mass, total=total)
+        xlabel = cycle.lowerCurve.getAxisLabel(X, Units=cycle.units)
+        ylabel = cycle.lowerCurve.getAxisLabel(Y, Units=cycle.units)
+
+        # put a title on the plot
+        cycle.name = 'Dual Cycle'
+
+        self.artists.plot(self.ax, self.canvas if QTPlotting else None, curves=[(LC[x], LC[y]), (UC[x], UC[y])],
+                          markers=(ST[x], ST[y]), xlabel=xlabel, ylabel=ylabel, title=cycle.name, logx=logx,
+                          logy=logy, summary=self.summary)
+
+    def updateDisplayWidgets(self, Model=None):
+        # fill out the temperature values
+        U = Model.units
+        SI = U.SI
+
+        self.lbl_THigh.setText('Cutoff:  ')
+        self.lbl_rp.setText('Pressure ratio:  ')
+        self.lbl_TLow.setText('T Low ({})'.format(Model.units.TUnits))
+        self.lbl_P0.setText('P0 ({})'.format(Model.units.PUnits))
+        self.lbl_V0.setText('V0 ({})'.format(Model.units.VUnits))
+
+        self.lbl_T1Units.setText(Model.units.TUnits)
+        self.lbl_T2Units.setText(Model.units.TUnits)
+        self.lbl_T3Units.setText(Model.units.TUnits)
+        self.lbl_T4Units.setText(Model.units.TUnits)
+        self.lbl_T5Units.setText(Model.units.TUnits)
+
+        if Model.units.changed or Model.calculated:
+            if Model.calculated:
+                CFE = 1.0 if SI else U.CF_E
+                CFP = 1.0 if SI else U.CF_P
+                CFV = 1.0 if SI else U.CF_V
+                self.le_THigh.setText('{:0}'.format(Model.Cutoff))
+                self.le_rp.setText('{:0}'.format(Model.PressureRatio))
+                self.le_TLow.setText(('{:0.2f}'.format(Model.T_initial if SI else U.T_KtoR(Model.T_initial))))
+                self.le_P0.setText('{:0.2f}'.format(Model.p_initial * CFP))
+                self.le_V0.setText('{:0.4f}'.format(Model.V_Cylinder * CFV))
+                self.le_CR.setText('{:0}'.format(Model.Ratio))
+
+                self.le_T1.setText('{:0.2f}'.format(Model.State1.T if SI else U.T_KtoR(Model.State1.T)))
+                self.le_T2.setText('{:0.2f}'.format(Model.State2.T if SI else U.T_KtoR(Model.State2.T)))
+                self.le_T3.setText('{:0.2f}'.format(Model.State3.T if SI else U.T_KtoR(Model.State3.T)))
+                self.le_T4.setText('{:0.2f}'.format(Model.State4.T if SI else U.T_KtoR(Model.State4.T)))
+                self.le_T5.setText('{:0.2f}'.format(Model.State5.T if SI else U.T_KtoR(Model.State5.T)))
+
+                # fill out the other properties for the dual cycle
+                self.le_Efficiency.setText('{:0.3f}'.format(Model.Eff))
+                self.le_PowerStroke.setText('{:0.3f}'.format(Model.air.n * Model.W_Power * CFE))
+                self.le_CompressionStroke.setText('{:0.3f}'.format(Model.air.n * Model.W_Compression * CFE))
+                self.le_HeatAdded.setText('{:0.3f}'.format(Model.air.n * Model.Q_In * CFE))
+                self.lbl_PowerStrokeUnits.setText(Model.units.EUnits)
+                self.lbl_CompressionStrokeUnits.setText(Model.units.EUnits)
+                self.lbl_HeatInUnits.setText(Model.units.EUnits)
+            else:
+                CFP = 1 / U.CF_P if SI else U.CF_P
+                CFV = 1 / U.CF_V if SI else U.CF_V
+                t_initial = float(self.le_TLow.text())
+                p_initial = float(self.le_P0.text())
+                v_initial = float(self.le_V0.text())
+                self.le_THigh.setText('{:0}'.format(Model.Cutoff))
+                self.le_rp.setText('{:0}'.format(Model.PressureRatio))
+                self.le_TLow.setText(('{:0.2f}'.format(U.T_RtoK(t_initial) if SI else U.T_KtoR(t_initial))))
+                self.le_P0.setText('{:0.2f}'.format(p_initial * CFP))
+                self.le_V0.setText('{:0.4f}'.format(v_initial * CFV))
+            Model.units.changed = False
+
+
+# endregion
+
+def main():
+    dc = dualCycleController()
+    dc.set(T_0=540.0, P_0=1.0, pressureRatio=1.5, cutoff=1.2, ratio=18.0, V_0=0.861E-3, SI=False)
+    dc.print_summary()
+    dc.plot_cycle_XY(X='v', Y='P', total=True)
+
+
+if __name__ == "__main__":
+    app = qtw.QApplication(sys.argv)
+    main()
@@ -0,0 +1,280 @@
+# region imports
+import time
+import numpy as np
+import scipy.sparse as sp
+from scipy.integrate import solve_ivp
+from matplotlib import pyplot as plt
+from Air import air
+
+
+# endregion
+
+# region class definitions
+class engineResult():
+    """
+    The result of a crank angle simulation.  The arrays have one row per operating point and one column per crank
+    angle.  The crank angle is in degrees with firing TDC at 0, so the closed part of the cycle runs from BDC at -180
+    to BDC at 180.  The exhaust and intake strokes (180 to 540) are taken at constant pressure and are only in
+    the full cycle arrays (thetaFull, VFull, PFull).
+    """
+
+    def __init__(self):
+        self.theta = None  # crank angle of the closed part of the cycle in degrees
+        self.V = None  # m^3
+        self.P = None  # Pa
+        self.T = None  # K
+        self.xb = None  # mass fraction burned
+        self.thetaFull = None  # crank angle of the whole 720 degree cycle, -180 to 540
+        self.VFull = None
+        self.PFull = None
+        self.Q_Wall = None  # cumulative heat lost to the walls in J
+        self.W_Net = None  # net work per cycle including pumping in J
+        self.Q_In = None  # heat released by combustion per cycle in J
+        self.Eff = None  # thermal efficiency in %
+        self.IMEP = None  # indicated mean effective pressure in Pa
+        self.PMax = None  # peak pressure in Pa
+        self.thetaPMax = None  # crank angle of peak pressure in degrees
+        self.energyError = None  # closed part energy balance n*(u2-u1)-(Q_In-Q_Wall-W) in J, using air.uArray
+        self.nfev = 0
+        self.njev = 0
+        self.wallTime = 0.0
+        self.message = ''
+
+
+class crankAngleEngine():
+    """
+    A single zone, finite rate model of the closed part of a four stroke engine cycle.  The cylinder temperature is
+    integrated over crank angle with:
+        slider-crank cylinder volume,
+        Wiebe function heat release,
+        Woschni wall heat transfer (the motored gas velocity term only),
+        cv(T) of the air class, so u(T) is the same as for the air standard cycles.
+    Any of the operating inputs can be arrays, in which case all the operating points are integrated together as
+    one system.  Each point only depends on its own temperature, so the Jacobian is diagonal and is given
+    analytically.
+    All values are in SI units with angles in degrees.
+    """
+
+    def __init__(self, bore=0.086, stroke=0.086, conRod=0.145, ratio=10.0, rpm=2000.0, T_intake=320.0,
+                 p_intake=100.0E3, p_exhaust=105.0E3, Q_fuel=1700.0, thetaStart=-15.0, burnDuration=50.0, wiebeA=5.0,
+                 wiebeM=2.0, T_wall=450.0, woschniC1=2.28):
+        """
+        :param bore: cylinder bore in m
+        :param stroke: stroke in m
+        :param conRod: connecting rod length in m
+        :param ratio: compression ratio
+        :param rpm: engine speed in rev/min
+        :param T_intake: temperature at the start of compression (BDC) in K
+        :param p_intake: pressure at the start of compression and during the intake stroke in Pa
+        :param p_exhaust: pressure during the exhaust stroke in Pa
+        :param Q_fuel: heat released by the fuel per cycle in J
+        :param thetaStart: start of combustion in degrees (negative is before TDC)
+        :param burnDuration: combustion duration in degrees
+        :param wiebeA: Wiebe efficiency parameter
+        :param wiebeM: Wiebe form factor
+        :param T_wall: cylinder wall temperature in K
+        :param woschniC1: Woschni coefficient on the mean piston speed
+        """
+        self.air = air()
+        self.bore = bore
+        self.stroke = stroke
+        self.conRod = conRod
+        self.ratio = ratio
+        self.rpm = rpm
+        self.T_intake = T_intake
+        self.p_intake = p_intake
+        self.p_exhaust = p_exhaust
+        self.Q_fuel = Q_fuel
+        self.thetaStart = thetaStart
+        self.burnDuration = burnDuration
+        self.wiebeA = wiebeA
+        self.wiebeM = wiebeM
+        self.T_wall = T_wall
+        self.woschniC1 = woschniC1
+        self.nfev = 0
+        self.njev = 0
+
+    # region geometry and sub-models
+    # these take theta as a scalar or an array that broadcasts with the (N, 1) parameter columns
+    inputNames = ('bore', 'stroke', 'conRod', 'ratio', 'rpm', 'T_intake', 'p_intake', 'p_exhaust', 'Q_fuel',
+                  'thetaStart', 'burnDuration', 'wiebeA', 'wiebeM', 'T_wall', 'woschniC1')
+
+    def getN(self):
+        """
+        The number of operating points (the size the 1-D array inputs broadcast to).
+        """
+        return int(np.prod(np.broadcast_shapes(*[(np.size(getattr(self, name)),) for name in self.inputNames])))
+
+    def getParams(self, N=None):
+        """
+        The operating inputs as (N, 1) columns so they broadcast against arrays of crank angles, plus the
+        combinations of them that rhs and jac need, worked out once so each call of rhs is only a few array
+        operations.
+        :return: a dict of name -> (N, 1) array
+        """
+        N = self.getN() if N is None else N
+        p = {name: np.broadcast_to(np.asarray(getattr(self, name), dtype=float), (N,)).reshape(N, 1).copy()
+             for name in self.inputNames}
+        p['a'] = p['stroke'] / 2.0  # crank radius
+        p['Ap'] = np.pi * p['bore'] ** 2 / 4.0  # piston area
+        p['Vd'] = p['Ap'] * p['stroke']
+        p['Vc'] = p['Vd'] / (p['ratio'] - 1.0)
+        p['n'] = p['p_intake'] * (p['Vc'] + p['Vd']) / (self.air.RBar * p['T_intake'])  # moles in the cylinder
+        p['nR'] = p['n'] * self.air.RBar
+        # Woschni:  h=3.26*B**-0.2*P[kPa]**0.8*T**-0.55*w**0.8 and with P=nRT/V, h=KW*V**-0.8*T**0.25.  The heat
+        # loss per degree is h*A*(T-Tw)*dt/dtheta, so dt/dtheta=1/(6*rpm) is folded into KW too.
+        w = p['woschniC1'] * 2.0 * p['stroke'] * p['rpm'] / 60.0  # gas velocity from the mean piston speed
+        p['KW'] = 3.26 * p['bore'] ** -0.2 * (p['nR'] / 1000.0) ** 0.8 * w ** 0.8 / (6.0 * p['rpm'])
+        p['wiebeM1'] = p['wiebeM'] + 1.0
+        return p
+
+    def volume(self, theta, p):
+        """
+        Slider-crank cylinder volume and its derivative.
+        :param theta: crank angle in degrees (0 is TDC)
+        :param p: dict from getParams
+        :return: V in m^3, dV/dtheta in m^3/degree
+        """
+        a = p['a']
+        l = p['conRod']
+        th = np.radians(theta)
+        sin = np.sin(th)
+        cos = np.cos(th)
+        root = np.sqrt(l * l - (a * sin) ** 2)
+        V = p['Vc'] + p['Ap'] * (l + a - a * cos - root)
+        dV = p['Ap'] * a * sin * (1.0 + a * cos / root) * (np.pi / 180.0)
+        return V, dV
+
+    def burnRate(self, theta, p):
+        """
+        Wiebe function mass fraction burned and its derivative.
+        :return: xb, dxb/dtheta in 1/degree
+        """
+        z = np.maximum((theta - p['thetaStart']) / p['burnDuration'], 0.0)
+        zm = z ** p['wiebeM']
+        e = np.exp(-p['wiebeA'] * zm * z)
+        return 1.0 - e, p['wiebeA'] * p['wiebeM1'] / p['burnDuration'] * zm * e
+
+    def wallLoss(self, V, T, p):
+        """
+        Woschni heat loss to the walls.
+        :return: dQwall/dtheta in J/degree and h*A*dt/dtheta in J/(K*degree)
+        """
+        hA = p['KW'] * V ** -0.8 * T ** 0.25 * (2.0 * p['Ap'] + 4.0 * V / p['bore'])
+        return hA * (T - p['T_wall']), hA
+    # endregion
+
+    # region right hand side and jacobian
+    def rhs(self, theta, T, p=None):
+        """
+        dT/dtheta for every operating point:  n*cv(T)*dT/dtheta = Q_fuel*dxb/dtheta - dQwall/dtheta - P*dV/dtheta
+        :param theta: crank angle in degrees
+        :param T: temperatures with shape (N,) or (N, k) for k values of T at once
+        :return: array the shape of T in K/degree
+        """
+        p = self.params if p is None else p
+        self.nfev += 1
+        T2 = T.reshape(len(T), -1)
+        V, dV = self.volume(theta, p)
+        xb, dxb = self.burnRate(theta, p)
+        dQw, hA = self.wallLoss(V, T2, p)
+        g = p['Q_fuel'] * dxb - dQw - p['nR'] * T2 * dV / V
+        return (g / (p['n'] * self.air.cvArray(T2))).reshape(T.shape)
+
+    def jac(self, theta, T, p=None):
+        """
+        The analytic Jacobian of rhs, which is diagonal.
+        :return: the diagonal as an array of shape (N,)
+        """
+        p = self.params if p is None else p
+        self.njev += 1
+        T2 = T.reshape(len(T), 1)
+        V, dV = self.volume(theta, p)
+        xb, dxb = self.burnRate(theta, p)
+        dQw, hA = self.wallLoss(V, T2, p)
+        ncv = p['n'] * self.air.cvArray(T2)
+        f = (p['Q_fuel'] * dxb - dQw - p['nR'] * T2 * dV / V) / ncv
+        # d(dQw)/dT=hA+0.25*hA*(T-Tw)/T since hA goes as T**0.25
+        dg = -hA - 0.25 * dQw / T2 - p['nR'] * dV / V
+        return ((dg - f * p['n'] * self.air.dcpArray(T2)) / ncv).ravel()
+    # endregion
+
+    def simulate(self, resolution=0.1, method=None, rtol=1.0E-6, atol=1.0E-6):
+        """
+        Integrates the closed part of the cycle from BDC (-180) to BDC (180) for all the operating points at once.
+        :param resolution: crank angle step of the output in degrees
+        :param method: 'LSODA' (banded Jacobian), 'BDF' or 'Radau' (sparse diagonal Jacobian).  By default LSODA
+                       is used for one operating point and BDF for a sweep, since BDF keeps the number of steps
+                       down when the points burn at different rates.
+        :return: an engineResult
+        """
+        startTime = time.perf_counter()
+        N = self.getN()
+        p = self.params = self.getParams(N)
+        method = method if method is not None else ('LSODA' if N == 1 else 'BDF')
+        self.nfev = 0
+        self.njev = 0
+        theta = np.linspace(-180.0, 180.0, int(round(360.0 / resolution)) + 1)
+        T0 = np.broadcast_to(np.asarray(self.T_intake, dtype=float), (N,)).copy()
+        if method == 'LSODA':
+            # the diagonal in banded form (lband=uband=0)
+            sol = solve_ivp(self.rhs, (theta[0], theta[-1]), T0, method='LSODA', t_eval=theta, rtol=rtol, atol=atol,
+                            jac=lambda t, T: self.jac(t, T)[None, :], lband=0, uband=0)
+        else:
+            sol = solve_ivp(self.rhs, (theta[0], theta[-1]), T0, method=method, t_eval=theta, rtol=rtol, atol=atol,
+                            jac=lambda t, T: sp.diags(self.jac(t, T)), vectorized=True)
+        result = engineResult()
+        result.message = sol.message
+        result.theta = theta
+        T = sol.y
+        V, dV = self.volume(theta[None, :], p)
+        P = p['nR'] * T / V
+        xb, dxb = self.burnRate(theta[None, :], p)
+        dQw, hA = self.wallLoss(V, T, p)
+        result.T, result.V, result.P, result.xb = T, V, P, xb
+        # exhaust (180 to 360) and intake (360 to 540) strokes at constant pressure
+        thetaGas = theta[1:] + 360.0
+        VGas, dVGas = self.volume(thetaGas[None, :], p)
+        PGas = np.where(thetaGas[None, :] <= 360.0, p['p_exhaust'], p['p_intake'])
+        result.thetaFull = np.concatenate([theta, thetaGas])
+        result.VFull = np.concatenate([V, VGas], axis=1)
+        result.PFull = np.concatenate([P, PGas], axis=1)
+        result.Q_Wall = np.concatenate([np.zeros((N, 1)), np.cumsum(0.5 * (dQw[:, 1:] + dQw[:, :-1]) *
+                                                                    np.diff(theta), axis=1)], axis=1)
+        W_Closed = np.trapezoid(P * dV, theta, axis=1)
+        Vd = p['Vd'].ravel()
+        W_Pump = -(p['p_exhaust'] - p['p_intake']).ravel() * Vd
+        result.Q_In = (p['Q_fuel'] * (xb[:, -1:] - xb[:, :1])).ravel()
+        result.W_Net = W_Closed + W_Pump
+        result.Eff = 100.0 * result.W_Net / result.Q_In
+        result.IMEP = result.W_Net / Vd
+        result.PMax = P.max(axis=1)
+        result.thetaPMax = theta[P.argmax(axis=1)]
+        du = p['n'].ravel() * (self.air.uArray(T[:, -1]) - self.air.uArray(T[:, 0]))
+        result.energyError = du - (result.Q_In - result.Q_Wall[:, -1] - W_Closed)
+        result.nfev = sol.nfev
+        result.njev = sol.njev
+        result.wallTime = time.perf_counter() - startTime
+        return result
+# endregion
+
+
+def main():
+    eng = crankAngleEngine()
+    res = eng.simulate()
+    print('1 point:  {:0.1f} ms, nfev={}, njev={}'.format(1000 * res.wallTime, res.nfev, res.njev))
+    print('Eff={:0.2f}%  IMEP={:0.1f} kPa  PMax={:0.0f} kPa at {:0.1f} deg  energy error={:0.2e} J'.format(
+        res.Eff[0], res.IMEP[0] / 1000, res.PMax[0] / 1000, res.thetaPMax[0], res.energyError[0]))
+    # a speed and load sweep
+    rpm, Q = np.meshgrid(np.linspace(1000, 6000, 20), np.linspace(600, 1800, 10))
+    eng = crankAngleEngine(rpm=rpm.ravel(), Q_fuel=Q.ravel())
+    res = eng.simulate()
+    print('{} points:  {:0.1f} ms'.format(rpm.size, 1000 * res.wallTime))
+    plt.plot(res.VFull[0] * 1.0E6, res.PFull[0] / 1000.0)
+    plt.xlabel('V (cm$^3$)')
+    plt.ylabel('P (kPa)')
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
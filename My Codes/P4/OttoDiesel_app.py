@@ -2,9 +2,20 @@
 from OttoDiesel_GUI import Ui_Form
 from PyQt5 import uic
 import sys
+import os
 from PyQt5 import QtWidgets as qtw
+from PyQt5 import QtCore as qtc
+from PyQt5 import QtGui
 from Otto import ottoCycleController
 from Diesel import dieselCycleController
+from Dual import dualCycleController
+from Brayton import braytonCycleController
+from CycleCache import cycleResultCache
+from CycleWorker import cycleCalcWorker, cycleOptimizeWorker
+from CycleOptimizer import cycleOptimizer, cycleBatch
+from CycleCompare import cycleComparison
+from CycleAnimation import cycleAnimator
+from CycleHistory import cycleHistory
 from Air import *
 
 #these imports are necessary for drawing a matplot lib graph on my GUI
@@ -14,8 +25,16 @@ from matplotlib.figure import Figure
 #endregion
 
 class MainWindow(qtw.QWidget, Ui_Form):
-    def __init__(self):
-        """MainWindow constructor"""
+    def __init__(self, cacheSize=64, cacheDir=None, historySize=50,
+                 historyMemory=20, historyDir=None):
+        """
+        MainWindow constructor
+        :param cacheSize: number of calculated cycles to keep in memory
+        :param cacheDir: directory for the persistent tier of the result cache (None to keep it in memory only)
+        :param historySize: number of runs in the run history
+        :param historyMemory: number of runs in the history held in memory
+        :param historyDir: directory the other runs in the history are spilled to (None to keep them all in memory)
+        """
         super().__init__()
         self.setupUi(self)
         # Main UI code goes here
@@ -37,9 +56,55 @@ class MainWindow(qtw.QWidget, Ui_Form):
         self.cmb_OttoDiesel.currentIndexChanged.connect(self.selectCycle)
         # End main ui code
 
+        #the dual cycle needs a pressure ratio input and a fifth state output that are not on the form
+        self.cmb_OttoDiesel.addItem('Dual cycle')
+        self.lbl_rp=qtw.QLabel('Pressure ratio:  ', self.gb_Input)
+        self.le_rp=qtw.QLineEdit('1.5', self.gb_Input)
+        self.gridLayout.addWidget(self.lbl_rp, 5, 0, 1, 1, qtc.Qt.AlignRight)
+        self.gridLayout.addWidget(self.le_rp, 5, 1, 1, 1)
+        self.lbl_T5=qtw.QLabel('T5', self.gb_Output)
+        self.le_T5=qtw.QLineEdit(self.gb_Output)
+        self.le_T5.setEnabled(False)
+        self.lbl_T5Units=qtw.QLabel(self.gb_Output)
+        self.grid_Output.addWidget(self.lbl_T5, 5, 0, 1, 1, qtc.Qt.AlignRight)
+        self.grid_Output.addWidget(self.le_T5, 5, 1, 1, 1)
+        self.grid_Output.addWidget(self.lbl_T5Units, 5, 2, 1, 1)
+        self.dualWidgets=[self.lbl_rp, self.le_rp, self.le_T5, self.lbl_T5Units]
+        for wdg in self.dualWidgets+[self.lbl_T5]:
+            wdg.setVisible(False)
+
+        #the brayton cycle needs component efficiencies, a regenerator and the number of stages
+        self.cmb_OttoDiesel.addItem('Brayton cycle')
+        self.lbl_EtaC=qtw.QLabel('Compressor eff.', self.gb_Input)
+        self.le_EtaC=qtw.QLineEdit('1.0', self.gb_Input)
+        self.lbl_EtaT=qtw.QLabel('Turbine eff.', self.gb_Input)
+        self.le_EtaT=qtw.QLineEdit('1.0', self.gb_Input)
+        self.lbl_Regen=qtw.QLabel('Regenerator eff.', self.gb_Input)
+        self.le_Regen=qtw.QLineEdit('0.0', self.gb_Input)
+        self.lbl_NCompression=qtw.QLabel('Compressor stages', self.gb_Input)
+        self.spn_NCompression=qtw.QSpinBox(self.gb_Input)
+        self.lbl_NExpansion=qtw.QLabel('Turbine stages', self.gb_Input)
+        self.spn_NExpansion=qtw.QSpinBox(self.gb_Input)
+        for spn in (self.spn_NCompression, self.spn_NExpansion):
+            spn.setRange(1, 10)
+        for row, (lbl, wdg) in enumerate([(self.lbl_EtaC, self.le_EtaC), (self.lbl_EtaT, self.le_EtaT),
+                                          (self.lbl_Regen, self.le_Regen)]):
+            self.gridLayout.addWidget(lbl, 6+row, 0, 1, 1, qtc.Qt.AlignRight)
+            self.gridLayout.addWidget(wdg, 6+row, 1, 1, 1)
+        self.gridLayout.addWidget(self.lbl_NCompression, 6, 2, 1, 1, qtc.Qt.AlignRight)
+        self.gridLayout.addWidget(self.spn_NCompression, 6, 3, 1, 1)
+        self.gridLayout.addWidget(self.lbl_NExpansion, 7, 2, 1, 1, qtc.Qt.AlignRight)
+        self.gridLayout.addWidget(self.spn_NExpansion, 7, 3, 1, 1)
+        self.braytonWidgets=[self.le_EtaC, self.le_EtaT, self.le_Regen, self.spn_NCompression, self.spn_NExpansion]
+        self.braytonLabels=[self.lbl_EtaC, self.lbl_EtaT, self.lbl_Regen, self.lbl_NCompression, self.lbl_NExpansion]
+        for wdg in self.braytonWidgets+self.braytonLabels:
+            wdg.setVisible(False)
+
         #create otto and diesel controller objects to work with later
         self.otto = ottoCycleController() #$JES MISSING CODE  # instantiate an ottoCycleController object
         self.diesel = dieselCycleController() #$JES MISSING CODE # instantiate a dieselCycleController object
+        self.dual = dualCycleController()
+        self.brayton = braytonCycleController()
         self.controller=self.otto
         self.someWidgets=[]
 
@@ -54,6 +119,86 @@ class MainWindow(qtw.QWidget, Ui_Form):
         #pass some widgets to the controller for both input and output
         self.otto.setWidgets(w=self.someWidgets)
         self.diesel.setWidgets(w=self.someWidgets)
+        self.dual.setWidgets(w=self.someWidgets, extra=self.dualWidgets)
+        self.brayton.setWidgets(w=self.someWidgets, extra=self.braytonWidgets)
+
+        #share one result cache so re-calculating a configuration that was already done is instant
+        self.cycleCache = cycleResultCache(maxSize=cacheSize, diskDir=cacheDir)
+        self.otto.setCache(self.cycleCache)
+        self.diesel.setCache(self.cycleCache)
+        self.dual.setCache(self.cycleCache)
+        self.brayton.setCache(self.cycleCache)
+
+        #calculations run on a worker thread.  Calculate restarts a short single shot timer, so a burst of clicks
+        #turns into one run, and editing an input cancels a run that is in progress.
+        self.worker=None
+        self.calcPending=False
+        self.calcTimer=qtc.QTimer(self)
+        self.calcTimer.setSingleShot(True)
+        self.calcTimer.setInterval(100)
+        self.calcTimer.timeout.connect(self.startCalc)
+        for le in (self.le_THigh, self.le_TLow, self.le_P0, self.le_V0, self.le_CR, self.le_rp, self.le_EtaC,
+                   self.le_EtaT, self.le_Regen):
+            le.textEdited.connect(self.cancelCalc)
+        for spn in (self.spn_NCompression, self.spn_NExpansion):
+            spn.valueChanged.connect(self.cancelCalc)
+        self.prg_Calc=qtw.QProgressBar(self)
+        self.prg_Calc.setTextVisible(True)
+        self.prg_Calc.setVisible(False)
+        self.main_VerticalLayout.addWidget(self.prg_Calc)
+
+        #optimizer controls:  maximize efficiency or net work subject to peak pressure and temperature limits
+        self.gb_Optimize=qtw.QGroupBox('Optimize', self)
+        optLayout=qtw.QHBoxLayout(self.gb_Optimize)
+        self.cmb_Objective=qtw.QComboBox(self.gb_Optimize)
+        self.cmb_Objective.addItems(['Max. efficiency', 'Max. net work'])
+        self.lbl_PMax=qtw.QLabel('P max', self.gb_Optimize)
+        self.le_PMax=qtw.QLineEdit('80.0', self.gb_Optimize)
+        self.lbl_TMax=qtw.QLabel('T max', self.gb_Optimize)
+        self.le_TMax=qtw.QLineEdit('4500.0', self.gb_Optimize)
+        self.btn_Optimize=qtw.QPushButton('Optimize', self.gb_Optimize)
+        for wdg in (self.cmb_Objective, self.lbl_PMax, self.le_PMax, self.lbl_TMax, self.le_TMax, self.btn_Optimize):
+            optLayout.addWidget(wdg)
+        self.main_VerticalLayout.addWidget(self.gb_Optimize)
+        self.btn_Optimize.clicked.connect(self.doOptimize)
+        self.optWorker=None  #the optimizer runs on a worker thread too, and the button cancels it while it runs
+
+        #comparison mode:  Calculate does all three cycles at once, overlays them and tabulates the results
+        self.chk_Compare=qtw.QCheckBox('Compare Otto, Diesel and Dual cycles', self)
+        #animation:  a marker goes around the plotted cycle in step with a piston schematic
+        self.btn_Animate=qtw.QPushButton('Animate', self)
+        self.btn_Animate.setCheckable(True)
+        modeLayout=qtw.QHBoxLayout()
+        modeLayout.addWidget(self.chk_Compare)
+        modeLayout.addWidget(self.btn_Animate)
+        #export:  writes the states, energies and paths of the cycle that is showing in every unit basis
+        self.btn_Export=qtw.QPushButton('Export...', self)
+        modeLayout.addWidget(self.btn_Export)
+        self.btn_Export.clicked.connect(self.doExport)
+        self.main_VerticalLayout.addLayout(modeLayout)
+        self.animator=cycleAnimator(fps=60)
+        self.btn_Animate.toggled.connect(self.refreshAnimation)
+        self.tbl_Compare=qtw.QTableWidget(self)
+        self.tbl_Compare.setEditTriggers(qtw.QAbstractItemView.NoEditTriggers)
+        self.tbl_Compare.setVisible(False)
+        self.main_VerticalLayout.addWidget(self.tbl_Compare)
+        self.comparison=cycleComparison([self.otto, self.diesel, self.dual], names=['Otto', 'Diesel', 'Dual'])
+        self.chk_Compare.stateChanged.connect(self.doPlot)
+        self.rdo_Metric.toggled.connect(self.setLimitUnits)
+        self.setLimitUnits()
+
+        #run history:  every calculation is kept as a snapshot, and picking one puts its inputs and plot back
+        #without solving anything.  Undo/redo step back and forth through the list.
+        self.history=cycleHistory(maxSize=historySize, maxMemory=historyMemory, diskDir=historyDir)
+        self.gb_History=qtw.QGroupBox('Run history', self)
+        historyLayout=qtw.QVBoxLayout(self.gb_History)
+        self.lst_History=qtw.QListWidget(self.gb_History)
+        self.lst_History.setMaximumHeight(100)
+        historyLayout.addWidget(self.lst_History)
+        self.main_VerticalLayout.addWidget(self.gb_History)
+        self.lst_History.itemClicked.connect(self.recallRun)
+        qtw.QShortcut(QtGui.QKeySequence.Undo, self, activated=lambda: self.stepHistory(1))
+        qtw.QShortcut(QtGui.QKeySequence.Redo, self, activated=lambda: self.stepHistory(-1))
 
         #show the form
         self.show()
@@ -81,26 +226,308 @@ class MainWindow(qtw.QWidget, Ui_Form):
             return False
 
     def doPlot(self):
+        if self.chk_Compare.isChecked() and self.comparison.calculated:
+            self.showComparison()
+            self.refreshAnimation()
+            return
+        self.tbl_Compare.setVisible(False)
         self.controller.updateView()
+        self.refreshAnimation()
+
+    def refreshAnimation(self):
+        '''
+        (Re)starts the animation with frames for the cycle and axes that are showing, or stops it.
+        '''
+        if self.btn_Animate.isChecked() and self.controller.model.calculated and not self.chk_Compare.isChecked():
+            self.animator.start(self.ax, self.canvas, self.controller.model, X=self.cmb_Abcissa.currentText(),
+                                Y=self.cmb_Ordinate.currentText(), mass=False, total=True)
+        else:
+            self.animator.stop()
+
+    def showComparison(self):
+        '''
+        Plots the compared cycles on one set of axes and fills in the table.
+        '''
+        self.comparison.units.set(SI=self.rdo_Metric.isChecked())
+        self.comparison.plot(self.ax, self.canvas, X=self.cmb_Abcissa.currentText(), Y=self.cmb_Ordinate.currentText(),
+                             logx=self.chk_LogAbcissa.isChecked(), logy=self.chk_LogOrdinate.isChecked())
+        labels, values=self.comparison.getTable()
+        self.tbl_Compare.setRowCount(len(labels))
+        self.tbl_Compare.setColumnCount(len(self.comparison.names))
+        self.tbl_Compare.setVerticalHeaderLabels(labels)
+        self.tbl_Compare.setHorizontalHeaderLabels(self.comparison.names)
+        for i, row in enumerate(values):
+            for j, val in enumerate(row):
+                self.tbl_Compare.setItem(i, j, qtw.QTableWidgetItem('{:0.3f}'.format(val)))
+        self.tbl_Compare.setVisible(True)
 
     def selectCycle(self):
-        otto = self.cmb_OttoDiesel.currentText().lower().find("otto")>=0 #$JES MISSING CODE # determine if otto cycle is chosen (true) or not (false -> diesel cycle)
-        self.gb_Input.setTitle('Input for Air Standard {} Cycle:'.format('Otto' if otto else 'Diesel'))
-        self.controller= self.otto if otto else self.diesel #$JES MISSING CODE  # set self.controller to self.otto or self.diesel
+        current = self.cmb_OttoDiesel.currentText().lower()
+        otto = current.find("otto")>=0 #$JES MISSING CODE # determine if otto cycle is chosen (true) or not (false -> diesel cycle)
+        dual = current.find("dual")>=0
+        brayton = current.find("brayton")>=0
+        name = 'Otto' if otto else ('Dual' if dual else ('Brayton' if brayton else 'Diesel'))
+        self.gb_Input.setTitle('Input for Air Standard {} Cycle:'.format(name))
+        self.controller= self.otto if otto else (self.dual if dual else (self.brayton if brayton else self.diesel)) #$JES MISSING CODE  # set self.controller to self.otto or self.diesel
+        #only the dual cycle has a pressure ratio and a state 5
+        for wdg in self.dualWidgets+[self.lbl_T5]:
+            wdg.setVisible(dual)
+        #only the brayton cycle has component efficiencies and stages, and its ratio is a pressure ratio
+        for wdg in self.braytonWidgets+self.braytonLabels:
+            wdg.setVisible(brayton)
+        self.lbl_CR.setText('Pressure Ratio' if brayton else 'Compression Ratio')
         self.controller.updateView()
+        self.refreshAnimation()
 
     def setUnits(self):
         self.controller.updateView()
+        if self.chk_Compare.isChecked():
+            self.doPlot()
+        else:
+            self.refreshAnimation()
 
     def calcCycle(self):
         '''
-        This is called when the calculate button is clicked
+        This is called when the calculate button is clicked.  The calculation itself is started by the
+        calcTimer, so rapid repeated clicks coalesce into one run.
         :return: nothing
         '''
         #calculate the cycle efficiency (and states 1,2,3,4)
-        #$JES MISSING CODE call the calc function of the controller
-        self.controller.calc()
-        pass
+        self.calcTimer.start()
+
+    def startCalc(self):
+        '''
+        Starts the controller's calculation on a worker thread.  If a run is still going, it is cancelled and a new
+        one is started as soon as it stops.
+        :return: nothing
+        '''
+        if self.worker is not None:
+            self.calcPending=True
+            self.worker.cancel()
+            return
+        self.calcPending=False
+        try:
+            inputs=self.controller.getInputs()
+        except ValueError:
+            return  # an input is not a number
+        if self.chk_Compare.isChecked():
+            #the three cycles run concurrently on the comparison's own thread pool, which is about as long as
+            #the slowest one, so there is no need for the worker and progress bar
+            if self.controller in self.comparison.controllers:
+                self.comparison.calc(T_0=inputs['T_0'], P_0=inputs['P_0'], V_0=inputs['V_0'], ratio=inputs['ratio'],
+                                     SI=inputs['SI'], inputs={self.controller: inputs})
+            else:
+                #the boxes hold another kind of cycle's inputs (e.g., a brayton pressure ratio), so each compared
+                #cycle is run again with its own inputs
+                self.comparison.calc(SI=inputs['SI'],
+                                     inputs={c: c.getModelInputs() for c in self.comparison.controllers})
+            self.controller.updateView()
+            self.showComparison()
+            self.refreshAnimation()
+            return
+        self.worker=cycleCalcWorker(self.controller, inputs, parent=self)
+        self.worker.progress.connect(self.showProgress)
+        self.worker.calculated.connect(self.calcDone)
+        self.worker.failed.connect(self.calcFailed)
+        self.worker.finished.connect(self.workerFinished)
+        self.prg_Calc.setValue(0)
+        self.prg_Calc.setVisible(True)
+        self.worker.start()
+
+    def cancelCalc(self):
+        '''
+        Called when an input is edited while a calculation may be running.
+        '''
+        self.controller.view.summary=''  #an optimum shown on the plot no longer applies
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def setLimitUnits(self):
+        '''
+        Labels the optimizer limits and converts them when the units are switched.
+        '''
+        U=units()
+        SI=self.rdo_Metric.isChecked()
+        U.set(SI=SI)
+        self.lbl_PMax.setText('P max ({})'.format(U.PUnits))
+        self.lbl_TMax.setText('T max ({})'.format(U.TUnits))
+        if hasattr(self, 'limitsSI') and self.limitsSI!=SI and self.isfloat(self.le_PMax.text()) \
+                and self.isfloat(self.le_TMax.text()):
+            PMax=float(self.le_PMax.text())
+            TMax=float(self.le_TMax.text())
+            self.le_PMax.setText('{:0.4g}'.format(PMax/U.CF_P if SI else PMax*U.CF_P))
+            self.le_TMax.setText('{:0.2f}'.format(TMax/U.CF_T if SI else TMax*U.CF_T))
+        self.limitsSI=SI
+
+    def doOptimize(self):
+        '''
+        Finds the compression ratio (and cutoff and pressure ratio for the diesel and dual cycles) that maximizes
+        the chosen objective within the peak pressure and temperature limits.  The optimum is put in the inputs,
+        calculated and plotted with a summary on the plot.  The search runs on a worker thread;  clicking the button
+        again while it runs cancels it.
+        '''
+        if self.optWorker is not None:
+            self.optWorker.cancel()
+            return
+        try:
+            inputs=self.controller.getInputs()
+            PMax=float(self.le_PMax.text())
+            TMax=float(self.le_TMax.text())
+        except ValueError:
+            return  # an input is not a number
+        U=units()
+        SI=inputs['SI']
+        CFP=1.0 if SI else U.CF_P
+        CFT=1.0 if SI else U.CF_T
+        CFV=1.0 if SI else U.CF_V
+        cycleType=self.controller.model.cycleType
+        if cycleType not in cycleBatch.varNames:
+            qtw.QMessageBox.information(self, 'Optimize', 'The optimizer works on the Otto, Diesel and Dual cycles.')
+            return
+        opt=cycleOptimizer(cycleType=cycleType, objective='Eff' if self.cmb_Objective.currentIndex()==0 else 'W_Cycle',
+                           T_initial=inputs['T_0']/CFT, p_initial=inputs['P_0']/CFP, V_Cylinder=inputs['V_0']/CFV,
+                           T_high=inputs.get('T_High', 1500.0)/CFT, PMax=PMax/CFP, TMax=TMax/CFT)
+        self.optWorker=cycleOptimizeWorker(opt, parent=self)
+        self.optWorker.progress.connect(self.showProgress)
+        self.optWorker.optimized.connect(self.optimizeDone)
+        self.optWorker.failed.connect(self.optimizeFailed)
+        self.optWorker.finished.connect(self.optimizeFinished)
+        self.btn_Optimize.setText('Cancel')
+        self.prg_Calc.setValue(0)
+        self.prg_Calc.setVisible(True)
+        self.optWorker.start()
+
+    def optimizeDone(self, result):
+        '''
+        Puts the optimum in the inputs and calculates it, unless it does not meet the limits or a different kind of
+        cycle was picked while the optimizer ran.
+        '''
+        if result.cycleType!=self.controller.model.cycleType:
+            return
+        if not result.feasible:
+            U=units()
+            SI=self.rdo_Metric.isChecked()
+            U.set(SI=SI)
+            PPeak=result.values['PPeak']*(1.0 if SI else U.CF_P)
+            TPeak=result.values['TPeak']*(1.0 if SI else U.CF_T)
+            qtw.QMessageBox.warning(self, 'Optimize', 'No design was found within the peak pressure and temperature '
+                                    'limits, so the inputs were left as they were.  The closest design found '
+                                    'reaches {:0.4g} {} and {:0.1f} {}.'.format(PPeak, U.PUnits, TPeak, U.TUnits))
+            return
+        x=result.getInputs()
+        self.le_CR.setText('{:0.4g}'.format(x['Ratio']))
+        if 'Cutoff' in x:
+            self.le_THigh.setText('{:0.4g}'.format(x['Cutoff']))
+        if 'PressureRatio' in x:
+            self.le_rp.setText('{:0.4g}'.format(x['PressureRatio']))
+        self.controller.view.summary=result.getSummary()
+        self.calcCycle()
+
+    def optimizeFailed(self, message):
+        qtw.QMessageBox.warning(self, 'Optimization failed', message)
+
+    def optimizeFinished(self):
+        self.optWorker.deleteLater()
+        self.optWorker=None
+        self.btn_Optimize.setText('Optimize')
+        if self.worker is None:
+            self.prg_Calc.setVisible(False)
+
+    def doExport(self):
+        '''
+        Asks for a file name and exports the cycle that is showing to a compressed .npz or a .csv file.
+        '''
+        if not self.controller.model.calculated:
+            qtw.QMessageBox.information(self, 'Export', 'Calculate the cycle first.')
+            return
+        fileName, fileFilter=qtw.QFileDialog.getSaveFileName(self, 'Export cycle', self.controller.model.cycleType,
+                                                             'Compressed numpy arrays (*.npz);;CSV (*.csv)')
+        if fileName=='':
+            return
+        ext='.csv' if 'csv' in fileFilter else '.npz'
+        if os.path.splitext(fileName)[1].lower() not in ('.csv', '.npz'):
+            fileName+=ext
+        try:
+            self.controller.export(fileName)
+        except OSError as err:
+            qtw.QMessageBox.warning(self, 'Export failed', str(err))
+
+    def showProgress(self, name, done, total):
+        self.prg_Calc.setMaximum(max(total, 1))
+        self.prg_Calc.setValue(done)
+        self.prg_Calc.setFormat('{} ({}/{})'.format(name, done, total))
+
+    def calcDone(self, controller, model):
+        '''
+        Swaps the calculated model into its controller in one step on the GUI thread.
+        '''
+        controller.model=model
+        self.addToHistory(controller, model)
+        if controller is self.controller:
+            controller.updateView()
+            self.refreshAnimation()
+
+    def addToHistory(self, controller, model):
+        '''
+        Puts a finished run at the top of the history list (or moves it there if it is already in the list).
+        '''
+        entry=self.history.add(controller, model)
+        for row in reversed(range(self.lst_History.count())):
+            item=self.lst_History.item(row)
+            if item.data(qtc.Qt.UserRole) not in self.history.entries or item.data(qtc.Qt.UserRole)==entry.id:
+                self.lst_History.takeItem(row)
+        item=qtw.QListWidgetItem(entry.label)
+        item.setData(qtc.Qt.UserRole, entry.id)
+        self.lst_History.insertItem(0, item)
+        self.lst_History.setCurrentRow(0)
+
+    def recallRun(self, item):
+        '''
+        Puts a run from the history back in its controller and shows it.
+        '''
+        entry=self.history.entries[item.data(qtc.Qt.UserRole)]
+        self.lst_History.setCurrentItem(item)
+        self.calcTimer.stop()
+        self.cancelCalc()
+        controller={'otto': self.otto, 'diesel': self.diesel, 'dual': self.dual,
+                    'brayton': self.brayton}[entry.cycleType]
+        controller.model=self.history.recall(controller, entry.id)
+        index=self.cmb_OttoDiesel.findText(entry.cycleType.title()+' cycle')
+        if index!=self.cmb_OttoDiesel.currentIndex():
+            self.cmb_OttoDiesel.setCurrentIndex(index)  #selectCycle shows it
+        else:
+            self.doPlot()
+
+    def stepHistory(self, step):
+        '''
+        Recalls the run step rows down (older) or up (newer) the history list.
+        '''
+        row=self.lst_History.currentRow()+step
+        if 0<=row<self.lst_History.count():
+            self.recallRun(self.lst_History.item(row))
+
+    def calcFailed(self, controller, message):
+        qtw.QMessageBox.warning(self, 'Calculation failed', message)
+
+    def workerFinished(self):
+        self.worker.deleteLater()
+        self.worker=None
+        if self.optWorker is None:
+            self.prg_Calc.setVisible(False)
+        if self.calcPending:
+            self.startCalc()
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        if self.optWorker is not None:
+            self.optWorker.cancel()
+            self.optWorker.wait()
+        self.comparison.shutdown()
+        self.animator.stop()
+        self.history.clear()
+        super().closeEvent(event)
 
 #if this module is being imported, this won't run. If it is the main module, it will run.
 if __name__== '__main__':
@@ -1,11 +1,14 @@
 #region imports
 from PyQt5 import QtWidgets as qtw
+from PyQt5 import QtCore
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QRadioButton, QGroupBox, QGridLayout
 import sys
+import os
 from OttoDiesel_GUI import Ui_Form
 from Otto import ottoCycleController
 from Diesel import dieselCycleController
-from Dual import dualCycleController  # This must exist and follow same structure
+from Dual import dualCycleController
+from CycleCache import cycleResultCache
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 #endregion
@@ -19,11 +22,15 @@ class MainWindow(qtw.QWidget, Ui_Form):
     Inherits:
         QWidget, Ui_Form
     """
-    def __init__(self):
+    def __init__(self, cacheSize=64, cacheDir=None):
         """
         Constructor for the main window.
         Initializes the user interface, cycle controllers, plotting canvas,
         and connects all widget signals to corresponding handlers.
+
+        Args:
+            cacheSize (int): Number of calculated cycles to keep in memory
+            cacheDir (str): Directory for the persistent tier of the result cache (None for memory only)
         """
         super().__init__()
         self.setupUi(self)
@@ -35,6 +42,23 @@ class MainWindow(qtw.QWidget, Ui_Form):
         self.ax = self.figure.add_subplot()
         self.main_VerticalLayout.addWidget(self.canvas)
 
+        # The dual cycle needs a pressure ratio input and a fifth state output that are not on the form
+        self.cmb_OttoDiesel.addItem('Dual cycle')
+        self.lbl_rp = QLabel('Pressure ratio:  ', self.gb_Input)
+        self.le_rp = QLineEdit('1.5', self.gb_Input)
+        self.gridLayout.addWidget(self.lbl_rp, 5, 0, 1, 1, QtCore.Qt.AlignRight)
+        self.gridLayout.addWidget(self.le_rp, 5, 1, 1, 1)
+        self.lbl_T5 = QLabel('T5', self.gb_Output)
+        self.le_T5 = QLineEdit(self.gb_Output)
+        self.le_T5.setEnabled(False)
+        self.lbl_T5Units = QLabel(self.gb_Output)
+        self.grid_Output.addWidget(self.lbl_T5, 5, 0, 1, 1, QtCore.Qt.AlignRight)
+        self.grid_Output.addWidget(self.le_T5, 5, 1, 1, 1)
+        self.grid_Output.addWidget(self.lbl_T5Units, 5, 2, 1, 1)
+        self.dualWidgets = [self.lbl_rp, self.le_rp, self.le_T5, self.lbl_T5Units]
+        for wdg in self.dualWidgets + [self.lbl_T5]:
+            wdg.setVisible(False)
+
         # Instantiate all cycle controllers
         self.otto = ottoCycleController()
         self.diesel = dieselCycleController()
@@ -56,7 +80,13 @@ class MainWindow(qtw.QWidget, Ui_Form):
         # Assign widget references to each controller
         self.otto.setWidgets(w=self.someWidgets)
         self.diesel.setWidgets(w=self.someWidgets)
-        self.dual.setWidgets(w=self.someWidgets)
+        self.dual.setWidgets(w=self.someWidgets, extra=self.dualWidgets)
+
+        # Share one result cache so re-calculating a configuration that was already done is instant
+        self.cycleCache = cycleResultCache(maxSize=cacheSize, diskDir=cacheDir)
+        self.otto.setCache(self.cycleCache)
+        self.diesel.setCache(self.cycleCache)
+        self.dual.setCache(self.cycleCache)
 
         # Connect GUI actions to functions
         self.rdo_Metric.toggled.connect(self.setUnits)
@@ -130,6 +160,9 @@ class MainWindow(qtw.QWidget, Ui_Form):
         elif "dual" in current:
             self.controller = self.dual
             self.gb_Input.setTitle('Input for Air Standard Dual Cycle:')
+        # Only the dual cycle has a pressure ratio and a state 5
+        for wdg in self.dualWidgets + [self.lbl_T5]:
+            wdg.setVisible(self.controller is self.dual)
         self.controller.updateView()
 
     def setUnits(self):
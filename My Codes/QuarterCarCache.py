@@ -0,0 +1,101 @@
+#region imports
+import math
+import threading
+from collections import OrderedDict
+#endregion
+
+#region class definitions
+class SimulationResult():
+    """
+    A snapshot of everything doCalc puts in a CarModel, so a simulation can be put back into a model without solving
+    it again.  The gradient of the SSE is kept with it once it has been worked out.
+    """
+    names = ('timeData', 'roadPosData', 'bodyPosData', 'wheelPosData', 'accelBodyData', 'accelWheelData',
+             'tireDeflectionData', 'accelMax', 'results', 'solution', 'tramp', 'angrad', 'roadInput')
+
+    def __init__(self):
+        self.data = {}
+        self.gradSSE = None  # dSSE/d(k1, c1, k2) without penalties
+        self.dAccel = None  # d(accelMax)/d(k1, c1, k2)
+
+    def store(self, model):
+        self.data = {name: getattr(model, name) for name in self.names}
+        return self
+
+    def restore(self, model):
+        for name, value in self.data.items():
+            setattr(model, name, value)
+        model.simulation = self
+        return model
+
+
+class SimulationCache():
+    """
+    A bounded LRU cache of quarter car simulations keyed on the design (k1, c1, k2), the car and road scenario and
+    tmax.  The design is quantized to a relative tolerance, so designs an optimizer revisits (or gets back to within
+    round off) are found again.  The cache can be shared by an optimization running on a worker thread and the GUI.
+    """
+    scenarioNames = ('m1', 'm2', 'v', 'yangdeg', 'ymag', 'road', 'tmax', 'solver')  # the road's repr identifies it
+
+    def __init__(self, maxSize=256, tol=1.0E-9):
+        """
+        :param maxSize: number of simulations to keep
+        :param tol: relative tolerance for k1, c1, k2 to count as the same design
+        """
+        self.maxSize = maxSize
+        self.tol = tol
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def quantize(self, x):
+        """
+        Maps x to an integer that changes every self.tol relative change in x.
+        """
+        return int(round(math.copysign(math.log1p(abs(x)) / self.tol, x)))
+
+    def makeKey(self, model):
+        """
+        :param model: a CarModel
+        :return: a hashable key for the simulation model would get from doCalc
+        """
+        design = tuple(self.quantize(x) for x in (model.k1, model.c1, model.k2))
+        scenario = tuple(repr(getattr(model, name)) for name in self.scenarioNames)
+        return design + scenario
+
+    def get(self, key):
+        """
+        :param key: from makeKey
+        :return: a SimulationResult or None
+        """
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return self.results[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxSize:
+                self.results.popitem(last=False)
+
+    def getStats(self):
+        """
+        :return: dict of hits, misses, hit rate and size
+        """
+        with self.lock:
+            n = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hitRate': self.hits / n if n else 0.0,
+                    'size': len(self.results), 'maxSize': self.maxSize}
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.hits = 0
+            self.misses = 0
+#endregion
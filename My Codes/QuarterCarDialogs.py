@@ -0,0 +1,197 @@
+#region imports
+import numpy as np
+from PyQt5 import QtWidgets as qtw
+from PyQt5 import QtCore as qtc
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.figure import Figure
+from matplotlib.colors import LogNorm
+#endregion
+
+#region class definitions
+class ParetoDialog(qtw.QDialog):
+    """
+    Shows a Pareto front from CarController.runParetoOptimization as a scatter of the first objective (ride comfort)
+    against the second (tire deflection), colored by the third (suspension travel).  Clicking a point emits its
+    design, so the main window can show and animate it.
+    """
+    designPicked = qtc.pyqtSignal(float, float, float)  # k1, c1, k2
+    # axis labels and scale factors (m to mm) for the objectives from QuarterCarOptimizer.evaluateBatch
+    labels = {'accelPeak': ('Peak body accel (g)', 1.0), 'accelRMS': ('RMS body accel (g)', 1.0),
+              'tireDeflection': ('Tire deflection (mm)', 1000.0), 'travel': ('Suspension travel (mm)', 1000.0)}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pareto Front")
+        self.resize(700, 550)
+        self.figure = Figure(tight_layout=True)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.lbl_Info = qtw.QLabel("Click a design on the front to show and animate it", self)
+        layout = qtw.QVBoxLayout(self)
+        layout.addWidget(NavigationToolbar2QT(self.canvas, self))
+        layout.addWidget(self.canvas)
+        layout.addWidget(self.lbl_Info)
+        self.front = None
+        self.points = None  # scatter of the front
+        self.colorbar = None
+        self.picked = None  # marker on the picked design
+        self.canvas.mpl_connect('pick_event', self.onPick)
+
+    def getValues(self, front):
+        """
+        :return: the objectives of front in the units they are plotted in, shape (n, 3)
+        """
+        return front['objectives'] * np.array([self.labels[name][1] for name in front['names']])
+
+    def setFront(self, front, status=None):
+        """
+        Plots a front (a dict from ParetoOptimizer.getFront).
+        :param front: the front
+        :param status: optional text for the title (e.g., that the search was cancelled)
+        """
+        self.front = front
+        F = self.getValues(front)
+        names = front['names']
+        if self.points is None:
+            self.points = self.ax.scatter(F[:, 0], F[:, 1], c=F[:, 2], cmap='viridis', picker=5)
+            self.colorbar = self.figure.colorbar(self.points, ax=self.ax)
+        else:
+            self.points.set_offsets(F[:, :2])
+            self.points.set_array(F[:, 2])
+            self.points.set_clim(F[:, 2].min(), F[:, 2].max())
+            self.ax.ignore_existing_data_limits = True
+            self.ax.update_datalim(F[:, :2])
+            self.ax.autoscale_view()
+        if self.picked is not None:
+            self.picked.remove()
+            self.picked = None
+        self.ax.set_xlabel(self.labels[names[0]][0])
+        self.ax.set_ylabel(self.labels[names[1]][0])
+        self.colorbar.set_label(self.labels[names[2]][0])
+        title = "{} designs after {} generations".format(len(F), front['generation'])
+        self.ax.set_title(title if status is None else title + " - " + status)
+        self.canvas.draw_idle()
+
+    def onPick(self, event):
+        if event.artist is not self.points or self.front is None or len(event.ind) == 0:
+            return
+        i = event.ind[0]
+        k1, c1, k2 = self.front['designs'][i]
+        F = self.getValues(self.front)[i]
+        if self.picked is not None:
+            self.picked.remove()
+        self.picked = self.ax.plot(F[0], F[1], 'o', markersize=12, markeredgecolor='red', markerfacecolor='none')[0]
+        self.canvas.draw_idle()
+        self.lbl_Info.setText("k1={:0.1f}, c1={:0.1f}, k2={:0.1f}:  {}".format(k1, c1, k2, ", ".join(
+            "{}={:0.3f}".format(self.labels[name][0], f) for name, f in zip(self.front['names'], F))))
+        self.designPicked.emit(k1, c1, k2)
+
+
+class MapDialog(qtw.QDialog):
+    """
+    Shows a design space map from CarController.runDesignMap as filled contours of SSE, accelMax or settling time
+    over k1 and c1, one k2 slice at a time.  The acceleration limit is drawn on every map and the current design is
+    marked.  The grid is set up here, but the main window runs it (pb_Compute).
+    """
+    quantities = {'SSE': 'SSE', 'Accel max (g)': 'accelMax', 'Settling time (s)': 'settlingTime'}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Design Space Map")
+        self.resize(750, 650)
+        self.sb_Grid = qtw.QSpinBox(self)
+        self.sb_Grid.setRange(5, 200)
+        self.sb_Grid.setValue(40)
+        self.sb_Slices = qtw.QSpinBox(self)
+        self.sb_Slices.setRange(1, 20)
+        self.sb_Slices.setToolTip("1 maps the current k2, more spreads the slices over the k2 bounds")
+        self.cmb_Quantity = qtw.QComboBox(self)
+        self.cmb_Quantity.addItems(list(self.quantities))
+        self.pb_Compute = qtw.QPushButton("Compute", self)
+        self.sld_Slice = qtw.QSlider(qtc.Qt.Horizontal, self)
+        self.sld_Slice.setRange(0, 0)
+        self.lbl_Slice = qtw.QLabel(self)
+        controls = qtw.QHBoxLayout()
+        for label, widget in (("Grid points", self.sb_Grid), ("k2 slices", self.sb_Slices), ("Show", self.cmb_Quantity)):
+            controls.addWidget(qtw.QLabel(label, self))
+            controls.addWidget(widget)
+        controls.addWidget(self.pb_Compute)
+        slices = qtw.QHBoxLayout()
+        slices.addWidget(self.lbl_Slice)
+        slices.addWidget(self.sld_Slice)
+        self.figure = Figure(tight_layout=True)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        layout = qtw.QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addLayout(slices)
+        layout.addWidget(NavigationToolbar2QT(self.canvas, self))
+        layout.addWidget(self.canvas)
+        self.designMap = None
+        self.design = None  # current k1, c1, k2
+        self.status = None
+        self.colorbar = None
+        self.cmb_Quantity.currentIndexChanged.connect(self.plot)
+        self.sld_Slice.valueChanged.connect(self.plot)
+
+    def getGrid(self):
+        """
+        :return: number of k1 and c1 values, number of k2 slices
+        """
+        return self.sb_Grid.value(), self.sb_Slices.value()
+
+    def setMap(self, designMap, design, status=None):
+        """
+        :param designMap: dict from evaluateGrid
+        :param design: the current k1, c1, k2 to mark
+        :param status: optional text for the title (e.g., that the map was cancelled)
+        """
+        self.designMap = designMap
+        self.design = design
+        self.status = status
+        k2 = designMap['k2']
+        self.sld_Slice.blockSignals(True)
+        self.sld_Slice.setRange(0, len(k2) - 1)
+        self.sld_Slice.setValue(int(np.argmin(np.abs(k2 - design[2]))))  # start at the slice nearest the design
+        self.sld_Slice.blockSignals(False)
+        self.plot()
+
+    def plot(self):
+        if self.designMap is None:
+            return
+        g = self.designMap
+        i = self.sld_Slice.value()
+        label = self.cmb_Quantity.currentText()
+        Z = np.ma.masked_invalid(g[self.quantities[label]][i])
+        self.lbl_Slice.setText("k2 = {:0.1f}".format(g['k2'][i]))
+        if self.colorbar is not None:
+            self.colorbar.remove()
+            self.colorbar = None
+        self.ax.clear()
+        if Z.count() > 0:
+            zmin, zmax = Z.min(), Z.max()
+            if label == 'SSE' and zmin > 0 and zmax > zmin:  # SSE spans orders of magnitude
+                contours = self.ax.contourf(g['k1'], g['c1'], Z, levels=np.geomspace(zmin, zmax, 21), norm=LogNorm())
+            else:
+                contours = self.ax.contourf(g['k1'], g['c1'], Z, levels=20)
+            self.colorbar = self.figure.colorbar(contours, ax=self.ax, label=label, format='%.3g')
+        accel = g['accelMax'][i]
+        if np.isfinite(accel).any() and np.nanmin(accel) < g['accelLim'] < np.nanmax(accel):
+            self.ax.contour(g['k1'], g['c1'], np.ma.masked_invalid(accel), levels=[g['accelLim']], colors='red',
+                            linewidths=2)
+            self.ax.plot([], [], color='red', linewidth=2, label="{:0.2f} g limit".format(g['accelLim']))
+        k1, c1, k2 = self.design
+        inside = g['k1'][0] <= k1 <= g['k1'][-1] and g['c1'][0] <= c1 <= g['c1'][-1]
+        self.ax.plot(k1, c1, 'x', color='white', markersize=12, markeredgewidth=3, clip_on=True)
+        self.ax.plot(k1, c1, 'x', color='red', markersize=10, markeredgewidth=1.5, clip_on=True,
+                     label='current design' if inside else 'current design (off the map)')
+        self.ax.set_xlim(g['k1'][0], g['k1'][-1])  # the map, even if the current design is outside it
+        self.ax.set_ylim(g['c1'][0], g['c1'][-1])
+        self.ax.set_yscale('log')
+        self.ax.set_xlabel("k1 (N/m)")
+        self.ax.set_ylabel("c1 (N*s/m)")
+        self.ax.legend(loc='upper right')
+        title = "{} with k2 = {:0.1f}".format(label, g['k2'][i])
+        self.ax.set_title(title if self.status is None else title + " - " + self.status)
+        self.canvas.draw_idle()
+#endregion
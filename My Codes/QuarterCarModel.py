@@ -1,6 +1,6 @@
 #region imports
-from scipy.integrate import solve_ivp
-from scipy.optimize import minimize
+from scipy.integrate import solve_ivp, OdeSolution
+from scipy.optimize import minimize, differential_evolution, OptimizeResult
 from scipy.interpolate import interp1d
 import matplotlib.pyplot as plt
 import numpy as np
@@ -13,6 +13,10 @@ from PyQt5 import QtGui as qtg
 #no simple widget for this exists in QT Designer, so I have to add the widget in code.
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 from matplotlib.figure import Figure
+from QuarterCarSolver import StateSpaceSolver
+from QuarterCarRoad import RampRoad
+from QuarterCarCache import SimulationResult, SimulationCache
+from QuarterCarOptimizer import BatchEvaluator, ParetoOptimizer, evaluateGrid, getScenario
 #endregion
 
 #region class definitions
@@ -434,6 +438,12 @@ class Road(qtw.QGraphicsItem):
 #endregion
 
 #region MVC for quarter car model
+class OptimizationCancelled(Exception):
+    """
+    Raised from inside the optimizer's objective to stop a suspension optimization that was cancelled.
+    """
+    pass
+
 class CarModel():
     """
     I re-wrote the quarter car model as an object oriented program
@@ -444,9 +454,10 @@ class CarModel():
         """
         self.results to hold results of odeint solution
         self.t time vector for odeint and for plotting
-        self.tramp is time required to climb the ramp
+        self.tramp is time required to climb the ramp (or to drive the whole road profile)
         self.angrad is the ramp angle in radians
         self.ymag is the ramp height in m
+        self.road is the road profile (a QuarterCarRoad.RoadProfile), or None for the ramp set by ymag and yangdeg
         """
         self.results = []
         self.roadPosData = []
@@ -459,6 +470,8 @@ class CarModel():
         self.angrad = 0.1
         self.ymag = 6.0 / (12 * 3.3)  # ramp height in meters.  default is 0.1515 m
         self.yangdeg = 45.0  # ramp angle in degrees.  default is 45
+        self.road = None  # road profile, or None for the ramp
+        self.roadInput = None  # the road as a function of time at speed v (a QuarterCarRoad.RoadInput), set by doCalc
         self.results = None
         self.m1 = 450  # mass of car body in kg
         self.m2 = 20  # mass of wheel in kg
@@ -471,10 +484,55 @@ class CarModel():
         self.maxk1=(self.m1*9.81)/(3.0*25.4/1000.0)
         self.mink2=((self.m1+self.m2)*9.81)/(1.5*25.4/1000.0)
         self.maxk2=((self.m1+self.m2)*9.81)/(0.75*25.4/1000.0)
+        self.minc1=10.0
+        self.maxc1=6.0*math.sqrt(self.maxk1*self.m1)  # three times critical damping of the body on the stiffest spring
         self.accelBodyData=None
+        self.accelWheelData=None
+        self.tireDeflectionData=None
         self.accelMax=0
         self.accelLim=1.5
         self.SSE=0.0
+        self.solver='exact'  # 'exact' for the state space solution, 'auto' or a solve_ivp method to integrate
+        self.includeAccel=False  # include the acceleration limit in the optimization
+        self.optimizer='L-BFGS-B'  # method for minimize:  'L-BFGS-B' or 'SLSQP' use gradients and bounds, 'Nelder-Mead' penalties
+        # or 'differential_evolution' for a global search over the bounds
+        self.popsize=50  # differential evolution population is popsize*3 designs
+        self.maxiter=100  # differential evolution generations
+        self.workers=None  # processes to simulate the population on (None for one per core, 1 for this thread only)
+        self.seed=None  # random seed for differential evolution (and the Pareto search)
+        self.comfort='RMS'  # body acceleration measure on the Pareto front:  'RMS' or 'peak'
+        self.paretoSize=100  # designs per generation of the Pareto search
+        self.paretoGenerations=60  # generations of the Pareto search
+        self.pareto=None  # last Pareto front from CarController.runParetoOptimization
+        self.mapWorkers=None  # processes for large design maps (None for one per core)
+        self.designMap=None  # last k1 x c1 grid from CarController.runDesignMap
+        self.simulation=None  # SimulationResult snapshot of the last doCalc (shared with the cache)
+        self.solution=None  # callable giving the state at any time:  (4,) for a scalar time or (4, n) for an array
+
+    def evaluate(self, t):
+        """
+        Samples the solution at any time(s) without interpolating the stored arrays.
+        :param t: a time or an array of times
+        :return: ywheel, ybody, yroad, accel (body acceleration in g's)
+        """
+        X = self.solution(t)
+        yroad = self.roadInput(t)
+        accel, accelWheel, tireDeflection = self.calcDerived(X, yroad)
+        return X[2], X[0], yroad, accel
+
+    def calcDerived(self, X, yroad):
+        """
+        The accelerations straight from the equations of motion, for one state or a whole (4, n) array of them.
+        :param X: state(s) [x1, x1dot, x2, x2dot]
+        :param yroad: road position(s)
+        :return: body acceleration (g's), wheel acceleration (g's), tire deflection (m, positive in compression)
+        """
+        x1, x1dot, x2, x2dot = X
+        fSuspension = self.c1 * (x2dot - x1dot) + self.k1 * (x2 - x1)  # force of the spring and dashpot on the body
+        tireDeflection = yroad - x2
+        accelBody = fSuspension / (9.81 * self.m1)
+        accelWheel = (self.k2 * tireDeflection - fSuspension) / (9.81 * self.m2)
+        return accelBody, accelWheel, tireDeflection
 
 class CarView():
     def __init__(self, args):
@@ -515,6 +573,8 @@ class CarView():
         self.le_tmax.setText("{:0.2f}".format(model.tmax))
         stTmp="k1_min = {:0.2f}, k1_max = {:0.2f}\nk2_min = {:0.2f}, k2_max = {:0.2f}\n".format(model.mink1, model.maxk1, model.mink2, model.maxk2)
         stTmp+="SSE = {:0.2f}".format(model.SSE)
+        if model.results is not None:
+            stTmp+="\nsolver: {}, nfev = {}, njev = {}".format(model.results.method, model.results.nfev, model.results.njev)
         self.lbl_MaxMinInfo.setText(stTmp)
         self.CarBody.setMass(model.m1)
         self.Wheel.setMass(model.m2)
@@ -598,10 +658,8 @@ class CarView():
             QTPlotting = False  # actually, we are just using CLI and showing the plot
         ax.clear()
         ax1.clear()
-        t = model.timeData
-        ywheel = model.wheelPosData
-        ycar = model.bodyPosData
-        accel = model.accelBodyData
+        t = self.getPlotTimes(model)
+        ywheel, ycar, yroad, accel = model.evaluate(t)
 
         if self.chk_LogX.isChecked():
             ax.set_xlim(0.001,model.tmax)
@@ -610,16 +668,17 @@ class CarView():
             ax.set_xlim(0.0, model.tmax)
             ax.set_xscale('linear')
 
+        ymax = max(ycar.max(), ywheel.max()*1.05, yroad.max())
         if self.chk_LogY.isChecked():
-            ax.set_ylim(0.0001,max(ycar.max(), ywheel.max()*1.05))
+            ax.set_ylim(0.0001, ymax)
             ax.set_yscale('log')
         else:
-            ax.set_ylim(0.0, max(ycar.max(), ywheel.max()*1.05))
+            ax.set_ylim(min(0.0, ycar.min(), ywheel.min(), yroad.min())*1.05, ymax)  # potholes and rough roads go below 0
             ax.set_yscale('linear')
 
         ax.plot(t, ycar, 'b-', label='Body Position')
         ax.plot(t, ywheel, 'r-', label='Wheel Position')
-        ax.plot(t, model.roadPosData, 'k-', label='Road Position', linewidth=3.0)
+        ax.plot(t, yroad, 'k-', label='Road Position', linewidth=3.0)
         if self.chk_ShowAccel.isChecked():
             ax1.plot(t, accel, 'g-', label='Body Accel')
             ax1.axhline(y=accel.max(), color='orange')  # horizontal line at accel.max()
@@ -632,8 +691,8 @@ class CarView():
         ax.set_xlabel("time (s)", fontsize='large' if QTPlotting else 'medium')
         ax.legend()
 
-        ax.axvline(x=model.tramp)  # vertical line at tramp
-        ax.axhline(y=model.ymag)  # horizontal line at ymag
+        ax.axvline(x=model.tramp)  # vertical line at tramp (the end of the road profile)
+        ax.axhline(y=model.roadInput.y[-1])  # horizontal line at the final road height (ymag for the ramp)
         # modify the tick marks
         ax.tick_params(axis='both', which='both', direction='in', top=True,
                        labelsize='large' if QTPlotting else 'medium')  # format tick marks
@@ -645,19 +704,33 @@ class CarView():
         else:
             self.canvas.draw()
 
+    def getPlotTimes(self, model=None):
+        """
+        The times to plot at:  one per pixel across the axes, spaced to suit the x scale, plus the breakpoints of the
+        road (unless there are more of them than pixels) so the corners in the road are drawn sharp.
+        :param model:
+        :return: array of times
+        """
+        n = max(int(self.ax.bbox.width), 100) if self.ax is not None else 500
+        if self.chk_LogX.isChecked():
+            t = np.logspace(np.log10(0.001), np.log10(model.tmax), n)
+        else:
+            t = np.linspace(0.0, model.tmax, n)
+        tb = model.roadInput.t
+        tb = tb[(tb > 0.0) & (tb < model.tmax)]
+        if len(tb) < n:
+            t = np.union1d(t, tb)
+        return t
+
     def getPoints(self, model=None, t=0):
         """
-        This gets interpolated values from the model data at a given time.
+        This evaluates the solution of the model at a given time.
         :param model:
         :param t:
         :return: ywheel, ybody, yroad, accel
         """
-        if model is None: return 0,0,0
-        ywheel=np.interp(t, model.timeData, model.wheelPosData)
-        ybody=np.interp(t, model.timeData, model.bodyPosData)
-        yroad=np.interp(t,model.timeData, model.roadPosData)
-        accel=np.interp(t, model.timeData, model.accelBodyData)
-        return ywheel,ybody, yroad ,accel
+        if model is None or model.solution is None: return 0,0,0,0
+        return model.evaluate(t)
 
     def animate(self, model=None, t=0):
         """
@@ -726,28 +799,31 @@ class CarController():
 
         self.model = CarModel()
         self.view = CarView(args)
+        self.stateSpace = StateSpaceSolver()
+        self.cache = SimulationCache()  # simulations already done, shared with the optimizer's worker thread
 
     def ode_system(self, t ,X):
-        # define the forcing function equation for the linear ramp
-        # It takes self.tramp time to climb the ramp, so y position is
-        # a linear function of time.
-        if t < self.model.tramp:
-            y = self.model.ymag * (t / self.model.tramp)
-        else:
-            y = self.model.ymag
+        """
+        The right hand side of the ode system.  X can be a single state (4,) or a set of states (4, k), so solve_ivp
+        can evaluate all the columns of a finite difference in one call (vectorized=True).
+        """
+        # the road position is a piecewise linear function of time (see QuarterCarRoad)
+        m = self.model
+        y = m.roadInput(t)
 
-        x1 = X[0]  # car position in vertical direction
-        x1dot = X[1]  # car velocity  in vertical direction
-        x2 = X[2]  # wheel position in vertical direction
-        x2dot = X[3]  # wheel velocity in vertical direction
+        x1, x1dot, x2, x2dot = X  # car position and velocity, wheel position and velocity in vertical direction
 
         # write the non-trivial equations in vertical direction
-        x1ddot = (1 / self.model.m1) * (self.model.c1 * (x2dot - x1dot) + self.model.k1 * (x2 - x1))
-        x2ddot = (1 / self.model.m2) * (
-                    -self.model.c1 * (x2dot - x1dot) - self.model.k1 * (x2 - x1) + self.model.k2 * (y - x2))
-        self.step += 1
+        x1ddot = (m.c1 * (x2dot - x1dot) + m.k1 * (x2 - x1)) / m.m1
+        x2ddot = (-m.c1 * (x2dot - x1dot) - m.k1 * (x2 - x1) + m.k2 * (y - x2)) / m.m2
         # return the derivatives of the input state vector
-        return [x1dot, x1ddot, x2dot, x2ddot]
+        return np.array([x1dot, x1ddot, x2dot, x2ddot])
+
+    def jacobian(self, t, X):
+        """
+        The Jacobian of ode_system.  The system is linear, so it is the constant A matrix of the state space model.
+        """
+        return self.stateSpace.A
 
     def calculate(self, doCalc=True):
         """
@@ -755,29 +831,53 @@ class CarController():
         in another function doCalc.
         """
         #Step 1.  Read from the widgets
-        self.model.m1 = float(self.le_m1.text())
-        self.model.m2 = float(self.le_m2.text())
-        self.model.c1 = float(self.le_c1.text())
-        self.model.k1 = float(self.le_k1.text())
-        self.model.k2 = float(self.le_k2.text())
+        self.model.m1 = self.readInput(self.le_m1, self.model.m1)
+        self.model.m2 = self.readInput(self.le_m2, self.model.m2)
+        self.model.c1 = self.readInput(self.le_c1, self.model.c1)
+        self.model.k1 = self.readInput(self.le_k1, self.model.k1)
+        self.model.k2 = self.readInput(self.le_k2, self.model.k2)
         self.model.v = float(self.le_v.text())
 
         #recalculate min and max k values
-        self.mink1=(self.model.m1*9.81)/(6.0*25.4/1000.0)
-        self.maxk1=(self.model.m1*9.81)/(3.0*25.4/1000.0)
-        self.mink2=((self.model.m1+self.model.m2)*9.81)/(1.5*25.4/1000.0)
-        self.maxk2=((self.model.m1+self.model.m2)*9.81)/(0.75*25.4/1000.0)
+        self.model.mink1=(self.model.m1*9.81)/(6.0*25.4/1000.0)
+        self.model.maxk1=(self.model.m1*9.81)/(3.0*25.4/1000.0)
+        self.model.mink2=((self.model.m1+self.model.m2)*9.81)/(1.5*25.4/1000.0)
+        self.model.maxk2=((self.model.m1+self.model.m2)*9.81)/(0.75*25.4/1000.0)
+        self.model.maxc1=6.0*math.sqrt(self.model.maxk1*self.model.m1)
 
         ymag=6.0/(12.0*3.3)   #This is the height of the ramp in m
         if ymag is not None:
             self.model.ymag = ymag
-        self.model.yangdeg = float(self.le_ang.text())
-        self.model.tmax = float(self.le_tmax.text())
+        self.model.yangdeg = self.readInput(self.le_ang, self.model.yangdeg)
+        self.model.tmax = self.readInput(self.le_tmax, self.model.tmax)
+        self.model.includeAccel = self.chk_IncludeAccel.isChecked()
         if(doCalc):
             self.doCalc()
         self.SSE((self.model.k1, self.model.c1, self.model.k2), optimizing=False)
         self.view.updateView(self.model)
 
+    def setRoad(self, road):
+        """
+        Changes the road and recalculates.  A road profile is simulated to 2 s past its end at the current speed.
+        :param road: a QuarterCarRoad.RoadProfile, or None for the ramp
+        """
+        self.model.road = road
+        if road is not None:
+            v = 1000 * float(self.le_v.text()) / 3600
+            self.le_tmax.setText("{:0.2f}".format(road.getLength() / v + 2.0))
+        self.calculate()
+
+    def readInput(self, widget, value):
+        """
+        Reads a number from a line edit.  If the text is just value as updateView shows it, value is kept, so rounding
+        for display does not count as a change (and the simulation cache still finds the design).
+        :param widget: a QLineEdit
+        :param value: the current value in the model
+        :return: the number
+        """
+        text = widget.text().strip()
+        return value if text == "{:0.2f}".format(value) else float(text)
+
     def setWidgets(self, w):
         """
         Pass widgets to view for setup.
@@ -828,40 +928,107 @@ class CarController():
         """
         v = 1000 * self.model.v / 3600  # convert speed to m/s from kph
         self.model.angrad = self.model.yangdeg * math.pi / 180.0  # convert angle to radians
-        self.model.tramp = self.model.ymag / (math.sin(self.model.angrad) * v)  # calculate time to traverse ramp
-
-        self.model.timeData=np.logspace(np.log10(0.000001), np.log10(self.model.tmax), 2000)
-        #self.model.timeData=np.linspace(0, self.model.tmax, 2000)
-        self.model.roadPosData=[self.model.ymag if t>self.model.tramp else t*self.model.ymag/self.model.tramp for t in self.model.timeData]
+        road = self.model.road if self.model.road is not None else RampRoad(self.model.ymag, self.model.yangdeg)
+        self.model.roadInput = road.atSpeed(v)  # the road profile mapped from distance to time
+        self.model.tramp = self.model.roadInput.getDuration()  # calculate time to traverse ramp (or road profile)
+
+        self.model.timeData=road.getTimes(v, self.model.tmax)  # log spaced for the ramp
+        self.model.roadPosData=self.model.roadInput(self.model.timeData)
+        # see if this design has been simulated already (e.g., revisited by the optimizer)
+        key = None
+        if self.cache is not None:
+            key = self.cache.makeKey(self.model)
+            simulation = self.cache.get(key)
+            if simulation is not None:
+                simulation.restore(self.model)
+                if doPlot:
+                    self.doPlot()
+                return
         ic = [0, 0, 0, 0]
-        # run odeint solver
-        self.step=0
-        self.model.results = solve_ivp(self.ode_system, t_span=[0,self.model.tmax], y0=ic, t_eval=self.model.timeData)
+        self.stateSpace.setModel(self.model)
+        if self.model.solver == 'exact':
+            # the system is linear and the road is piecewise linear, so the solution is exact at every time
+            self.model.results = self.stateSpace.solve(self.model.timeData, self.model.roadInput, ic)
+        else:
+            # run ode solver.  The implicit methods get the analytic Jacobian.  The dense output is sampled at
+            # timeData afterwards rather than through t_eval.
+            self.model.results = self.integrate(self.model.solver, ic)
+            self.model.results.t = self.model.timeData
+            self.model.results.y = self.model.results.sol(self.model.timeData)
+        self.model.solution = self.model.results.sol
+        self.model.bodyPosData = self.model.results.y[0]
+        self.model.wheelPosData = self.model.results.y[2]
         if doAccel:
             self.calcAccel()
+        self.model.simulation = SimulationResult().store(self.model)
+        if key is not None and doAccel:
+            self.cache.put(key, self.model.simulation)
         if doPlot:
             self.doPlot()
-        self.model.bodyPosData = self.model.results.y[0]
-        self.model.wheelPosData = self.model.results.y[2]
-        pass
+
+    def integrate(self, method, ic, kinkTol=0.1, maxRestarts=200):
+        """
+        Integrates ode_system with solve_ivp, restarting at the real kinks in the road (the corners of a ramp or an
+        obstacle) so no step straddles one, which would make the step size controller reject steps to find it.  The
+        smaller slope changes, and all of them on a rough road with more kinks than it is worth restarting at (e.g., a
+        random road with a breakpoint every 0.1 m), are integrated through with steps no longer than the road's
+        segments, so no feature of the road falls between steps.  The dense outputs of the pieces are joined into one
+        OdeSolution.
+        :param method: a solve_ivp method or 'auto' to let the state space solver pick one
+        :param ic: state at t=0
+        :param kinkTol: slope changes of at least kinkTol times the largest one in the road are kinks
+        :param maxRestarts: roads with more kinks than this are integrated through without restarts
+        :return: an OptimizeResult like the one solve_ivp gives with dense_output=True
+        """
+        m = self.model
+        t, a, b = m.roadInput.getSegments()
+        inner = (t > 0.0) & (t < m.tmax)
+        tb = t[inner]
+        db = np.abs(b[inner] - b[np.nonzero(inner)[0] - 1])  # slope change at each breakpoint
+        kinks = tb[db >= kinkTol * db.max()] if len(tb) > 0 and db.max() > 0.0 else tb[:0]
+        if len(kinks) > maxRestarts:
+            kinks = kinks[:0]
+        edges = np.concatenate([[0.0], kinks, [m.tmax]])
+        # the longest step in each piece is its shortest road segment, if the piece has breakpoints in it
+        maxSteps = []
+        for t0, t1 in zip(edges[:-1], edges[1:]):
+            tp = np.concatenate([[t0], tb[(tb > t0) & (tb < t1)], [t1]])
+            maxSteps.append(np.diff(tp).min() if len(tp) > 2 else np.inf)
+        if method == 'auto':
+            method = self.stateSpace.chooseMethod(m.tmax, min(maxSteps))
+        options = {} if method in ('RK23', 'RK45', 'DOP853') else {'jac': self.jacobian}
+        ts, interpolants = [], []
+        nfev, njev, nlu = 0, 0, 0
+        X = ic
+        for t0, t1, maxStep in zip(edges[:-1], edges[1:], maxSteps):
+            piece = solve_ivp(self.ode_system, t_span=[t0, t1], y0=X, method=method, vectorized=True,
+                              dense_output=True, max_step=maxStep, **options)
+            if not piece.success:
+                raise RuntimeError(piece.message)
+            ts.append(piece.sol.ts[:-1])
+            interpolants += piece.sol.interpolants
+            nfev, njev, nlu = nfev + piece.nfev, njev + piece.njev, nlu + piece.nlu
+            X = piece.y[:, -1]
+        sol = OdeSolution(np.concatenate(ts + [[m.tmax]]), interpolants)
+        return OptimizeResult(t=None, y=None, sol=sol, success=True, status=0, nfev=nfev, njev=njev, nlu=nlu,
+                              message='integrated between {} road kinks'.format(len(kinks)), method=method)
+
+    def setCache(self, cache=None):
+        """
+        Sets the simulation cache used by doCalc.
+        :param cache: a QuarterCarCache.SimulationCache or None to turn caching off
+        """
+        self.cache = cache
 
     def calcAccel(self):
         """
-        Calculate the acceleration in the vertical direction using the forward difference formula.
+        Calculate the body and wheel accelerations in the vertical direction and the tire deflection from the
+        equations of motion at every time in one pass.  Unlike differencing the velocity, this is exact at every
+        sample, including the closely spaced ones near t=0.
         """
-        N=len(self.model.timeData)
-        self.model.accelBodyData=np.zeros(shape=N)
-        vel=self.model.results.y[1]
-        for i in range(N):
-            if i==N-1:
-                h = self.model.timeData[i] - self.model.timeData[i - 1]
-                self.model.accelBodyData[i]= (vel[i] - vel[i - 1]) / (9.81 * h)  # backward difference of velocity
-            else:
-                h = self.model.timeData[i + 1] - self.model.timeData[i]
-                self.model.accelBodyData[i] = (vel[i + 1] - vel[i]) / (9.81 * h)  # forward difference of velocity
-            # else:
-            #     self.model.accel[i]=(vel[i+1]-vel[i-1])/(9.81*2.0*h)  # central difference of velocity
-        self.model.accelMax=self.model.accelBodyData.max()
+        m=self.model
+        m.accelBodyData, m.accelWheelData, m.tireDeflectionData = m.calcDerived(m.results.y, m.roadPosData)
+        m.accelMax=m.accelBodyData.max()
         return True
 
     def OptimizeSuspension(self):
@@ -871,22 +1038,149 @@ class CarController():
         Step 3:  optimize the suspension
         :return:
         """
+        #Step 1 and 2:
+        x0=self.prepareOptimization()
+        #Step 3:
+        self.runOptimization(x0)
+        self.view.updateView(self.model)
+
+    def prepareOptimization(self):
+        """
+        Reads the inputs from the GUI and makes the initial guess for k1, c1, k2.  This is the only part of an
+        optimization that touches the widgets.
+        :return: array of the initial k1, c1, k2
+        """
         #Step 1:
         #$JES MISSING CODE HERE$
         self.calculate(doCalc=False)
         #Step 2:
         #JES MISSING CODE HERE$
-        x0=np.array([(self.model.mink1)*1.1, self.model.c1, (self.model.mink2)*1.1])
-        #Step 3:
-        #JES MISSING CODE HERE$
-        answer=minimize(self.SSE,x0,method='Nelder-Mead')
+        return np.array([(self.model.mink1)*1.1, self.model.c1, (self.model.mink2)*1.1])
+
+    def runOptimization(self, x0, progress=None, cancel=None):
+        """
+        Optimizes k1, c1, k2 starting from x0.  This only uses self.model and self.stateSpace, so it can run on a
+        worker thread with its own copy of them.
+        :param x0: initial k1, c1, k2
+        :param progress: optional callback progress(k1, c1, k2, SSE, accelMax) called with the best design so far
+        after each iteration
+        :param cancel: optional callable that returns True to stop the optimization
+        :return: True if it was cancelled.  Either way the model is left at the best design found.
+        """
+        m=self.model
+        best=[np.inf, np.array(x0, dtype=float), 0.0]  # SSE, k1 c1 k2, accelMax
+
+        def evaluate(vals, gradient=False):
+            if cancel is not None and cancel():
+                raise OptimizationCancelled()
+            result=self.SSEGradient(vals) if gradient else self.SSE(vals)
+            SSE=result[0] if gradient else result
+            if SSE < best[0]:
+                best[:]=[SSE, np.array(vals, dtype=float), m.accelMax]
+            return result
+
+        def callback(*args, **kwargs):
+            if progress is not None:
+                progress(*best[1], best[0], best[2])
+
+        def gradientMinimize(x0, method):
+            # the gradient methods work on k1, c1, k2 scaled by the initial guess so they are all about 1, and
+            # the limits on them are bounds instead of penalties
+            bounds=[(m.mink1/x0[0], m.maxk1/x0[0]), (m.minc1/x0[1], None), (m.mink2/x0[2], m.maxk2/x0[2])]
+            def objective(z):
+                SSE, grad = evaluate(z*x0, gradient=True)
+                return SSE, grad*x0
+            minimize(objective, np.ones(3), jac=True, method=method, bounds=bounds, callback=callback)
+
+        def globalMinimize(x0):
+            # every generation of the population is simulated in one batch (split over m.workers processes) instead
+            # of one doCalc per design, then the best design is polished with the exact gradients
+            self.doCalc(doPlot=False)  # sets the road input and the time grid the batch uses
+            bounds=[(m.mink1, m.maxk1), (m.minc1, m.maxc1), (m.mink2, m.maxk2)]
+            with BatchEvaluator(getScenario(m), workers=m.workers) as batch:
+                def population(x):  # x has shape (3, S)
+                    if cancel is not None and cancel():
+                        raise OptimizationCancelled()
+                    r=batch(x.T)
+                    i=np.argmin(r['objective'])
+                    if r['objective'][i] < best[0]:
+                        best[:]=[r['objective'][i], x[:, i].copy(), r['accelMax'][i]]
+                    return r['objective']
+                x0=np.clip(x0, [b[0] for b in bounds], [b[1] for b in bounds])
+                differential_evolution(population, bounds, x0=x0, popsize=m.popsize, maxiter=m.maxiter, seed=m.seed,
+                                       vectorized=True, updating='deferred', polish=False, callback=callback)
+            gradientMinimize(best[1].copy(), 'L-BFGS-B')
+
+        cancelled=False
+        try:
+            #JES MISSING CODE HERE$
+            if m.optimizer == 'Nelder-Mead':
+                minimize(evaluate, x0, method='Nelder-Mead', callback=callback)
+            elif m.optimizer == 'differential_evolution':
+                globalMinimize(x0)
+            else:
+                gradientMinimize(x0, m.optimizer)
+        except OptimizationCancelled:
+            cancelled=True
+        self.SSE(best[1])  # leave the model at the best design rather than the last one tried
+        return cancelled
+
+    def runParetoOptimization(self, x0=None, progress=None, cancel=None):
+        """
+        Searches for the Pareto front of ride comfort (peak or rms body acceleration, per model.comfort) against
+        road holding (largest tire deflection) against suspension travel over the bounds on k1, c1, k2.  Like
+        runOptimization, this only uses self.model and self.stateSpace, so it can run on a worker thread.
+        :param x0: optional design (k1, c1, k2) to seed the search with
+        :param progress: optional callback progress(front) called with the front after each generation
+        :param cancel: optional callable that returns True to stop the search
+        :return: True if it was cancelled.  Either way the front found is left in model.pareto.
+        """
+        m=self.model
+        self.doCalc(doPlot=False)  # sets the road input and the time grid the batches use
+        bounds=[(m.mink1, m.maxk1), (m.minc1, m.maxc1), (m.mink2, m.maxk2)]
+        comfort='accelRMS' if m.comfort == 'RMS' else 'accelPeak'
+        optimizer=ParetoOptimizer(getScenario(m), bounds, objectives=(comfort, 'tireDeflection', 'travel'),
+                                  popSize=m.paretoSize, generations=m.paretoGenerations, seed=m.seed, workers=m.workers)
+        m.pareto, cancelled=optimizer.run(x0=x0, progress=progress, cancel=cancel)
+        return cancelled
+
+    def runDesignMap(self, nGrid=40, nSlices=1, progress=None, cancel=None):
+        """
+        Maps SSE (without penalties), accelMax and settling time over a grid of k1 (linear between mink1 and maxk1)
+        by c1 (logarithmic between minc1 and maxc1), for the current k2 or for nSlices values of k2 between mink2 and
+        maxk2.  Like runOptimization, this only uses self.model and self.stateSpace, so it can run on a worker thread.
+        :param nGrid: number of k1 and of c1 values
+        :param nSlices: number of k2 values (1 for the current k2)
+        :param progress: optional callback progress(fraction done)
+        :param cancel: optional callable that returns True to stop
+        :return: True if it was cancelled.  Either way the map is left in model.designMap.
+        """
+        m=self.model
+        self.doCalc(doPlot=False)  # sets the road input and the time grid the batches use
+        k1=np.linspace(m.mink1, m.maxk1, nGrid)
+        c1=np.geomspace(m.minc1, m.maxc1, nGrid)
+        k2=np.array([m.k2]) if nSlices <= 1 else np.linspace(m.mink2, m.maxk2, nSlices)
+        m.designMap, cancelled=evaluateGrid(getScenario(m), k1, c1, k2, workers=m.mapWorkers, progress=progress,
+                                            cancel=cancel)
+        return cancelled
+
+    def showDesign(self, vals, SSE=None):
+        """
+        Calculates and shows a design (e.g., the best so far of an optimization running on another thread).
+        :param vals: k1, c1, k2
+        :param SSE: the objective value to show (the SSE without penalties if None)
+        """
+        self.SSE(vals, optimizing=False)  # sets k1, c1, k2 and solves
+        if SSE is not None:
+            self.model.SSE=SSE
         self.view.updateView(self.model)
 
-    def SSE(self, vals, optimizing=True):
+    def SSE(self, vals, optimizing=True, penalizeBounds=True):
         """
         Calculates the sum of square errors between the contour of the road and the car body.
         :param vals:
         :param optimizing:
+        :param penalizeBounds: add penalties for k1, c1, k2 out of range (not needed when the optimizer has bounds)
         :return:
         """
         k1, c1, k2=vals  #unpack the new values for k1, c1, k2
@@ -894,25 +1188,19 @@ class CarController():
         self.model.c1=c1
         self.model.k2=k2
         self.doCalc(doPlot=False)  #solve the odesystem with the new values of k1, c1, k2
-        SSE=0
-        for i in range(len(self.model.results.y[0])):
-            t=self.model.timeData[i]
-            y=self.model.results.y[0][i]
-            if t < self.model.tramp:
-                ytarget = self.model.ymag * (t / self.model.tramp)
-            else:
-                ytarget = self.model.ymag
-            SSE+=(y-ytarget)**2
+        error=self.model.results.y[0]-self.model.roadPosData  # the road position is the target for the body
+        SSE=float(np.dot(error, error))
 
         #some penalty functions if the constants are too small
-        if optimizing:
+        if optimizing and penalizeBounds:
             if k1<self.model.mink1 or k1>self.model.maxk1:
                 SSE+=100
-            if c1<10:
+            if c1<self.model.minc1:
                 SSE+=100
             if k2<self.model.mink2 or k2>self.model.maxk2:
                 SSE+=100
-            o_IncludeAccel = self.chk_IncludeAccel.isChecked()
+        if optimizing:
+            o_IncludeAccel = self.model.includeAccel
             # I'm overlaying a gradient in the acceleration limit that scales with distance from a target squared.
             if self.model.accelMax > self.model.accelLim and o_IncludeAccel:
                 # need to soften suspension
@@ -920,6 +1208,31 @@ class CarController():
         self.model.SSE=SSE
         return SSE
 
+    def SSEGradient(self, vals):
+        """
+        The SSE objective (with the acceleration penalty but not the range penalties) and its gradient with respect to
+        k1, c1, k2 from the forward sensitivities of the state.
+        :param vals: k1, c1, k2
+        :return: SSE, array of dSSE/d(k1, c1, k2)
+        """
+        SSE=self.SSE(vals, optimizing=True, penalizeBounds=False)
+        m=self.model
+        sim=m.simulation
+        if sim.gradSSE is None:  # the gradient is kept with the simulation, so a cached design does not redo it
+            self.stateSpace.setModel(m)
+            S=self.stateSpace.sensitivities(m.timeData, m.roadInput)  # dX/d(k1, c1, k2) with shape (3, 4, N)
+            error=m.results.y[0]-m.roadPosData
+            # the gradient of the acceleration penalty comes from the body acceleration at the sample where it peaks
+            i=np.argmax(m.accelBodyData)
+            x1, x1dot, x2, x2dot = m.results.y[:, i]
+            dS=S[:, :, i]
+            sim.dAccel=(m.c1*(dS[:, 3]-dS[:, 1])+m.k1*(dS[:, 2]-dS[:, 0])+np.array([x2-x1, x2dot-x1dot, 0.0]))/(9.81*m.m1)
+            sim.gradSSE=2.0*S[:, 0, :]@error
+        grad=sim.gradSSE.copy()
+        if m.accelMax > m.accelLim and m.includeAccel:
+            grad+=20.0*(m.accelMax-m.accelLim)*sim.dAccel
+        return SSE, grad
+
     def doPlot(self):
         self.view.doPlot(self.model)
 
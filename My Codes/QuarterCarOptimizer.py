@@ -0,0 +1,321 @@
+#region imports
+import os
+import numpy as np
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from scipy.integrate import trapezoid
+from QuarterCarSolver import BatchStateSpaceSolver
+#endregion
+
+#region functions
+def getScenario(model):
+    """
+    Everything about a simulation except the design (k1, c1, k2), as a plain dict that can be sent to another process.
+    The model must have been calculated (doCalc sets roadInput and timeData).
+    :param model: a CarModel
+    :return: dict
+    """
+    return {'m1': model.m1, 'm2': model.m2, 'road': model.roadInput,
+            'timeData': np.asarray(model.timeData), 'accelLim': model.accelLim, 'includeAccel': model.includeAccel}
+
+
+def evaluateBatch(designs, scenario):
+    """
+    Simulates a batch of designs in one stacked state space solution and works out the objective for each.
+    :param designs: array of k1, c1, k2 with shape (P, 3)
+    :param scenario: dict from getScenario
+    :return: dict of arrays of length P:  SSE (the body tracking error), accelMax (g's), objective (SSE plus the
+    acceleration penalty, as CarController.SSE gives it with bounds instead of range penalties) and the ride and
+    handling measures:  accelPeak and accelRMS (body acceleration in g's), tireDeflection and travel (largest tire
+    deflection and suspension travel in m) and settlingTime (s, when the body is last outside 2% of the largest road
+    height from the final road height, nan if it has not settled by the end of the simulation)
+    """
+    designs = np.atleast_2d(np.asarray(designs, dtype=float))
+    k1, c1, k2 = designs.T
+    s = scenario
+    t = s['timeData']
+    road = s['road']
+    X = BatchStateSpaceSolver(s['m1'], s['m2'], k1, c1, k2).solve(t, road)
+    x1, x1dot, x2, x2dot = X[:, 0], X[:, 1], X[:, 2], X[:, 3]
+    yroad = road(t)
+    error = x1 - yroad
+    SSE = np.einsum('pn,pn->p', error, error)
+    accel = (c1[:, None] * (x2dot - x1dot) + k1[:, None] * (x2 - x1)) / (9.81 * s['m1'])
+    accelMax = accel.max(axis=1)
+    objective = SSE.copy()
+    if s['includeAccel']:
+        over = accelMax > s['accelLim']
+        objective[over] += 10 + 10 * (accelMax[over] - s['accelLim']) ** 2
+    # the time grid is not uniform, so the rms is the time average of accel**2 rather than the mean of the samples
+    accelRMS = np.sqrt(trapezoid(accel ** 2, t, axis=1) / (t[-1] - t[0]))
+    outside = np.abs(x1 - road.y[-1]) > 0.02 * np.abs(road.y).max()
+    last = len(t) - 1 - np.argmax(outside[:, ::-1], axis=1)  # last sample outside the band
+    settlingTime = np.where(outside.any(axis=1), t[np.minimum(last + 1, len(t) - 1)], t[0])
+    settlingTime[outside[:, -1]] = np.nan
+    return {'SSE': SSE, 'accelMax': accelMax, 'objective': objective, 'accelPeak': np.abs(accel).max(axis=1),
+            'accelRMS': accelRMS, 'tireDeflection': np.abs(yroad - x2).max(axis=1), 'travel': np.abs(x2 - x1).max(axis=1),
+            'settlingTime': settlingTime}
+
+
+def evaluateGrid(scenario, k1, c1, k2, names=('SSE', 'accelMax', 'settlingTime'), workers=1, minPoolSize=4096,
+                 progress=None, cancel=None):
+    """
+    Evaluates every design on a k1 x c1 x k2 grid, in blocks of batches.
+    :param scenario: dict from getScenario
+    :param k1: array of k1 values
+    :param c1: array of c1 values
+    :param k2: array of k2 values (one value for a k1 x c1 map)
+    :param names: measures from evaluateBatch to keep
+    :param workers: processes for the BatchEvaluator (None for one per core)
+    :param minPoolSize: grids with fewer designs than this are evaluated on this thread (not worth starting a pool)
+    :param progress: optional callback progress(fraction done) called after each block
+    :param cancel: optional callable that returns True to stop (the rest of the grid is left nan)
+    :return: dict of the grid values k1, c1, k2, each measure in names as an array with shape (len(k2), len(c1),
+    len(k1)), and accelLim;  and True if it was cancelled
+    """
+    k1, c1, k2 = (np.atleast_1d(np.asarray(x, dtype=float)) for x in (k1, c1, k2))
+    K2, C1, K1 = np.meshgrid(k2, c1, k1, indexing='ij')
+    designs = np.column_stack([K1.ravel(), C1.ravel(), K2.ravel()])
+    values = {name: np.full(len(designs), np.nan) for name in names}
+    cancelled = False
+    with BatchEvaluator(scenario, workers=workers if len(designs) >= minPoolSize else 1) as batch:
+        blockSize = batch.chunkSize * batch.workers  # one chunk per process between progress reports
+        for start in range(0, len(designs), blockSize):
+            if cancel is not None and cancel():
+                cancelled = True
+                break
+            r = batch(designs[start:start + blockSize])
+            for name in names:
+                values[name][start:start + blockSize] = r[name]
+            if progress is not None:
+                progress(min(start + blockSize, len(designs)) / len(designs))
+    grid = {name: v.reshape(K1.shape) for name, v in values.items()}
+    grid.update({'k1': k1, 'c1': c1, 'k2': k2, 'accelLim': scenario['accelLim']})
+    return grid, cancelled
+
+
+def nonDominatedSort(F):
+    """
+    Sorts a set of objective vectors (all minimized) into non-dominated fronts.
+    :param F: array of objectives with shape (P, M)
+    :return: integer array of length P with the front of each point (0 for the Pareto front)
+    """
+    F = np.asarray(F, dtype=float)
+    # dominates[i, j] is True if i is no worse than j in every objective and better in at least one
+    dominates = np.all(F[:, None, :] <= F[None, :, :], axis=2) & np.any(F[:, None, :] < F[None, :, :], axis=2)
+    count = dominates.sum(axis=0)  # number of points dominating each point
+    rank = np.full(len(F), -1)
+    front = 0
+    current = np.flatnonzero(count == 0)
+    while current.size:
+        rank[current] = front
+        count = count - dominates[current].sum(axis=0)
+        count[rank >= 0] = -1
+        current = np.flatnonzero(count == 0)
+        front += 1
+    return rank
+
+
+def crowdingDistance(F, rank):
+    """
+    The NSGA-II crowding distance of each point within its front:  the sum over the objectives of the gap between
+    its neighbours, scaled by the extent of the front.  The ends of each front get infinity so they are always kept.
+    :param F: array of objectives with shape (P, M)
+    :param rank: fronts from nonDominatedSort
+    :return: array of length P
+    """
+    F = np.asarray(F, dtype=float)
+    distance = np.zeros(len(F))
+    for front in np.unique(rank):
+        members = np.flatnonzero(rank == front)
+        f = F[members]
+        for m in range(F.shape[1]):
+            order = np.argsort(f[:, m])
+            distance[members[order[[0, -1]]]] = np.inf
+            span = f[order[-1], m] - f[order[0], m]
+            if span > 0 and len(members) > 2:
+                distance[members[order[1:-1]]] += (f[order[2:], m] - f[order[:-2], m]) / span
+    return distance
+#endregion
+
+#region class definitions
+class BatchEvaluator():
+    """
+    Evaluates populations of designs with evaluateBatch.  Populations are cut into chunks of chunkSize designs (to
+    bound the memory of the stacked arrays), and if workers > 1 the chunks are spread over a process pool.  The pool
+    uses spawned processes, so it is safe to start from a Qt worker thread, and it is created on first use and kept
+    until close() so its start up is paid once per optimization.  Populations with less than a full chunk of work are
+    evaluated on this thread, since sending them to the pool costs more than it saves.
+    """
+    maxChunkSize = 64
+    maxChunkPoints = 200000  # designs * (times + road breakpoints) per chunk;  beyond this the arrays outgrow the cache
+    minPoolPoints = maxChunkPoints  # designs * (times + road breakpoints) in a population worth sending to the pool
+    names = ('SSE', 'accelMax', 'objective', 'accelPeak', 'accelRMS', 'tireDeflection', 'travel', 'settlingTime')
+
+    def __init__(self, scenario, workers=1, chunkSize=None):
+        """
+        :param scenario: dict from getScenario
+        :param workers: number of processes (None for one per core, 1 to evaluate on this thread)
+        :param chunkSize: designs per chunk (None for up to maxChunkSize, fewer for long roads)
+        """
+        self.scenario = scenario
+        self.workers = os.cpu_count() if workers is None else max(int(workers), 1)
+        self.points = len(scenario['timeData']) + len(scenario['road'].t)  # per design
+        if chunkSize is None:
+            chunkSize = min(self.maxChunkSize, max(self.maxChunkPoints // self.points, 1))
+        self.chunkSize = chunkSize
+        self.pool = None
+        self.nEvaluations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, designs):
+        """
+        :param designs: array of k1, c1, k2 with shape (P, 3)
+        :return: dict of arrays of length P (see evaluateBatch), empty if there are no designs
+        """
+        designs = np.asarray(designs, dtype=float).reshape(-1, 3)
+        if len(designs) == 0:
+            return {name: np.empty(0) for name in self.names}
+        self.nEvaluations += len(designs)
+        chunks = [designs[i:i + self.chunkSize] for i in range(0, len(designs), self.chunkSize)]
+        if self.workers > 1 and len(chunks) > 1 and len(designs) * self.points >= self.minPoolPoints:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            results = list(self.pool.map(evaluateBatch, chunks, repeat(self.scenario)))
+        else:
+            results = [evaluateBatch(chunk, self.scenario) for chunk in chunks]
+        return {name: np.concatenate([r[name] for r in results]) for name in results[0]}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+
+class ParetoOptimizer():
+    """
+    An NSGA-II search for the Pareto front of competing suspension measures over k1, c1, k2 (e.g., ride comfort as
+    body acceleration against road holding as tire deflection against suspension travel).  Each generation of
+    offspring is simulated in one batch with a BatchEvaluator.  New designs come from simulated binary crossover and
+    polynomial mutation of parents picked by binary tournament on (front, crowding distance), and the next
+    generation is the best popSize of parents and offspring together.
+    """
+    objectiveNames = ('accelPeak', 'accelRMS', 'tireDeflection', 'travel')  # measures from evaluateBatch
+
+    def __init__(self, scenario, bounds, objectives=('accelRMS', 'tireDeflection', 'travel'), popSize=100,
+                 generations=60, seed=None, workers=1):
+        """
+        :param scenario: dict from getScenario
+        :param bounds: (min, max) of k1, c1, k2
+        :param objectives: names of the measures to minimize (from ParetoOptimizer.objectiveNames)
+        :param popSize: designs per generation (rounded up to an even number)
+        :param generations: number of generations
+        :param seed: random seed
+        :param workers: processes for the BatchEvaluator
+        """
+        for name in objectives:
+            if name not in self.objectiveNames:
+                raise ValueError('unknown objective {}'.format(name))
+        self.scenario = scenario
+        self.lower, self.upper = np.array(bounds, dtype=float).T
+        self.objectives = tuple(objectives)
+        self.popSize = popSize + popSize % 2
+        self.generations = generations
+        self.rng = np.random.default_rng(seed)
+        self.workers = workers
+        self.etaCrossover = 15.0  # distribution index of the simulated binary crossover
+        self.etaMutation = 20.0  # distribution index of the polynomial mutation
+        self.generation = 0
+        self.nEvaluations = 0
+
+    def evaluate(self, batch, z):
+        """
+        :param z: designs scaled to [0, 1] within the bounds with shape (P, 3)
+        :return: objectives with shape (P, M)
+        """
+        r = batch(self.lower + z * (self.upper - self.lower))
+        return np.column_stack([r[name] for name in self.objectives])
+
+    def select(self, rank, crowding):
+        """
+        Binary tournament:  of two random members, the one on the better front, or the less crowded one on the same
+        front.
+        :return: indices of popSize parents
+        """
+        a, b = self.rng.integers(len(rank), size=(2, self.popSize))
+        aWins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowding[a] > crowding[b]))
+        return np.where(aWins, a, b)
+
+    def crossover(self, parents):
+        """
+        Simulated binary crossover of consecutive pairs of parents (scaled to [0, 1]).
+        """
+        p1, p2 = parents[0::2], parents[1::2]
+        u = self.rng.random(p1.shape)
+        eta = self.etaCrossover
+        beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta + 1)), (1 / (2 * (1 - u))) ** (1 / (eta + 1)))
+        beta[self.rng.random(p1.shape) < 0.5] = 1.0  # each variable crosses over with probability 1/2
+        c1 = 0.5 * ((1 + beta) * p1 + (1 - beta) * p2)
+        c2 = 0.5 * ((1 - beta) * p1 + (1 + beta) * p2)
+        return np.clip(np.vstack([c1, c2]), 0.0, 1.0)
+
+    def mutate(self, z):
+        """
+        Polynomial mutation of each variable with probability 1/(number of variables).
+        """
+        u = self.rng.random(z.shape)
+        eta = self.etaMutation
+        delta = np.where(u < 0.5, (2 * u) ** (1 / (eta + 1)) - 1, 1 - (2 * (1 - u)) ** (1 / (eta + 1)))
+        mutate = self.rng.random(z.shape) < 1.0 / z.shape[1]
+        return np.clip(z + mutate * delta, 0.0, 1.0)
+
+    def getFront(self, z, F, rank):
+        """
+        :return: dict with the designs (k1, c1, k2) and objectives of the first front, sorted on the first objective,
+        the objective names and the generation
+        """
+        members = np.flatnonzero(rank == 0)
+        members = members[np.argsort(F[members, 0])]
+        return {'designs': self.lower + z[members] * (self.upper - self.lower), 'objectives': F[members],
+                'names': self.objectives, 'generation': self.generation}
+
+    def run(self, x0=None, progress=None, cancel=None):
+        """
+        Evolves the population for self.generations generations.
+        :param x0: optional design (k1, c1, k2) to put in the first generation
+        :param progress: optional callback progress(front) with the front (see getFront) after each generation
+        :param cancel: optional callable that returns True to stop after the current generation
+        :return: the front (see getFront) and True if it was cancelled
+        """
+        cancelled = False
+        with BatchEvaluator(self.scenario, workers=self.workers) as batch:
+            z = self.rng.random((self.popSize, 3))
+            if x0 is not None:
+                z[0] = np.clip((np.asarray(x0, dtype=float) - self.lower) / (self.upper - self.lower), 0.0, 1.0)
+            F = self.evaluate(batch, z)
+            rank = nonDominatedSort(F)
+            crowding = crowdingDistance(F, rank)
+            for self.generation in range(1, self.generations + 1):
+                if cancel is not None and cancel():
+                    cancelled = True
+                    break
+                children = self.mutate(self.crossover(z[self.select(rank, crowding)]))
+                z = np.vstack([z, children])
+                F = np.vstack([F, self.evaluate(batch, children)])
+                rank = nonDominatedSort(F)
+                crowding = crowdingDistance(F, rank)
+                survivors = np.lexsort((-crowding, rank))[:self.popSize]  # by front, then least crowded first
+                z, F, rank = z[survivors], F[survivors], rank[survivors]
+                crowding = crowdingDistance(F, rank)  # the last front kept may have lost members
+                if progress is not None:
+                    progress(self.getFront(z, F, rank))
+            self.nEvaluations = batch.nEvaluations
+        return self.getFront(z, F, rank), cancelled
+#endregion
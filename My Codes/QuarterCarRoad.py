@@ -0,0 +1,221 @@
+#region imports
+import math
+import hashlib
+import numpy as np
+#endregion
+
+#region class definitions
+class RoadInput():
+    """
+    The road as the car sees it:  the height (m) as a piecewise linear function of time through the breakpoints
+    (t, y), starting at t=0 and holding the last height after the last breakpoint.  This is the input the state space
+    solvers and ode_system take, and it is a plain object, so it can be sent to another process.
+    """
+    def __init__(self, t, y):
+        """
+        :param t: breakpoint times (s), strictly increasing from 0
+        :param y: road heights (m) at the breakpoints
+        """
+        self.t = np.asarray(t, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        if self.t.ndim != 1 or self.t.shape != self.y.shape or len(self.t) < 2:
+            raise ValueError('a road needs matching 1-D arrays of at least two breakpoints')
+        if self.t[0] != 0.0 or np.any(np.diff(self.t) <= 0.0):
+            raise ValueError('road breakpoint times must start at 0 and be strictly increasing')
+
+    def __call__(self, t):
+        """
+        The road height at the time(s) t.
+        """
+        return np.interp(t, self.t, self.y)
+
+    def getSegments(self):
+        """
+        The road on each segment between breakpoints (and the hold after the last one) as y = a + b*(t - t0).
+        :return: arrays t0, a, b with one entry per breakpoint
+        """
+        b = np.append(np.diff(self.y) / np.diff(self.t), 0.0)
+        return self.t, self.y, b
+
+    def getDuration(self):
+        """
+        :return: the time (s) to the last breakpoint
+        """
+        return self.t[-1]
+
+
+class RoadProfile():
+    """
+    A road profile:  the height (m) as a piecewise linear function of the distance travelled (m), holding its last
+    height after the end.  The car starts at rest, so profiles start at x = 0 and (for a smooth start) y = 0.
+    atSpeed() maps the profile to the RoadInput seen by a car driving it at a constant speed.
+    """
+    def __init__(self, x, y, name='Road'):
+        """
+        :param x: distances (m), strictly increasing from 0
+        :param y: heights (m)
+        :param name: for display
+        """
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.name = name
+        if self.x.ndim != 1 or self.x.shape != self.y.shape or len(self.x) < 2:
+            raise ValueError('a road profile needs matching 1-D arrays of at least two points')
+        if self.x[0] != 0.0 or np.any(np.diff(self.x) <= 0.0):
+            raise ValueError('road profile distances must start at 0 and be strictly increasing')
+
+    def __repr__(self):
+        # identifies the profile by its points, so simulations of it can be cached
+        digest = hashlib.sha1(self.x.tobytes() + self.y.tobytes()).hexdigest()[:16]
+        return '{}({}, {} points, {})'.format(type(self).__name__, self.name, len(self.x), digest)
+
+    def height(self, x):
+        """
+        The road height at the distance(s) x.
+        """
+        return np.interp(x, self.x, self.y)
+
+    def getLength(self):
+        return self.x[-1]
+
+    def atSpeed(self, v):
+        """
+        :param v: speed of the car (m/s)
+        :return: the RoadInput for driving the profile at v
+        """
+        if not v > 0.0:
+            raise ValueError('the speed must be positive to drive a road profile')
+        return RoadInput(self.x / v, self.y)
+
+    def getTimes(self, v, tmax, n=2000):
+        """
+        The times to simulate at:  n evenly spaced times plus every breakpoint before tmax, so the samples catch
+        every kink in the road.
+        :param v: speed of the car (m/s)
+        :param tmax: length of the simulation (s)
+        """
+        tb = self.x / v
+        return np.union1d(np.linspace(0.0, tmax, n), tb[tb < tmax])
+
+
+class RampRoad(RoadProfile):
+    """
+    The original quarter car road:  a ramp up to ymag at an angle, then level.
+    """
+    def __init__(self, ymag, angleDeg):
+        """
+        :param ymag: height of the ramp (m)
+        :param angleDeg: angle of the ramp (degrees)
+        """
+        # the distance along the face of the ramp, as the time to traverse it has always been worked out
+        super().__init__([0.0, ymag / math.sin(math.radians(angleDeg))], [0.0, ymag], name='Ramp')
+
+    def getTimes(self, v, tmax, n=2000):
+        # the response to a ramp is a transient starting at t=0, which logarithmic spacing resolves
+        return np.logspace(np.log10(0.000001), np.log10(tmax), n)
+
+
+class ObstacleRoad(RoadProfile):
+    """
+    Level road with a sequence of obstacles, each given as (kind, height, length):
+    'ramp' climbs (or drops, for a negative height) by height over length and stays there,
+    'bump' is a trapezoidal hump of height that rises over the first quarter of length and falls over the last
+    quarter (a negative height makes a pothole).
+    """
+    def __init__(self, obstacles, gap=20.0, leadIn=0.0, leadOut=20.0, name='Obstacles'):
+        """
+        :param obstacles: list of (kind, height, length) tuples
+        :param gap: level road between obstacles (m)
+        :param leadIn: level road before the first obstacle (m)
+        :param leadOut: level road after the last obstacle (m)
+        """
+        x, y = [0.0], [0.0]
+
+        def goTo(dx, yNew):
+            if dx > 0.0:
+                x.append(x[-1] + dx)
+                y.append(yNew)
+
+        goTo(leadIn, 0.0)
+        for i, (kind, height, length) in enumerate(obstacles):
+            if length <= 0.0:
+                raise ValueError('obstacle lengths must be positive')
+            if i > 0:
+                goTo(gap, y[-1])
+            if kind == 'ramp':
+                goTo(length, y[-1] + height)
+            elif kind == 'bump':
+                base = y[-1]
+                goTo(length / 4, base + height)
+                goTo(length / 2, base + height)
+                goTo(length / 4, base)
+            else:
+                raise ValueError('unknown obstacle kind {}'.format(kind))
+        goTo(leadOut, y[-1])
+        super().__init__(x, y, name=name)
+
+
+class CSVRoad(RoadProfile):
+    """
+    A measured road profile read from two columns of a delimited text file:  distance and height.  Lines that are not
+    numbers (e.g., a header) are skipped.  The profile is shifted to start at distance 0 and height 0, since the car
+    starts at rest.
+    """
+    def __init__(self, fileName, xColumn=0, yColumn=1, scale=1.0, delimiter=',', name=None):
+        """
+        :param fileName: the file
+        :param xColumn: column of the distances
+        :param yColumn: column of the heights
+        :param scale: factor from the file's units to m (e.g., 0.001 for distances and heights in mm)
+        :param delimiter: column delimiter
+        :param name: for display (the file name if None)
+        """
+        data = np.genfromtxt(fileName, delimiter=delimiter, usecols=(xColumn, yColumn), ndmin=2)
+        data = data[np.isfinite(data).all(axis=1)] * scale
+        data = data[np.argsort(data[:, 0], kind='stable')]
+        if len(data) < 2:
+            raise ValueError('{} does not have two columns of at least two numbers'.format(fileName))
+        x, y = data.T
+        if np.any(np.diff(x) <= 0.0):
+            raise ValueError('{} has repeated distances'.format(fileName))
+        super().__init__(x - x[0], y - y[0], name=fileName if name is None else name)
+
+
+class ISO8608Road(RoadProfile):
+    """
+    A random road of one of the ISO 8608 roughness classes, A (very good) to H (very poor), synthesized by FFT from
+    the class's displacement power spectral density Gd(n) = Gd(n0)*(n/n0)**-2 (n0 = 0.1 cycles/m) with random
+    phases, over the spatial frequencies 0.011 to 2.83 cycles/m that the standard covers.  The first fadeIn metres
+    are faded in from level road, since the car starts at rest.
+    """
+    # geometric mean of Gd(n0) for each class (m**3)
+    classes = {c: 16.0E-6 * 4.0 ** i for i, c in enumerate('ABCDEFGH')}
+    n0 = 0.1
+    nMin = 0.011
+    nMax = 2.83
+
+    def __init__(self, roadClass='C', length=500.0, dx=0.1, fadeIn=5.0, seed=None):
+        """
+        :param roadClass: ISO 8608 class 'A' to 'H'
+        :param length: length of the road (m)
+        :param dx: spacing of the profile points (m)
+        :param fadeIn: distance over which the roughness is faded in (m)
+        :param seed: random seed (the same seed gives the same road)
+        """
+        if roadClass not in self.classes:
+            raise ValueError('ISO 8608 classes are A to H, not {}'.format(roadClass))
+        N = max(int(round(length / dx)), 2) + 1
+        x = dx * np.arange(N)
+        n = np.fft.rfftfreq(N, dx)  # spatial frequencies (cycles/m)
+        Gd = np.zeros_like(n)
+        band = (n >= self.nMin) & (n <= self.nMax)
+        Gd[band] = self.classes[roadClass] * (n[band] / self.n0) ** -2.0
+        # a cosine of amplitude sqrt(2*Gd*dn) for each frequency, summed by the inverse FFT
+        amplitude = np.sqrt(2.0 * Gd / (N * dx))
+        phase = np.random.default_rng(seed).uniform(0.0, 2.0 * np.pi, len(n))
+        y = np.fft.irfft(0.5 * N * amplitude * np.exp(1j * phase), n=N)
+        if fadeIn > 0.0:
+            y *= np.minimum(x / fadeIn, 1.0)
+        super().__init__(x, y, name='ISO 8608 class {}'.format(roadClass))
+        self.roadClass = roadClass
+#endregion
@@ -0,0 +1,354 @@
+#region imports
+import copy
+import numpy as np
+from scipy.linalg import expm
+from scipy.optimize import OptimizeResult
+#endregion
+
+#region functions
+def solveRecurrence(lam, tb, z0, f, maxGrowth=300.0):
+    """
+    Solves z[i+1] = exp(lam*(tb[i+1] - tb[i]))*z[i] + f[i] for every breakpoint at once.  This is how modal
+    coordinates of the state carry from one breakpoint of the road to the next.  The products of the exponentials
+    telescope, so over a block of breakpoints starting at tb[k]
+        z[i] = exp(lam*(tb[i] - tb[k])) * (z[k] + sum over k <= j < i of f[j]*exp(-lam*(tb[j+1] - tb[k])))
+    which is a cumulative sum.  Blocks are kept short enough in time that the exponentials stay within
+    exp(+-maxGrowth), so a long road costs a few array operations per block instead of a Python step per breakpoint.
+    :param lam: eigenvalues with shape (..., M)
+    :param tb: breakpoint times (n,)
+    :param z0: modal coordinates at tb[0] with the shape of lam
+    :param f: forcing with shape (n-1, ...) + lam.shape
+    :return: complex array of z at every breakpoint with shape (n,) + lam.shape
+    """
+    n = len(tb)
+    z = np.empty((n,) + np.shape(lam), dtype=complex)
+    z[0] = z0
+    rate = np.abs(np.real(lam)).max()
+    span = maxGrowth / rate if rate > 0.0 else np.inf
+    column = (-1,) + (1,) * np.ndim(lam)
+    k = 0
+    while k < n - 1:
+        end = max(int(np.searchsorted(tb, tb[k] + span, side='right')) - 1, k + 1)  # last breakpoint of the block
+        if end == k + 1:
+            z[end] = np.exp(lam * (tb[end] - tb[k])) * z[k] + f[k]
+        else:
+            grow = np.exp(-lam * (tb[k + 1:end + 1] - tb[k]).reshape(column))
+            z[k + 1:end + 1] = (z[k] + np.cumsum(f[k:end] * grow, axis=0)) / grow
+        k = end
+    return z
+#endregion
+
+#region class definitions
+class StateSpaceSolver():
+    """
+    The quarter car model is a linear system X' = A X + B y(t) with the state X = [x1, x1dot, x2, x2dot] and the
+    road position y(t) as the input.  The road (a RoadInput) is piecewise linear in time, and for an input that is
+    linear in time on a segment the solution is exact:
+        X(t) = Xp(t) + expm(A*(t-t0)) * (X(t0) - Xp(t0))
+    where Xp is the particular solution for the segment, which is also linear in time.  The states at the
+    breakpoints come from solveRecurrence and the states at any times from one vectorized application of the matrix
+    exponential (through the eigen decomposition of A), so there is no time stepping and no Python callback per
+    step, however long the road is.
+    """
+    def __init__(self, model=None):
+        """
+        :param model: a CarModel to take m1, m2, k1, c1, k2 from (or call setModel later)
+        """
+        self.A = None
+        self.B = None
+        self.lam = None  # eigenvalues of A
+        self.V = None  # eigenvectors of A
+        self.Vinv = None
+        self.useEig = True  # False if A is too close to defective for its eigenvectors to be trusted
+        if model is not None:
+            self.setModel(model)
+
+    def setModel(self, model):
+        """
+        Builds the A and B matrices from the car parameters and decomposes A.
+        :param model: a CarModel
+        :return: self
+        """
+        return self.setParameters(model.m1, model.m2, model.k1, model.c1, model.k2)
+
+    def setParameters(self, m1, m2, k1, c1, k2):
+        """
+        Builds the A and B matrices and decomposes A.
+        :return: self
+        """
+        self.m1, self.m2 = m1, m2
+        self.A = np.array([[0.0, 1.0, 0.0, 0.0],
+                           [-k1 / m1, -c1 / m1, k1 / m1, c1 / m1],
+                           [0.0, 0.0, 0.0, 1.0],
+                           [k1 / m2, c1 / m2, -(k1 + k2) / m2, -c1 / m2]])
+        self.B = np.array([0.0, 0.0, 0.0, k2 / m2])
+        self.w = np.linalg.solve(self.A, self.B)  # for the particular solutions
+        self.u = np.linalg.solve(self.A, self.w)
+        self.lam, self.V = np.linalg.eig(self.A)
+        # a repeated eigenvalue (e.g., critical damping) makes V singular, so use expm directly for those
+        self.useEig = np.linalg.cond(self.V) < 1.0E8
+        if self.useEig:
+            self.Vinv = np.linalg.inv(self.V)
+        return self
+
+    def getDerivatives(self):
+        """
+        The derivatives of A and B with respect to the design parameters k1, c1 and k2.
+        :return: list of (dA, dB) pairs in the order k1, c1, k2
+        """
+        m1, m2 = self.m1, self.m2
+        z = np.zeros(4)
+        dA_k1 = np.array([z, [-1 / m1, 0.0, 1 / m1, 0.0], z, [1 / m2, 0.0, -1 / m2, 0.0]])
+        dA_c1 = np.array([z, [0.0, -1 / m1, 0.0, 1 / m1], z, [0.0, 1 / m2, 0.0, -1 / m2]])
+        dA_k2 = np.array([z, z, z, [0.0, 0.0, -1 / m2, 0.0]])
+        return [(dA_k1, z), (dA_c1, z), (dA_k2, np.array([0.0, 0.0, 0.0, 1 / m2]))]
+
+    def chooseMethod(self, tmax, maxStep=np.inf):
+        """
+        Picks the solve_ivp method that is fastest for these parameters.  When the fastest mode (usually the tire)
+        decays within a few steps of the simulation time there is nothing stiff about the problem and RK45 is cheapest
+        since it needs no Jacobian or LU decompositions.  Otherwise RK45 is held to steps of about 3/max|lambda| by
+        stability and LSODA, which switches to BDF with the analytic Jacobian, was faster than Radau and BDF for
+        every stiff set of parameters tried.  That only pays if LSODA can take the longer steps, though:  on a rough
+        road the steps are held to the road's segments anyway, and RK45 was faster up to segments of about
+        5/max|lambda|.
+        :param tmax: length of the simulation (s)
+        :param maxStep: longest step the road allows (s), e.g., its shortest segment
+        :return: a method name for solve_ivp
+        """
+        lamMax = np.abs(self.lam).max()
+        return 'RK45' if lamMax * tmax < 100.0 or lamMax * maxStep < 5.0 else 'LSODA'
+
+    def particular(self, a, b):
+        """
+        The particular solution Xp(tau) = p0 + p1*tau for the input y = a + b*tau.
+        Substituting into Xp' = A Xp + B y gives A p1 = -B b and A p0 = p1 - B a, so with w = inv(A) B and
+        u = inv(A) w, p1 = -w b and p0 = -w a - u b.
+        :param a, b: scalars or arrays (one per time or segment)
+        :return: p0, p1 with shape (4,) or (4, len(a))
+        """
+        p1 = -np.multiply.outer(self.w, b)
+        p0 = -np.multiply.outer(self.w, a) - np.multiply.outer(self.u, b)
+        return p0, p1
+
+    def expmApply(self, tau, d):
+        """
+        expm(A*tau)*d for every tau.
+        :param tau: array of times from the start of the segment
+        :param d: state vector (4,) or one per time (4, len(tau))
+        :return: array with shape (4, len(tau))
+        """
+        tau = np.asarray(tau, dtype=float)
+        d = np.broadcast_to(np.asarray(d, dtype=float).reshape(4, -1), (4, len(tau)))
+        if self.useEig:
+            return np.real(self.V @ ((self.Vinv @ d) * np.exp(np.outer(self.lam, tau))))
+        return np.einsum('nij,jn->in', expm(self.A[None, :, :] * tau[:, None, None]), d)
+
+    def dExpmApply(self, tau, dA, d):
+        """
+        The derivative of expm(A*tau)*d when A changes by dA, for every tau.  In the eigenbasis of A this is
+        (Daleckii-Krein) G(tau) * (Vinv dA V) element by element, with
+        G_ij = (exp(lam_i tau) - exp(lam_j tau)) / (lam_i - lam_j)  and  G_ii = tau exp(lam_i tau).
+        Without a usable eigenbasis the upper right block of expm([[A, dA], [0, A]]*tau) is used instead.
+        :param d: state vector (4,) or one per time (4, len(tau))
+        :return: array with shape (4, len(tau))
+        """
+        tau = np.asarray(tau, dtype=float)
+        d = np.broadcast_to(np.asarray(d, dtype=float).reshape(4, -1), (4, len(tau)))
+        if not self.useEig:
+            n = len(d)
+            M = np.zeros((2 * n, 2 * n))
+            M[:n, :n] = self.A
+            M[:n, n:] = dA
+            M[n:, n:] = self.A
+            return np.einsum('nij,jn->in', expm(M[None, :, :] * tau[:, None, None])[:, :n, n:], d)
+        lam = self.lam
+        E = np.exp(np.outer(lam, tau))  # (4, N)
+        dLam = lam[:, None] - lam[None, :]
+        close = np.abs(dLam) < 1.0E-8 * np.abs(lam).max()
+        G = np.where(close[:, :, None], tau[None, None, :] * E[:, None, :],
+                     (E[:, None, :] - E[None, :, :]) / np.where(close, 1.0, dLam)[:, :, None])
+        Ahat = self.Vinv @ dA @ self.V
+        c = self.Vinv @ d
+        return np.real(self.V @ np.einsum('ijn,ij,jn->in', G, Ahat, c))
+
+    def propagate(self, X0, tau, a, b):
+        """
+        The state on segments where the road is y = a + b*tau.
+        :param X0: state at tau = 0 (4,), or one per time (4, len(tau))
+        :param tau: array of times from the start of the segment
+        :param a, b: scalars, or one per time
+        :return: array of states with shape (4, len(tau))
+        """
+        tau = np.asarray(tau, dtype=float)
+        p0, p1 = (p.reshape(4, -1) for p in self.particular(a, b))
+        return p0 + p1 * tau + self.expmApply(tau, np.asarray(X0, dtype=float).reshape(4, -1) - p0)
+
+    def propagateSensitivity(self, X0, dX0, tau, a, b, dA, dB):
+        """
+        The derivative of propagate() with respect to a parameter that changes A by dA and B by dB.
+        :param X0: state at tau = 0 (4,), or one per time (4, len(tau))
+        :param dX0: derivative of X0 with respect to the parameter, shaped like X0
+        :return: array with shape (4, len(tau))
+        """
+        tau = np.asarray(tau, dtype=float)
+        p0, p1 = (p.reshape(4, -1) for p in self.particular(a, b))
+        dp1 = np.linalg.solve(self.A, -np.multiply.outer(dB, b).reshape(4, -1) - dA @ p1)
+        dp0 = np.linalg.solve(self.A, dp1 - np.multiply.outer(dB, a).reshape(4, -1) - dA @ p0)
+        d = np.asarray(X0, dtype=float).reshape(4, -1) - p0
+        return dp0 + dp1 * tau + self.dExpmApply(tau, dA, d) + \
+            self.expmApply(tau, np.asarray(dX0, dtype=float).reshape(4, -1) - dp0)
+
+    def accumulate(self, tb, X0, F):
+        """
+        Carries a state across the breakpoints tb:  X[i+1] = expm(A*(tb[i+1] - tb[i]))*X[i] + F[i].
+        :param X0: state at tb[0]
+        :param F: forcing over each segment with shape (4, len(tb)-1)
+        :return: array of states at the breakpoints with shape (4, len(tb))
+        """
+        if self.useEig:
+            z = solveRecurrence(self.lam, tb, self.Vinv @ X0, (self.Vinv @ F).T)
+            return np.real(self.V @ z.T)
+        X = np.empty((4, len(tb)))
+        X[:, 0] = X0
+        for i, h in enumerate(np.diff(tb)):
+            X[:, i + 1] = self.expmApply([h], X[:, i])[:, 0] + F[:, i]
+        return X
+
+    def getBreakpointStates(self, road, X0=(0.0, 0.0, 0.0, 0.0)):
+        """
+        :param road: a RoadInput
+        :param X0: state at t=0
+        :return: array of the states at the road's breakpoints with shape (4, number of breakpoints)
+        """
+        tb, a, b = road.getSegments()
+        h = np.diff(tb)
+        F = self.propagate(np.zeros(4), h, a[:-1], b[:-1])  # the response to each segment from rest
+        return self.accumulate(tb, np.asarray(X0, dtype=float), F)
+
+    @staticmethod
+    def getSegmentIndex(road, t):
+        """
+        :return: the segment of road each of the times t is on
+        """
+        return np.clip(np.searchsorted(road.t, t, side='right') - 1, 0, len(road.t) - 1)
+
+    def sensitivities(self, timeData, road, X0=(0.0, 0.0, 0.0, 0.0)):
+        """
+        The forward sensitivities dX/dp of the state to the design parameters p = (k1, c1, k2), exact like the
+        state itself.
+        :param timeData: array of times (s)
+        :param road: a RoadInput
+        :return: array with shape (3, 4, len(timeData))
+        """
+        t = np.atleast_1d(np.asarray(timeData, dtype=float))
+        tb, a, b = road.getSegments()
+        h = np.diff(tb)
+        Xb = self.getBreakpointStates(road, X0)
+        seg = self.getSegmentIndex(road, t)
+        S = np.empty((3, 4, len(t)))
+        for i, (dA, dB) in enumerate(self.getDerivatives()):
+            # the sensitivity carries across the breakpoints like the state, forced by the change in each segment
+            F = self.propagateSensitivity(Xb[:, :-1], np.zeros((4, len(h))), h, a[:-1], b[:-1], dA, dB)
+            dXb = self.accumulate(tb, np.zeros(4), F)
+            S[i] = self.propagateSensitivity(Xb[:, seg], dXb[:, seg], t - tb[seg], a[seg], b[seg], dA, dB)
+        return S
+
+    def solve(self, timeData, road, X0=(0.0, 0.0, 0.0, 0.0)):
+        """
+        Evaluates the response to the road at all the times in timeData.
+        :param timeData: array of times (s)
+        :param road: a RoadInput
+        :param X0: state at t=0
+        :return: an OptimizeResult with t, y and sol like the one from solve_ivp with dense_output=True
+        """
+        t = np.atleast_1d(np.asarray(timeData, dtype=float))
+        sol = self.getSolution(road, X0)
+        return OptimizeResult(t=t, y=sol(t), sol=sol, success=True, status=0, message='exact state space solution',
+                              nfev=0, njev=0, nlu=0, method='exact')
+
+    def getSolution(self, road, X0=(0.0, 0.0, 0.0, 0.0)):
+        """
+        :return: a StateSpaceSolution for the current car parameters that can be evaluated at any time
+        """
+        return StateSpaceSolution(self, road, X0)
+
+
+class StateSpaceSolution():
+    """
+    The exact solution as a function of time, called like the OdeSolution that solve_ivp gives with dense_output=True:
+    sol(t) is the state (4,) for a scalar t and (4, n) for an array of times.  It keeps its own copy of the
+    decomposition, so changing the solver's parameters afterwards does not change it.
+    """
+    def __init__(self, solver, road, X0=(0.0, 0.0, 0.0, 0.0)):
+        self.solver = copy.copy(solver)  # setModel replaces the arrays rather than changing them, so this is enough
+        self.road = road
+        self.Xb = solver.getBreakpointStates(road, X0)  # state at every breakpoint of the road
+
+    def __call__(self, t):
+        tb, a, b = self.road.getSegments()
+        tt = np.atleast_1d(np.asarray(t, dtype=float))
+        seg = self.solver.getSegmentIndex(self.road, tt)
+        y = self.solver.propagate(self.Xb[:, seg], tt - tb[seg], a[seg], b[seg])
+        return y[:, 0] if np.ndim(t) == 0 else y
+
+
+class BatchStateSpaceSolver():
+    """
+    The exact solution of StateSpaceSolver for a whole set of cars at once.  The A matrices of all the designs are
+    stacked into a (P, 4, 4) array and decomposed in one batched eig call, and the states of every design at every
+    time come out of a few array operations, so a population of candidates costs about as much Python as a single
+    car.
+    """
+    def __init__(self, m1, m2, k1, c1, k2):
+        """
+        :param m1, m2, k1, c1, k2: scalars or arrays of length P (broadcast together)
+        """
+        m1, m2, k1, c1, k2 = np.broadcast_arrays(*[np.atleast_1d(np.asarray(x, dtype=float)) for x in (m1, m2, k1, c1, k2)])
+        self.params = (m1, m2, k1, c1, k2)
+        P = len(k1)
+        self.A = np.zeros((P, 4, 4))
+        self.A[:, 0, 1] = 1.0
+        self.A[:, 1, :] = np.stack([-k1 / m1, -c1 / m1, k1 / m1, c1 / m1], axis=1)
+        self.A[:, 2, 3] = 1.0
+        self.A[:, 3, :] = np.stack([k1 / m2, c1 / m2, -(k1 + k2) / m2, -c1 / m2], axis=1)
+        self.B = np.zeros((P, 4))
+        self.B[:, 3] = k2 / m2
+        self.w = np.linalg.solve(self.A, self.B[:, :, None])[:, :, 0]
+        self.u = np.linalg.solve(self.A, self.w[:, :, None])[:, :, 0]
+        self.lam, self.V = np.linalg.eig(self.A)
+        self.useEig = np.linalg.cond(self.V) < 1.0E8
+        self.Vinv = np.zeros_like(self.V)
+        self.Vinv[self.useEig] = np.linalg.inv(self.V[self.useEig])
+        # the particular solution in modal coordinates:  Vinv p0 = -wHat a - uHat b and Vinv p1 = -wHat b
+        self.wHat = np.einsum('pij,pj->pi', self.Vinv, self.w)
+        self.uHat = np.einsum('pij,pj->pi', self.Vinv, self.u)
+
+    def solve(self, timeData, road):
+        """
+        The states of every design at every time, starting from rest.  Everything is worked out in the modal
+        coordinates z = Vinv X, where the matrix exponential is just exp(lam*tau), and only the states at the sample
+        times are changed back.
+        :param timeData: array of times (s)
+        :param road: a RoadInput
+        :return: array with shape (P, 4, len(timeData))
+        """
+        t = np.atleast_1d(np.asarray(timeData, dtype=float))
+        tb, a, b = road.getSegments()
+        h = np.diff(tb)
+        P = len(self.A)
+        lam = self.lam[:, :, None]
+        q0 = -(self.wHat[:, :, None] * a + self.uHat[:, :, None] * b)  # particular solution at each segment start
+        q1 = -self.wHat[:, :, None] * b
+        # the response to each segment from rest, then the state at every breakpoint
+        f = q0[:, :, :-1] * (1.0 - np.exp(lam * h)) + q1[:, :, :-1] * h
+        z = solveRecurrence(self.lam, tb, np.zeros((P, 4)), np.moveaxis(f, 2, 0))
+        seg = StateSpaceSolver.getSegmentIndex(road, t)
+        tau = t - tb[seg]
+        q0, q1 = q0[:, :, seg], q1[:, :, seg]
+        X = np.real(self.V @ (q0 + q1 * tau + (np.moveaxis(z[seg], 0, 2) - q0) * np.exp(lam * tau)))
+        for p in np.flatnonzero(~self.useEig):  # nearly defective A:  solve these designs one at a time
+            solver = StateSpaceSolver().setParameters(*(x[p] for x in self.params))
+            X[p] = solver.solve(t, road).y
+        return X
+#endregion
@@ -0,0 +1,91 @@
+#region imports
+import copy
+import threading
+from copy import deepcopy as dc
+from PyQt5 import QtCore as qtc
+from QuarterCarSolver import StateSpaceSolver
+#endregion
+
+#region class definitions
+class OptimizeWorker(qtc.QThread):
+    """
+    Runs the suspension optimization on a worker thread so the GUI keeps responding.  The optimization is done with
+    a copy of the controller that has its own copy of the model and its own state space solver, so the GUI thread
+    can keep using the controller's model (e.g., to show the progress) while it runs.
+    """
+    progress = qtc.pyqtSignal(float, float, float, float, float)  # k1, c1, k2, SSE, accelMax of the best so far
+    optimized = qtc.pyqtSignal(object, bool)  # optimized model, True if it was cancelled
+    failed = qtc.pyqtSignal(str)  # error message
+
+    def __init__(self, controller, x0, parent=None):
+        """
+        :param controller: a CarController that has already read its inputs (see prepareOptimization)
+        :param x0: initial k1, c1, k2
+        :param parent: parent QObject
+        """
+        super().__init__(parent)
+        self.controller = copy.copy(controller)
+        self.controller.model = dc(controller.model)
+        self.controller.stateSpace = StateSpaceSolver()
+        self.x0 = x0
+        self.stopEvent = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the optimization to stop at the next evaluation of the objective.
+        """
+        self.stopEvent.set()
+
+    def run(self):
+        try:
+            cancelled = self.controller.runOptimization(self.x0, progress=self.progress.emit,
+                                                        cancel=self.stopEvent.is_set)
+        except Exception as e:  # report anything else to the GUI rather than losing it on this thread
+            self.failed.emit(str(e))
+            return
+        self.optimized.emit(self.controller.model, cancelled)
+
+
+class ParetoWorker(OptimizeWorker):
+    """
+    Runs the Pareto front search (CarController.runParetoOptimization) on a worker thread, the same way
+    OptimizeWorker runs a single objective optimization.
+    """
+    front = qtc.pyqtSignal(object)  # the front after each generation
+
+    def run(self):
+        try:
+            cancelled = self.controller.runParetoOptimization(self.x0, progress=self.front.emit,
+                                                              cancel=self.stopEvent.is_set)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.optimized.emit(self.controller.model, cancelled)
+
+
+class MapWorker(OptimizeWorker):
+    """
+    Maps the design space (CarController.runDesignMap) on a worker thread.
+    """
+    fraction = qtc.pyqtSignal(float)  # fraction of the grid done
+
+    def __init__(self, controller, nGrid, nSlices, parent=None):
+        """
+        :param controller: a CarController that has already read its inputs
+        :param nGrid: number of k1 and of c1 values
+        :param nSlices: number of k2 values (1 for the current k2)
+        :param parent: parent QObject
+        """
+        super().__init__(controller, None, parent)
+        self.nGrid = nGrid
+        self.nSlices = nSlices
+
+    def run(self):
+        try:
+            cancelled = self.controller.runDesignMap(self.nGrid, self.nSlices, progress=self.fraction.emit,
+                                                     cancel=self.stopEvent.is_set)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.optimized.emit(self.controller.model, cancelled)
+#endregion